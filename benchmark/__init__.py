@@ -0,0 +1,16 @@
+"""Benchmark tools for the OTT database.
+
+datagen  - deterministic synthetic data loader (python -m benchmark.datagen)
+harness  - latency harness for the GUI queries and stored routines
+           (python -m benchmark.harness)
+cdc_latency - commit-to-event latency of the binlog consumer
+bench_recommend - full vs incremental recommendation rebuilds, no database
+load_test - concurrent-client load test for ott_api.py
+bench_prepared - prepared vs text-protocol latency of the registered statements
+soak_test - concurrent operators and renewal workers, with invariant checks
+startup_budget - ott_gui.py cold-start timings against a budget (headless under Xvfb)
+bench_rowstore - memory of fetched record lists vs ott_rows.RowStore, no database
+bench_facets - facet selection and counts on the ott_facets bitmap index
+bench_settlement - pending-payment settlement throughput by worker count (SKIP LOCKED)
+bench_cohorts - cohort report engine on synthetic cohorts in a process pool, or full vs cached on the database
+"""
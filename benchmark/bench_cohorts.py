@@ -0,0 +1,132 @@
+"""Cohort report engine: process-pool throughput and kernel correctness.
+
+Without --db, every cohort is generated inside the pool workers
+(synthetic_cohort stands in for load_cohort): users subscribe for a few
+back-to-back terms and watch in a decaying number of months. The whole
+report is timed and compared with --budget-s. A few small cohorts are first
+checked against a plain-Python count of the same rows.
+
+With --db the real report runs twice, once in full and once incrementally,
+so the second run shows what the per-cohort cache saves.
+
+    python -m benchmark.bench_cohorts --users 10000000 --cohorts 36 --workers 8
+    python -m benchmark.bench_cohorts --db
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+from datetime import date
+
+import ott_cohorts
+
+SEED = 3
+
+
+def synthetic_cohort(cohort, as_of, users, seed=SEED):
+    """CohortData for users registered in one month; ids are unique across cohorts"""
+    import numpy as np
+
+    rng = np.random.default_rng([seed, cohort])
+    user_ids = cohort * users + np.arange(users, dtype=np.int64)
+
+    # 80% subscribe within two months, for 1+ back-to-back terms of 1, 3 or 12 months
+    subscribers = user_ids[rng.random(users) < 0.8]
+    terms = rng.geometric(0.45, len(subscribers))
+    first_term = np.cumsum(terms) - terms
+    lengths = rng.choice(np.array([1, 3, 12]), terms.sum(), p=[0.6, 0.3, 0.1])
+    offsets = np.cumsum(lengths) - lengths
+    offsets -= np.repeat(offsets[first_term], terms)
+    sub_start = np.repeat(cohort + rng.integers(0, 3, len(subscribers)), terms) + offsets
+    sub_end = sub_start + lengths - 1
+
+    # A few viewing months each, mostly soon after registering
+    events = rng.poisson(4, users)
+    watch_users = np.repeat(user_ids, events)
+    watch_months = cohort + rng.geometric(0.15, events.sum()) - 1
+    return ott_cohorts.CohortData(user_ids, np.repeat(subscribers, terms), sub_start, sub_end,
+                                  watch_users, watch_months)
+
+
+def reference_counts(cohort, as_of, data):
+    """cohort_counts() by sets, one user and month at a time"""
+    width = as_of - cohort + 1
+    covered = {int(user): set() for user in data.user_ids}
+    for user, start, end in zip(data.sub_users, data.sub_start, data.sub_end):
+        covered[int(user)].update(range(max(start - cohort, 0), min(end - cohort, width - 1) + 1))
+    watched = {int(user): set() for user in data.user_ids}
+    for user, month in zip(data.watch_users, data.watch_months):
+        if 0 <= month - cohort < width:
+            watched[int(user)].add(int(month - cohort))
+    subscribed = [sum(age in months for months in covered.values()) for age in range(width)]
+    watching = [sum(age in months for months in watched.values()) for age in range(width)]
+    churned = [sum(age not in months and any(m <= age for m in months) for months in covered.values())
+               for age in range(width)]
+    return len(covered), subscribed, watching, churned
+
+
+def check_kernel(as_of, cohorts, users=2000):
+    """A problem description if the kernel disagrees with reference_counts(), else None"""
+    for cohort in cohorts:
+        data = synthetic_cohort(cohort, as_of, users)
+        size, *fast = ott_cohorts.cohort_counts(cohort, as_of, data)
+        ref_size, *slow = reference_counts(cohort, as_of, data)
+        if size != ref_size:
+            return f"cohort {ott_cohorts.month_label(cohort)}: {size} users != {ref_size}"
+        for metric, got, expected in zip(ott_cohorts.METRICS, fast, slow):
+            if list(got) != list(expected):
+                return f"cohort {ott_cohorts.month_label(cohort)} {metric}: {list(got)} != {expected}"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the cohort report engine")
+    parser.add_argument("--users", type=int, default=10_000_000, help="synthetic users in total")
+    parser.add_argument("--cohorts", type=int, default=36, help="registration months")
+    parser.add_argument("--workers", type=int, help="pool processes (default: one per CPU)")
+    parser.add_argument("--budget-s", type=float, default=60.0, help="fail when the report takes longer")
+    parser.add_argument("--db", action="store_true", help="run the real report, full then incremental")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        from db_connect import connect_db
+        conn = connect_db()
+        if conn is None:
+            return 1
+        try:
+            for label, full in [("full", True), ("incremental", False)]:
+                started = time.perf_counter()
+                result = ott_cohorts.report(conn, args.workers, full)
+                print(f"{label:<12} {len(result.cohorts)} cohorts, {int(result.sizes.sum()):,} users, "
+                      f"{result.recomputed} recomputed in {time.perf_counter() - started:.2f}s")
+        finally:
+            conn.close()
+        return 0
+
+    as_of = ott_cohorts.month_index(date.today())
+    cohorts = list(range(as_of - args.cohorts + 1, as_of + 1))
+    problem = check_kernel(as_of, cohorts[:3] + cohorts[-2:])
+    if problem:
+        print(f"Mismatch: {problem}")
+        return 1
+    print("Kernel matches the per-user reference on 5 cohorts")
+
+    users = args.users // args.cohorts
+    load = functools.partial(synthetic_cohort, users=users)
+    workers = args.workers or os.cpu_count()
+    started = time.perf_counter()
+    counts = ott_cohorts.compute(cohorts, as_of, load, workers)
+    result = ott_cohorts.assemble(as_of, counts, len(counts))
+    elapsed = time.perf_counter() - started
+    print(f"{len(result.cohorts)} cohorts, {int(result.sizes.sum()):,} users on {workers} processes "
+          f"in {elapsed:.2f}s ({result.sizes.sum() / elapsed:,.0f} users/s)\n")
+    print(ott_cohorts.format_table(result, "subscribed", 12))
+    if elapsed > args.budget_s:
+        print(f"\nOVER BUDGET: {elapsed:.1f}s > {args.budget_s:.0f}s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""Facet counts from the bitmap index vs one COUNT query per facet value.
+
+Fills an ott_facets.FacetIndex with synthetic titles (or loads it from the
+database with --db), then times random facet selections: selecting the
+matching titles plus computing every facet count. Each result is checked
+against a plain scan of the same attributes. With --db the same counts are
+also run as one COUNT(*) query per facet value for comparison.
+
+    python -m benchmark.bench_facets --titles 5000
+    python -m benchmark.bench_facets --db
+"""
+import argparse
+import random
+import sys
+import time
+
+import ott_facets
+from ott_cdc import ChangeEvent
+from benchmark.harness import percentile
+
+LANGUAGES = ["English", "Hindi", "Tamil", "Telugu", "Korean", "Japanese", "Spanish", "French",
+             "German", "Malayalam", "Bengali", "Marathi"]
+RATINGS = list(ott_facets.RATING_ORDER)
+
+
+def synthetic_index(titles, genres, rng):
+    """Index plus {content_id: (language, rating, content_type, genres)} for checking"""
+    index = ott_facets.FacetIndex()
+    index.genre_names = {genre_id: f"Genre {genre_id}" for genre_id in range(1, genres + 1)}
+    truth = {}
+    for content_id in range(1, titles + 1):
+        row = {"content_id": content_id, "language": rng.choice(LANGUAGES), "rating": rng.choice(RATINGS),
+               "content_type": rng.choice(("movie", "series"))}
+        index.apply(ChangeEvent("Content", "insert", None, row, 0, 0))
+        tags = set(rng.sample(range(1, genres + 1), rng.randint(1, 3)))
+        for genre_id in tags:
+            index.apply(ChangeEvent("Content_Genre", "insert", None,
+                                    {"content_id": content_id, "genre_id": genre_id}, 0, 0))
+        truth[content_id] = (row["language"], row["rating"], row["content_type"], tags)
+    return index, truth
+
+
+def random_filters(index, rng):
+    filters = {}
+    for dimension in ott_facets.DIMENSIONS:
+        values = index.values(dimension)
+        if values and rng.random() < 0.5:
+            filters[dimension] = set(rng.sample(values, rng.randint(1, min(3, len(values)))))
+    return filters
+
+
+def matches(attributes, filters, skip=None):
+    language, rating, content_type, genres = attributes
+    for dimension, values in filters.items():
+        if dimension == skip:
+            continue
+        if dimension == "genre":
+            if not genres & values:
+                return False
+        elif {"language": language, "rating": rating, "content_type": content_type}[dimension] not in values:
+            return False
+    return True
+
+
+def check(index, truth, filters):
+    """Compare select() and counts() with a scan; returns a problem description or None"""
+    expected = sorted(content_id for content_id, attributes in truth.items() if matches(attributes, filters))
+    if ott_facets.ids_of(index.select(filters)) != expected:
+        return f"select({filters}) differs from the scan"
+    counts = index.counts(filters)
+    positions = {"language": 0, "rating": 1, "content_type": 2}
+    for dimension in ott_facets.DIMENSIONS:
+        for value, count in counts[dimension].items():
+            scanned = sum(1 for attributes in truth.values() if matches(attributes, filters, skip=dimension)
+                          and (value in attributes[3] if dimension == "genre"
+                               else attributes[positions[dimension]] == value))
+            if scanned != count:
+                return f"count {dimension}={value} under {filters}: {count} != {scanned}"
+    return None
+
+
+def sql_counts(conn, filters):
+    """Every facet count as its own COUNT query, the way it would be done without the index"""
+    clauses, params = [], []
+    for dimension, values in filters.items():
+        marks = ", ".join(["%s"] * len(values))
+        if dimension == "genre":
+            clauses.append(f"c.content_id IN (SELECT content_id FROM Content_Genre WHERE genre_id IN ({marks}))")
+        else:
+            clauses.append(f"c.{dimension} IN ({marks})")
+        params.extend(values)
+    cursor = conn.cursor()
+    for dimension in ott_facets.DIMENSIONS:
+        others = [(clause, dim) for clause, dim in zip(clauses, filters) if dim != dimension]
+        other_params = [p for dim, values in filters.items() if dim != dimension for p in values]
+        where = " AND ".join(clause for clause, _ in others) or "1=1"
+        values = [row[0] for row in _distinct(cursor, dimension)]
+        for value in values:
+            if dimension == "genre":
+                cursor.execute(f"""SELECT COUNT(*) FROM Content c JOIN Content_Genre g ON g.content_id = c.content_id
+                                   WHERE g.genre_id = %s AND {where}""", [value] + other_params)
+            else:
+                cursor.execute(f"SELECT COUNT(*) FROM Content c WHERE c.{dimension} = %s AND {where}",
+                               [value] + other_params)
+            cursor.fetchall()
+    cursor.close()
+
+
+def _distinct(cursor, dimension):
+    if dimension == "genre":
+        cursor.execute("SELECT genre_id FROM Genre")
+    else:
+        cursor.execute(f"SELECT DISTINCT {dimension} FROM Content WHERE {dimension} IS NOT NULL")
+    return cursor.fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time facet selection and counts on the bitmap index")
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--genres", type=int, default=25)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--checks", type=int, default=20, help="selections verified against a scan")
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--db", action="store_true", help="load the index from the database instead")
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    conn = None
+    started = time.perf_counter()
+    if args.db:
+        from db_connect import connect_db
+        conn = connect_db()
+        if conn is None:
+            return 1
+        index, truth = ott_facets.FacetIndex().load(conn), None
+        print(f"Loaded {len(ott_facets.ids_of(index.all)):,} titles in {time.perf_counter() - started:.2f}s")
+    else:
+        index, truth = synthetic_index(args.titles, args.genres, rng)
+        print(f"Indexed {args.titles:,} synthetic titles in {time.perf_counter() - started:.2f}s")
+
+    selections = [random_filters(index, rng) for _ in range(args.iterations)]
+    if truth is not None:
+        for filters in selections[:args.checks]:
+            problem = check(index, truth, filters)
+            if problem:
+                print(f"Mismatch: {problem}")
+                return 1
+        print(f"{min(args.checks, len(selections))} selections match a full scan")
+
+    timings = {"select": [], "counts": [], "select + counts": []}
+    for filters in selections:
+        t0 = time.perf_counter()
+        index.select(filters)
+        t1 = time.perf_counter()
+        index.counts(filters)
+        t2 = time.perf_counter()
+        timings["select"].append((t1 - t0) * 1e6)
+        timings["counts"].append((t2 - t1) * 1e6)
+        timings["select + counts"].append((t2 - t0) * 1e6)
+    values = sum(len(index.values(dimension)) for dimension in ott_facets.DIMENSIONS)
+    print(f"{len(selections):,} random selections over {values} facet values")
+    print(f"{'operation':<18}{'p50 us':>10}{'p95 us':>10}{'max us':>10}")
+    for name, samples in timings.items():
+        samples.sort()
+        print(f"{name:<18}{percentile(samples, 50):>10.1f}{percentile(samples, 95):>10.1f}{samples[-1]:>10.1f}")
+
+    if conn is not None:
+        sql = []
+        for filters in selections[:20]:
+            t0 = time.perf_counter()
+            sql_counts(conn, filters)
+            sql.append((time.perf_counter() - t0) * 1e6)
+        sql.sort()
+        print(f"{'COUNT per value':<18}{percentile(sql, 50):>10.1f}{percentile(sql, 95):>10.1f}{sql[-1]:>10.1f}")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
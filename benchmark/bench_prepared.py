@@ -0,0 +1,107 @@
+"""Prepared vs text-protocol latency for the search and stats statements.
+
+Runs each registered statement from ott_statements through a plain cursor
+(parsed and resolved on every call) and through its cached prepared
+statement, interleaved so both see the same cache state. Reports p50/p95
+for both and the server's session counters, which show each statement
+being prepared once and then only executed.
+
+    python -m benchmark.bench_prepared --iterations 500
+    python -m benchmark.bench_prepared --pooled     # prepared calls through db_connect.get_pool()
+"""
+import argparse
+import sys
+import time
+
+from db_connect import connect_db, get_pool
+import ott_service as svc
+import ott_statements as stmts
+from benchmark.harness import like, percentile, pick, sample_context
+
+# Statement name -> params for iteration i, covering the search and stats paths
+CASES = {
+    "user_search": lambda ctx, i: like(ctx, "names", i, 1),
+    "content_search": lambda ctx, i: like(ctx, "titles", i, 2),
+    "device_search_term": lambda ctx, i: like(ctx, "names", i, 3),
+    "device_search_type": lambda ctx, i: (svc.DEVICE_TYPES[i % 3],),
+    "device_search_term_type": lambda ctx, i: like(ctx, "names", i, 3) + (svc.DEVICE_TYPES[i % 3],),
+    "days_left": lambda ctx, i: (pick(ctx, "sub_ids", i),),
+    "device_type_counts": lambda ctx, i: (),
+    "user_count": lambda ctx, i: (),
+    "active_sub_count": lambda ctx, i: (),
+    "new_users_month": lambda ctx, i: (),
+    "revenue_total": lambda ctx, i: (),
+    "revenue_month": lambda ctx, i: (),
+    "content_type_count": lambda ctx, i: (("movie", "series")[i % 2],),
+    "payment_methods": lambda ctx, i: (),
+    "plan_stats": lambda ctx, i: (),
+    "active_users": lambda ctx, i: (10,),
+}
+
+STATUS_VARS = ("Com_stmt_prepare", "Com_stmt_execute", "Com_select")
+
+
+def session_status(conn):
+    cursor = conn.cursor()
+    cursor.execute("SHOW SESSION STATUS WHERE Variable_name IN (%s, %s, %s)", STATUS_VARS)
+    status = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare prepared and text-protocol statement latency")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", help="run statements whose name contains this text")
+    parser.add_argument("--pooled", action="store_true",
+                        help="check a pooled connection out for every prepared call")
+    args = parser.parse_args(argv)
+    pool = get_pool() if args.pooled else None
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    cursor = conn.cursor()
+    ctx = sample_context(cursor)
+    cursor.close()
+
+    before = session_status(conn)
+    print(f"{'statement':<26}{'text p50':>10}{'text p95':>10}{'prep p50':>10}{'prep p95':>10}{'saved':>8}")
+    total_text = total_prepared = 0.0
+    for name, params in CASES.items():
+        if args.only and args.only not in name:
+            continue
+        statement = stmts.get(name)
+        timings = {False: [], True: []}
+        for i in range(args.warmup + args.iterations):
+            for prepared in (False, True):
+                started = time.perf_counter()
+                if prepared and pool is not None:
+                    pooled = pool.get_connection()
+                    stmts.execute(pooled, statement, params(ctx, i), prepared=True)
+                    pooled.close()
+                else:
+                    stmts.execute(conn, statement, params(ctx, i), prepared=prepared)
+                if i >= args.warmup:
+                    timings[prepared].append((time.perf_counter() - started) * 1000)
+        text, prep = sorted(timings[False]), sorted(timings[True])
+        total_text += sum(text)
+        total_prepared += sum(prep)
+        saved = 1 - percentile(prep, 50) / percentile(text, 50) if percentile(text, 50) else 0
+        print(f"{name:<26}{percentile(text, 50):>10.3f}{percentile(text, 95):>10.3f}"
+              f"{percentile(prep, 50):>10.3f}{percentile(prep, 95):>10.3f}{saved:>8.0%}")
+    after = session_status(conn)
+    conn.close()
+
+    if total_text:
+        print(f"\ntotal: text {total_text:.0f} ms, prepared {total_prepared:.0f} ms "
+              f"({1 - total_prepared / total_text:.0%} less)")
+    if pool is None:
+        print("session counters: " + ", ".join(f"{name} +{after[name] - before[name]:,}" for name in STATUS_VARS))
+    print("prepares per statement: " + ", ".join(f"{s.name}={s.prepares}" for s in stmts.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Recommendation rebuild timing on synthetic watch history.
+
+Generates power-law (profile, title) pairs in memory - no database needed -
+and times a full neighbour-list build against an incremental one where a
+small share of profiles has new history, the same split ott_recommend.rebuild
+makes.
+
+    python -m benchmark.bench_recommend --history 5000000 --titles 20000
+"""
+import argparse
+import sys
+import time
+
+import ott_recommend
+
+
+def synthetic_history(n_rows, n_profiles, n_titles, n_genres, seed):
+    """(pairs, genre_pairs, catalog_ids) with Zipf-like title popularity"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, n_titles + 1) ** 1.1
+    titles = rng.choice(n_titles, size=n_rows, p=weights / weights.sum()) + 1
+    profiles = rng.integers(1, n_profiles + 1, size=n_rows)
+    pairs = np.unique(np.column_stack([profiles, titles]).astype(np.int64), axis=0)
+
+    genre_pairs = set()
+    for content_id in range(1, n_titles + 1):
+        for genre_id in rng.choice(n_genres, size=rng.integers(1, 4), replace=False):
+            genre_pairs.add((content_id, int(genre_id) + 1))
+    return pairs, sorted(genre_pairs), np.arange(1, n_titles + 1, dtype=np.int64)
+
+
+def timed_build(pairs, genre_pairs, catalog, rows, k):
+    started = time.perf_counter()
+    watched, genre_matrix = ott_recommend.build_matrices(pairs[:, 0], pairs[:, 1], genre_pairs, catalog)
+    built = sum(1 for _ in ott_recommend.neighbour_lists(watched, genre_matrix, rows, k))
+    return built, time.perf_counter() - started
+
+
+def main(argv=None):
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Time full and incremental recommendation rebuilds")
+    parser.add_argument("--history", type=int, default=2_000_000, help="Watch_History rows to simulate")
+    parser.add_argument("--profiles", type=int, default=200_000)
+    parser.add_argument("--titles", type=int, default=10_000)
+    parser.add_argument("--genres", type=int, default=20)
+    parser.add_argument("--new-share", type=float, default=0.01, help="share of profiles with new history")
+    parser.add_argument("--top-k", type=int, default=ott_recommend.TOP_K)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    pairs, genre_pairs, catalog = synthetic_history(args.history, args.profiles, args.titles,
+                                                    args.genres, args.seed)
+    print(f"{args.history:,} history rows -> {len(pairs):,} distinct pairs, {len(catalog):,} titles "
+          f"(generated in {time.perf_counter() - started:.1f}s)")
+
+    built, seconds = timed_build(pairs, genre_pairs, catalog, np.arange(len(catalog)), args.top_k)
+    print(f"full build:        {built:>8,} titles in {seconds:6.2f}s")
+
+    rng = np.random.default_rng(args.seed + 1)
+    touched = rng.choice(args.profiles, size=max(1, int(args.profiles * args.new_share)), replace=False) + 1
+    affected = np.isin(pairs[:, 0], touched)
+    rows = np.unique(np.searchsorted(catalog, pairs[affected, 1]))
+    built, seconds = timed_build(pairs, genre_pairs, catalog, rows, args.top_k)
+    print(f"incremental build: {built:>8,} titles in {seconds:6.2f}s "
+          f"({len(touched):,} profiles with new history)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Memory of a fetched result set: list of records vs ott_rows.RowStore.
+
+Builds N subscription rows shaped like SUBSCRIPTION_LIST_SQL results, with a
+fresh object per value the way the connector returns them, and measures
+with tracemalloc the memory held by a fetchall()-style list of
+SubscriptionRecords against a RowStore filled batch by batch. Also times a
+sort, an enum filter and formatting one page, the operations the GUI uses.
+No database needed; --db measures the real subscription list instead.
+
+    python -m benchmark.bench_rowstore --rows 1000000
+    python -m benchmark.bench_rowstore --db
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import ott_service as svc
+from ott_rows import RowStore
+
+STATUSES = [b"active", b"expired", b"cancelled"]
+PLANS = [b"Basic", b"Standard", b"Premium"]
+
+
+def synthetic_batches(rows, seed, size=10000):
+    """Rows in fetchmany()-sized batches; every value is a new object, as from the connector"""
+    rng = random.Random(seed)
+    start = date(2023, 1, 1)
+    for offset in range(0, rows, size):
+        batch = []
+        for i in range(offset, min(offset + size, rows)):
+            begin = start + timedelta(days=rng.randrange(700))
+            batch.append((rows - i, f"First{rng.randrange(5000)}", f"Last{rng.randrange(20000)}",
+                          rng.choice(PLANS).decode(), begin, begin + timedelta(days=30 * rng.choice((1, 3, 12))),
+                          rng.choice(STATUSES).decode(), rng.randrange(2)))
+        yield batch
+
+
+def measure(build):
+    """(result, bytes still allocated after build, peak bytes while building, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def timed(label, work):
+    started = time.perf_counter()
+    result = work()
+    print(f"  {label:<34}{(time.perf_counter() - started) * 1000:>10.1f} ms")
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare record lists with RowStore memory")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db", action="store_true", help="use the subscription list from the database")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        from db_connect import connect_db
+        conn = connect_db()
+        if conn is None:
+            return 1
+        records, list_bytes, list_peak, list_s = measure(lambda: svc.list_subscriptions(conn))
+        store, store_bytes, store_peak, store_s = measure(lambda: svc.subscription_rows(conn))
+        conn.close()
+    else:
+        fields = svc.SubscriptionRecord._fields
+        records, list_bytes, list_peak, list_s = measure(
+            lambda: [svc.SubscriptionRecord(*row) for batch in synthetic_batches(args.rows, args.seed) for row in batch])
+        store, store_bytes, store_peak, store_s = measure(
+            lambda: RowStore.build(fields, synthetic_batches(args.rows, args.seed), svc.SubscriptionRecord))
+
+    rows = len(store)
+    print(f"{rows:,} subscription rows")
+    print(f"{'':<14}{'held MB':>10}{'peak MB':>10}{'bytes/row':>11}{'build s':>9}")
+    for label, held, peak, seconds in [("records", list_bytes, list_peak, list_s),
+                                       ("RowStore", store_bytes, store_peak, store_s)]:
+        print(f"{label:<14}{held / 2**20:>10.1f}{peak / 2**20:>10.1f}{held / max(rows, 1):>11.1f}{seconds:>9.2f}")
+    print(f"RowStore buffers: {store.nbytes() / 2**20:.1f} MB; "
+          f"{list_bytes / max(store_bytes, 1):.1f}x less memory held")
+    if records and tuple(records[0]) != tuple(store[0]):
+        print(f"Mismatch: {records[0]} != {store[0]}")
+        return 1
+    del records
+
+    print("operations:")
+    by_end = timed("sort by end_date", lambda: store.sort("end_date"))
+    timed("sort by last_name", lambda: store.sort("last_name"))
+    active = timed("where status = 'active'", lambda: store.where("status", "active"))
+    timed("search 'Last12'", lambda: store.search("Last12", "first_name", "last_name"))
+    timed(f"format first page of {min(500, rows)}", lambda: [by_end.format(i) for i in range(min(500, rows))])
+    print(f"  {len(active):,} active")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
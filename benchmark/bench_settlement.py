@@ -0,0 +1,237 @@
+"""Settlement throughput against the number of workers.
+
+Seeds N pending payments on existing subscriptions, then settles every
+pending payment with ott_settlement at each worker count, restoring the
+pending state between rounds. Reported per round: payments/s, speedup over
+the first pool and scaling efficiency (throughput per worker against the
+first pool's). Each round is checked afterwards; the exit code is 1 if a
+check fails or efficiency drops below --min-efficiency:
+
+  - nothing is left pending and every payment was settled exactly once
+  - every settled payment got exactly one Payment_Log row
+  - no payment was inserted (the auto-renew trigger stays quiet)
+  - every subscription moved by its plan duration once per successful payment,
+    replayed batch by batch: each batch extends by months * payments in one
+    DATE_ADD, which clamps to the end of the month at every step
+
+Scaling holds while the gateway round trip dominates and the server has
+cores to spare; --compare-locking also runs the largest pool with plain
+FOR UPDATE, where workers queue behind each other's claims. Payments,
+logs and subscription dates are restored at the end unless --keep is
+given. Meant for a scratch database (see benchmark.datagen).
+
+    python -m benchmark.bench_settlement --payments 5000 --workers 1,2,4,8
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from db_connect import connect_db
+import ott_settlement
+from benchmark.soak_test import add_months
+
+METHODS = ["card", "upi", "netbanking", "wallet"]
+CHUNK = 1000
+
+
+def _rows(conn, query, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _chunks(values, size=CHUNK):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _marks(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def seed_payments(conn, count, subscriptions, rng):
+    """Insert count pending payments over a sample of subscriptions"""
+    subs = _rows(conn, """SELECT US.subscription_id, SP.price FROM User_Subscription US
+                          JOIN Subscription_Plan SP ON SP.plan_id = US.plan_id
+                          ORDER BY US.subscription_id LIMIT %s""", (subscriptions,))
+    if not subs:
+        raise SystemExit("No subscriptions to pay for; load data with benchmark.datagen first")
+    rows = [(*rng.choice(subs), rng.choice(METHODS), "pending") for _ in range(count)]
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunks(rows):
+            cursor.executemany("""INSERT INTO Payment (subscription_id, amount, payment_method, status)
+                                  VALUES (%s, %s, %s, %s)""", chunk)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def capture(conn):
+    """Pending payment ids, their subscriptions' dates and plan lengths, and the id marks"""
+    payments = [row[0] for row in _rows(conn, "SELECT payment_id FROM Payment WHERE status = 'pending'")]
+    subs = {sub_id: (end_date, status, months) for sub_id, end_date, status, months in _rows(
+        conn, """SELECT US.subscription_id, US.end_date, US.status, SP.duration_months
+                 FROM User_Subscription US JOIN Subscription_Plan SP ON SP.plan_id = US.plan_id
+                 WHERE US.subscription_id IN (SELECT subscription_id FROM Payment WHERE status = 'pending')""")}
+    max_payment = _rows(conn, "SELECT COALESCE(MAX(payment_id), 0) FROM Payment")[0][0]
+    max_log = _rows(conn, "SELECT COALESCE(MAX(log_id), 0) FROM Payment_Log")[0][0]
+    return {"payments": payments, "subs": subs, "max_payment": max_payment, "max_log": max_log}
+
+
+def restore(conn, state):
+    """Put the captured payments back to pending and the subscriptions back to their dates"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET @ott_skip_auto_renew = 1")
+        for chunk in _chunks(state["payments"]):
+            cursor.execute(f"UPDATE Payment SET status = 'pending' WHERE payment_id IN ({_marks(chunk)})", chunk)
+        cursor.execute("DELETE FROM Payment_Log WHERE log_id > %s", (state["max_log"],))
+        cursor.executemany("UPDATE User_Subscription SET end_date = %s, status = %s WHERE subscription_id = %s",
+                           [(end_date, status, sub_id) for sub_id, (end_date, status, _) in state["subs"].items()])
+        cursor.execute("SET @ott_skip_auto_renew = NULL")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def check(conn, state, result, periods):
+    """Problems found after a round, as strings.
+
+    periods maps each subscription to the periods its committed batches paid
+    for, in the order the workers reported them.
+    """
+    problems = []
+    ids = state["payments"]
+    statuses, logs, successes = Counter(), Counter(), Counter()
+    for chunk in _chunks(ids):
+        for sub_id, status in _rows(conn, f"SELECT subscription_id, status FROM Payment WHERE payment_id IN ({_marks(chunk)})",
+                                    chunk):
+            statuses[status] += 1
+            if status == "success":
+                successes[sub_id] += 1
+    for payment_id, count in _rows(conn, """SELECT payment_id, COUNT(*) FROM Payment_Log
+                                            WHERE log_id > %s GROUP BY payment_id""", (state["max_log"],)):
+        logs[count] += 1
+    if statuses["pending"]:
+        problems.append(f"{statuses['pending']:,} payments still pending")
+    if result.succeeded != statuses["success"] or result.failed != statuses["failed"]:
+        problems.append(f"workers report {result.succeeded:,}/{result.failed:,} succeeded/failed, "
+                        f"table has {statuses['success']:,}/{statuses['failed']:,}")
+    if sum(logs.values()) != len(ids) or set(logs) - {1}:
+        problems.append(f"Payment_Log rows per payment {dict(logs)} for {len(ids):,} payments")
+    new_payments = _rows(conn, "SELECT COUNT(*) FROM Payment WHERE payment_id > %s", (state["max_payment"],))[0][0]
+    if new_payments:
+        problems.append(f"{new_payments:,} payments inserted during settlement")
+    unpaid = sum(1 for sub_id, count in successes.items() if sum(periods.get(sub_id, ())) != count)
+    if unpaid:
+        problems.append(f"{unpaid:,} subscriptions whose successful payments the workers did not report")
+    drift = 0
+    subs = state["subs"]
+    for chunk in _chunks(list(subs)):
+        for sub_id, end_date in _rows(conn, f"SELECT subscription_id, end_date FROM User_Subscription "
+                                            f"WHERE subscription_id IN ({_marks(chunk)})", chunk):
+            expected, _, months = subs[sub_id]
+            for paid in periods.get(sub_id, ()):
+                expected = add_months(expected, months * paid)
+            if end_date != expected:
+                drift += 1
+    if drift:
+        problems.append(f"{drift:,} subscriptions not extended once per successful payment")
+    return problems
+
+
+def run_round(workers, args, skip_locked=True):
+    """(Settlement, seconds, gateway, {subscription: periods per committed batch})"""
+    gateway = ott_settlement.StubGateway(args.latency_ms / 1000, args.failure_rate, args.seed)
+    periods = defaultdict(list)
+    lock = threading.Lock()
+
+    def progress(succeeded, failed):
+        batch = Counter(payment.subscription_id for payment in succeeded)
+        with lock:
+            for sub_id, paid in batch.items():
+                periods[sub_id].append(paid)
+
+    started = time.perf_counter()
+    result = ott_settlement.total(ott_settlement.run_workers(workers, gateway, args.batch, progress,
+                                                             skip_locked=skip_locked))
+    return result, time.perf_counter() - started, gateway, periods
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure settlement throughput by worker count")
+    parser.add_argument("--payments", type=int, default=5000, help="pending payments to seed")
+    parser.add_argument("--subscriptions", type=int, default=500, help="subscriptions the payments spread over")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--batch", type=int, default=ott_settlement.BATCH_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="stub gateway time per charge")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--min-efficiency", type=float, default=0.75,
+                        help="fail when throughput per worker falls below this share of one worker's")
+    parser.add_argument("--compare-locking", action="store_true",
+                        help="also run the largest pool with FOR UPDATE instead of FOR UPDATE SKIP LOCKED")
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded payments as the last round settled them")
+    args = parser.parse_args(argv)
+    counts = [int(count) for count in args.workers.split(",")]
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    before = capture(conn)
+    seed_payments(conn, args.payments, args.subscriptions, random.Random(args.seed))
+    state = capture(conn)
+    state["max_payment"], state["max_log"] = before["max_payment"], before["max_log"]
+    print(f"{len(state['payments']):,} pending payments over {len(state['subs']):,} subscriptions, "
+          f"gateway {args.latency_ms:g} ms per charge, batches of {args.batch}")
+
+    problems = []
+    rounds = [(workers, True) for workers in counts]
+    if args.compare_locking:
+        rounds.append((max(counts), False))
+    print(f"{'workers':>8}{'claim':>14}{'seconds':>9}{'payments/s':>12}{'speedup':>9}{'efficiency':>11}{'retries':>9}")
+    base = None
+    try:
+        for i, (workers, skip_locked) in enumerate(rounds):
+            result, seconds, gateway, periods = run_round(workers, args, skip_locked)
+            rate = (result.succeeded + result.failed) / seconds
+            if base is None:
+                base = (rate, workers)
+            speedup = rate / base[0]
+            efficiency = (rate / workers) / (base[0] / base[1])
+            claim = "SKIP LOCKED" if skip_locked else "FOR UPDATE"
+            print(f"{workers:>8}{claim:>14}{seconds:>9.2f}{rate:>12,.0f}{speedup:>9.2f}{efficiency:>11.0%}"
+                  f"{result.retries:>9}")
+            for problem in check(conn, state, result, periods):
+                problems.append(f"{workers} workers ({claim}): {problem}")
+            if gateway.repeats:
+                print(f"  {gateway.repeats} payments charged again after a retried batch (same outcome)")
+            if skip_locked and workers > base[1] and efficiency < args.min_efficiency:
+                problems.append(f"{workers} workers: efficiency {efficiency:.0%} < {args.min_efficiency:.0%}")
+            if i < len(rounds) - 1:
+                restore(conn, state)
+    finally:
+        if not args.keep:
+            restore(conn, state)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM Payment WHERE payment_id > %s", (before["max_payment"],))
+            conn.commit()
+            cursor.close()
+        conn.close()
+
+    if problems:
+        print("\nFAILED:\n  " + "\n  ".join(problems))
+        return 1
+    print("\nAll rounds settled every payment exactly once.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
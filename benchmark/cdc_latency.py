@@ -0,0 +1,85 @@
+"""Commit-to-event latency of the binlog consumer.
+
+Inserts Payment rows one at a time against a local MySQL with binlog enabled
+(see ott_cdc.py), times each commit until the matching row event reaches an
+EventBus subscriber, then deletes the rows it created.
+
+    python -m benchmark.cdc_latency --events 500 --interval 0.01
+"""
+import argparse
+import sys
+import threading
+import time
+
+from db_connect import connect_db
+import ott_cdc
+from benchmark.harness import percentile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure binlog change-to-event latency")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between writes")
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for each event")
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(subscription_id) FROM User_Subscription")
+    sub_id = cursor.fetchone()[0]
+
+    committed = {}
+    arrived = {}
+    seen = threading.Condition()
+
+    def on_payment(event):
+        if event.action != "insert":
+            return
+        now = time.perf_counter()
+        with seen:
+            arrived[event.after["payment_id"]] = now
+            seen.notify_all()
+
+    bus = ott_cdc.EventBus()
+    bus.subscribe("Payment", on_payment)
+    consumer = ott_cdc.BinlogConsumer(bus, tables=["Payment"]).start()
+    time.sleep(0.5)  # let the stream connect before the first write
+
+    latencies = []
+    missed = 0
+    try:
+        for _ in range(args.events):
+            # 'failed' payments do not fire payment_success_log
+            cursor.execute("""INSERT INTO Payment (subscription_id, amount, payment_method, status)
+                              VALUES (%s, 0.01, 'card', 'failed')""", (sub_id,))
+            payment_id = cursor.lastrowid
+            committed[payment_id] = time.perf_counter()
+            conn.commit()
+            with seen:
+                if not seen.wait_for(lambda: payment_id in arrived, timeout=args.timeout):
+                    missed += 1
+                    continue
+            latencies.append((arrived[payment_id] - committed[payment_id]) * 1000)
+            time.sleep(args.interval)
+    finally:
+        consumer.stop()
+        if committed:
+            ids = list(committed)
+            cursor.execute(f"DELETE FROM Payment WHERE payment_id IN ({', '.join(['%s'] * len(ids))})", ids)
+            conn.commit()
+        conn.close()
+
+    latencies.sort()
+    if not latencies:
+        print(f"No events received ({missed} missed). Is binlog_format=ROW enabled?")
+        return 1
+    print(f"{len(latencies)} events, {missed} missed")
+    print(f"commit-to-event ms: p50 {percentile(latencies, 50):.2f}  p95 {percentile(latencies, 95):.2f}  "
+          f"p99 {percentile(latencies, 99):.2f}  max {latencies[-1]:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""Deterministic synthetic data generator for the OTT schema.
+
+Loads content, users, subscriptions, payments, profiles, devices, watch
+history and reviews on top of whatever ott.sql already seeded. The same
+--scale and --seed always produce the same rows.
+
+    python -m benchmark.datagen --scale 10
+    python -m benchmark.datagen --scale 1000 --seed 7 --batch 5000
+
+Point DB_NAME in .env at a scratch database created from ott.sql; the
+generator only appends, it never deletes.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from db_connect import connect_db
+
+# Rows generated per 1x of scale
+USERS_PER_SCALE = 1000
+BASE_CONTENT = 200
+# Every Nth title, if it is a series, runs for this many seasons
+LONG_RUNNING_EVERY = 50
+LONG_RUNNING_SEASONS = 30
+
+# Fixed "today" so generated statuses do not depend on the day the loader ran
+REF_DATE = date(2025, 11, 1)
+REG_START = date(2022, 1, 1)
+REG_DAYS = (date(2025, 6, 30) - REG_START).days
+
+FIRST_NAMES = ["Aisha", "Suraj", "Rohit", "Neha", "Arjun", "Sara", "Dev", "Priya",
+               "Vikram", "Tia", "Kabir", "Meera", "Ishaan", "Ananya", "Rahul", "Zara"]
+LAST_NAMES = ["Rahal", "Patel", "Khan", "Sharma", "Verma", "Menon", "Kapoor", "Singh",
+              "Nair", "Rao", "Iyer", "Das", "Bose", "Gupta", "Joshi", None]
+LANGUAGES = ["English", "Hindi", "Spanish", "Tamil", "Korean", "Japanese", "French"]
+RATINGS = ["G", "PG", "PG-13", "R", "NC-17"]
+PAYMENT_METHODS = ["card", "upi", "netbanking", "wallet"]
+DEVICE_TYPES = ["TV", "Mobile", "Laptop", "Tablet", "Other"]
+REVIEW_TEXTS = ["Loved it.", "Not bad.", "Could not finish.", "Great cast!",
+                "Binge-worthy.", "Too slow for me.", None]
+
+# Insert order respects foreign keys
+INSERTS = [
+    ("User", "INSERT INTO User (user_id, first_name, last_name, registration_date) "
+             "VALUES (%s, %s, %s, %s)"),
+    ("User_Email", "INSERT INTO User_Email (email_id, user_id, email) VALUES (%s, %s, %s)"),
+    ("User_Phone", "INSERT INTO User_Phone (phone_id, user_id, phone_number) VALUES (%s, %s, %s)"),
+    ("User_Subscription", "INSERT INTO User_Subscription (subscription_id, user_id, plan_id, "
+                          "start_date, end_date, status, auto_renewal) "
+                          "VALUES (%s, %s, %s, %s, %s, %s, %s)"),
+    ("Payment", "INSERT INTO Payment (payment_id, subscription_id, amount, payment_date, "
+                "payment_method, status) VALUES (%s, %s, %s, %s, %s, %s)"),
+    ("Profile", "INSERT INTO Profile (profile_id, user_id, profile_name, age_restriction, "
+                "is_kids_profile) VALUES (%s, %s, %s, %s, %s)"),
+    ("Device", "INSERT INTO Device (device_id, user_id, device_name, device_type, last_used) "
+               "VALUES (%s, %s, %s, %s, %s)"),
+    ("Watch_History", "INSERT INTO Watch_History (history_id, profile_id, content_id, episode_id, "
+                      "device_id, watch_date, completion_percentage) "
+                      "VALUES (%s, %s, %s, %s, %s, %s, %s)"),
+    ("Rating_Review", "INSERT INTO Rating_Review (review_id, profile_id, content_id, rating, "
+                      "review_text) VALUES (%s, %s, %s, %s, %s)"),
+]
+
+CONTENT_INSERTS = [
+    ("Content", "INSERT INTO Content (content_id, title, description, release_date, "
+                "content_type, rating, language) VALUES (%s, %s, %s, %s, %s, %s, %s)"),
+    ("Content_Genre", "INSERT INTO Content_Genre (content_id, genre_id) VALUES (%s, %s)"),
+    ("Season", "INSERT INTO Season (season_id, content_id, season_number, title, total_episodes) "
+               "VALUES (%s, %s, %s, %s, %s)"),
+    ("Episode", "INSERT INTO Episode (episode_id, season_id, episode_number, title, duration) "
+                "VALUES (%s, %s, %s, %s, %s)"),
+]
+
+ID_COLUMNS = {
+    "User": "user_id", "User_Email": "email_id", "User_Phone": "phone_id",
+    "User_Subscription": "subscription_id", "Payment": "payment_id",
+    "Profile": "profile_id", "Device": "device_id", "Watch_History": "history_id",
+    "Rating_Review": "review_id", "Content": "content_id", "Season": "season_id",
+    "Episode": "episode_id",
+}
+
+
+def scale_counts(scale):
+    """Row targets for a scale factor (1x ... 1000x)"""
+    users = int(USERS_PER_SCALE * scale)
+    # Catalogs grow much slower than audiences
+    content = max(BASE_CONTENT, int(BASE_CONTENT * scale ** 0.5))
+    return {"users": users, "content": content}
+
+
+def next_ids(cursor):
+    """First free id per table, so generated rows sit after the seed data"""
+    ids = {}
+    for table, column in ID_COLUMNS.items():
+        cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+        ids[table] = cursor.fetchone()[0]
+    return ids
+
+
+def load_lookups(cursor):
+    cursor.execute("SELECT plan_id, price, duration_months FROM Subscription_Plan ORDER BY plan_id")
+    plans = cursor.fetchall()
+    cursor.execute("SELECT genre_id FROM Genre ORDER BY genre_id")
+    genres = [row[0] for row in cursor.fetchall()]
+    if not plans or not genres:
+        raise RuntimeError("Subscription_Plan and Genre must be seeded from ott.sql first")
+    return plans, genres
+
+
+class Loader:
+    """Buffers rows per table and flushes them with executemany"""
+
+    def __init__(self, conn, statements, batch):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.statements = statements
+        self.batch = batch
+        self.buffers = {table: [] for table, _ in statements}
+        self.counts = {table: 0 for table, _ in statements}
+
+    def add(self, table, row):
+        self.buffers[table].append(row)
+
+    def pending(self):
+        return max(len(rows) for rows in self.buffers.values())
+
+    def flush(self):
+        for table, sql in self.statements:
+            rows = self.buffers[table]
+            for start in range(0, len(rows), self.batch):
+                self.cursor.executemany(sql, rows[start:start + self.batch])
+            self.counts[table] += len(rows)
+            rows.clear()
+        self.conn.commit()
+
+
+def generate_content(rng, loader, ids, genres, count):
+    """Create the catalog; returns [(content_id, [episode_id, ...]), ...]"""
+    catalog = []
+    content_id, season_id, episode_id = ids["Content"], ids["Season"], ids["Episode"]
+    for n in range(count):
+        content_type = "series" if rng.random() < 0.4 else "movie"
+        release = date(1990, 1, 1) + timedelta(days=rng.randrange(12000))
+        loader.add("Content", (content_id, f"Bench Title {content_id}",
+                               f"Synthetic {content_type} #{n}", release, content_type,
+                               rng.choice(RATINGS), rng.choice(LANGUAGES)))
+        for genre_id in rng.sample(genres, rng.randint(1, 3)):
+            loader.add("Content_Genre", (content_id, genre_id))
+
+        episodes = []
+        if content_type == "series":
+            season_count = rng.randint(1, 6)
+            if n % LONG_RUNNING_EVERY == 0:
+                season_count = LONG_RUNNING_SEASONS
+            for season_number in range(1, season_count + 1):
+                total = rng.randint(6, 12)
+                loader.add("Season", (season_id, content_id, season_number,
+                                      f"Bench Title {content_id} S{season_number}", total))
+                for episode_number in range(1, total + 1):
+                    loader.add("Episode", (episode_id, season_id, episode_number,
+                                           f"Episode {episode_number}", rng.randint(20, 65)))
+                    episodes.append(episode_id)
+                    episode_id += 1
+                season_id += 1
+        catalog.append((content_id, episodes))
+        content_id += 1
+    loader.flush()
+    return catalog
+
+
+def generate_user(rng, loader, ids, plans, catalog):
+    """Create one user together with every row that hangs off it"""
+    uid = ids["User"]
+    registered = REG_START + timedelta(days=rng.randrange(REG_DAYS))
+    first = rng.choice(FIRST_NAMES)
+    loader.add("User", (uid, first, rng.choice(LAST_NAMES), registered))
+
+    loader.add("User_Email", (ids["User_Email"], uid, f"user{uid}@bench.example"))
+    ids["User_Email"] += 1
+    if rng.random() < 0.1:
+        loader.add("User_Email", (ids["User_Email"], uid, f"user{uid}.alt@bench.example"))
+        ids["User_Email"] += 1
+    loader.add("User_Phone", (ids["User_Phone"], uid, f"7{uid:011d}"))
+    ids["User_Phone"] += 1
+
+    # Subscriptions are back to back from the registration date
+    start = registered
+    for _ in range(rng.choices([1, 2, 3, 4], weights=[50, 25, 15, 10])[0]):
+        plan_id, price, months = rng.choice(plans)
+        end = start + timedelta(days=30 * months)
+        if end >= REF_DATE:
+            status = "active"
+        else:
+            status = "cancelled" if rng.random() < 0.1 else "expired"
+        sub_id = ids["User_Subscription"]
+        loader.add("User_Subscription", (sub_id, uid, plan_id, start, end, status,
+                                         rng.random() < 0.5))
+        ids["User_Subscription"] += 1
+        for attempt in range(rng.randint(1, 3)):
+            paid_at = datetime.combine(start, datetime.min.time()) + timedelta(
+                days=attempt, seconds=rng.randrange(86400))
+            status_roll = rng.random()
+            pay_status = "success" if status_roll < 0.85 else ("failed" if status_roll < 0.95 else "pending")
+            loader.add("Payment", (ids["Payment"], sub_id, price, paid_at,
+                                   rng.choice(PAYMENT_METHODS), pay_status))
+            ids["Payment"] += 1
+        start = end + timedelta(days=1)
+        if start >= REF_DATE:
+            break
+
+    devices = []
+    for _ in range(rng.randint(1, 3)):
+        device_type = rng.choice(DEVICE_TYPES)
+        last_used = datetime.combine(registered, datetime.min.time()) + timedelta(
+            seconds=rng.randrange(max(1, (REF_DATE - registered).days) * 86400))
+        loader.add("Device", (ids["Device"], uid, f"{first} {device_type} {ids['Device']}",
+                              device_type, last_used))
+        devices.append(ids["Device"])
+        ids["Device"] += 1
+
+    for index in range(rng.randint(1, 3)):
+        kids = index > 0 and rng.random() < 0.3
+        profile_id = ids["Profile"]
+        loader.add("Profile", (profile_id, uid, f"{first}_{'Kids' if kids else index}",
+                               10 if kids else 18, kids))
+        ids["Profile"] += 1
+
+        watched = rng.sample(catalog, min(len(catalog), rng.randint(3, 30)))
+        for content_id, episodes in watched:
+            for _ in range(rng.randint(1, 3)):
+                episode_id = rng.choice(episodes) if episodes else None
+                watched_at = datetime.combine(registered, datetime.min.time()) + timedelta(
+                    seconds=rng.randrange(max(1, (REF_DATE - registered).days) * 86400))
+                completion = 100.0 if rng.random() < 0.4 else round(rng.uniform(1, 99), 2)
+                loader.add("Watch_History", (ids["Watch_History"], profile_id, content_id,
+                                             episode_id, rng.choice(devices), watched_at, completion))
+                ids["Watch_History"] += 1
+        for content_id, _ in watched[:rng.randint(0, 3)]:
+            loader.add("Rating_Review", (ids["Rating_Review"], profile_id, content_id,
+                                         rng.randint(1, 5), rng.choice(REVIEW_TEXTS)))
+            ids["Rating_Review"] += 1
+    ids["User"] += 1
+
+
+def generate(conn, scale=1, seed=42, batch=2000, chunk_users=1000, fast=True, progress=print):
+    """Load a full synthetic data set; returns rows inserted per table"""
+    rng = random.Random(seed)
+    counts = scale_counts(scale)
+    cursor = conn.cursor()
+    if fast:
+        # Rows are generated consistently, so per-row FK checks only cost time
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
+
+    plans, genres = load_lookups(cursor)
+    ids = next_ids(cursor)
+
+    content_loader = Loader(conn, CONTENT_INSERTS, batch)
+    catalog = generate_content(rng, content_loader, ids, genres, counts["content"])
+    progress(f"content: {content_loader.counts}")
+
+    loader = Loader(conn, INSERTS, batch)
+    started = time.perf_counter()
+    for n in range(1, counts["users"] + 1):
+        generate_user(rng, loader, ids, plans, catalog)
+        if n % chunk_users == 0:
+            loader.flush()
+            rate = n / (time.perf_counter() - started)
+            progress(f"users: {n}/{counts['users']} ({rate:,.0f}/s)")
+    loader.flush()
+
+    if fast:
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.execute("SET SESSION unique_checks = 1")
+    return {**content_loader.counts, **loader.counts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load synthetic OTT data")
+    parser.add_argument("--scale", type=float, default=1, help="scale factor, 1x = 1000 users")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=2000, help="rows per INSERT statement")
+    parser.add_argument("--safe", action="store_true", help="keep FK/unique checks on while loading")
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    started = time.perf_counter()
+    totals = generate(conn, scale=args.scale, seed=args.seed, batch=args.batch, fast=not args.safe)
+    conn.close()
+
+    print(f"\nLoaded in {time.perf_counter() - started:.1f}s")
+    for table, rows in totals.items():
+        print(f"  {table:<20}{rows:>12,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""Latency harness for the OTT queries and stored routines.
+
+Runs every query issued by ott_gui.py plus every procedure and function in
+ott.sql, reports the latency distribution per case and compares it with a
+stored baseline.
+
+    python -m benchmark.harness --save-baseline     # record benchmark/baseline.json
+    python -m benchmark.harness                     # compare, exit 1 on regression
+    python -m benchmark.harness --only search --iterations 200
+
+Write routines (AddNewUser, RenewSubscription) run inside a transaction that
+is rolled back, so the data set is unchanged after a run.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+from db_connect import connect_db
+import ott_service as svc
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Regressions are only reported past both thresholds, to ignore timer noise
+DEFAULT_TOLERANCE = 0.25
+MIN_DELTA_MS = 0.5
+
+
+class Case:
+    """One benchmarked statement: plain SQL or a stored procedure"""
+
+    def __init__(self, name, sql=None, proc=None, params=None, writes=False):
+        self.name = name
+        self.sql = sql
+        self.proc = proc
+        self.params = params or (lambda ctx, i: None)
+        self.writes = writes
+
+    def run(self, cursor, ctx, i):
+        """Execute once and drain every row; returns the row count"""
+        params = self.params(ctx, i)
+        if self.proc:
+            cursor.callproc(self.proc, list(params or ()))
+            return sum(len(result.fetchall()) for result in cursor.stored_results())
+        cursor.execute(self.sql, params)
+        return len(cursor.fetchall()) if cursor.with_rows else cursor.rowcount
+
+
+def sample_context(cursor):
+    """Pick representative ids and search terms from the loaded data"""
+    ctx = {}
+    for key, sql in [
+        ("sub_ids", "SELECT subscription_id FROM User_Subscription ORDER BY subscription_id LIMIT 100"),
+        ("user_ids", "SELECT user_id FROM User ORDER BY user_id LIMIT 100"),
+        ("content_ids", "SELECT content_id FROM Content ORDER BY content_id LIMIT 100"),
+        ("profile_ids", """SELECT profile_id FROM Watch_History
+                           GROUP BY profile_id ORDER BY COUNT(*) DESC LIMIT 100"""),
+        ("series_ids", """SELECT content_id FROM Season
+                          GROUP BY content_id ORDER BY COUNT(*) DESC LIMIT 20"""),
+        ("season_ids", """SELECT e.season_id FROM Episode e JOIN Watch_History wh ON wh.episode_id = e.episode_id
+                          GROUP BY e.season_id ORDER BY COUNT(*) DESC LIMIT 20"""),
+    ]:
+        cursor.execute(sql)
+        ctx[key] = [row[0] for row in cursor.fetchall()] or [1]
+    ctx["names"] = ["Aisha", "Sharma", "example", "zzz-no-match"]
+    ctx["titles"] = ["Stranger", "English", "Bench Title 1", "zzz-no-match"]
+    return ctx
+
+
+def pick(ctx, key, i):
+    values = ctx[key]
+    return values[i % len(values)]
+
+
+def like(ctx, key, i, times):
+    return (f"%{pick(ctx, key, i)}%",) * times
+
+
+# Statements as issued through ott_service by ott_gui.py
+CASES = [
+    # Users tab
+    Case("view_users", svc.USER_LIST_SQL),
+    Case("search_users", svc.USER_SEARCH_SQL, params=lambda ctx, i: like(ctx, "names", i, 1)),
+    # Subscriptions tab
+    Case("view_subscriptions", svc.SUBSCRIPTION_LIST_SQL),
+    # Content tab
+    Case("view_content", svc.CONTENT_LIST_SQL),
+    Case("search_content", svc.CONTENT_SEARCH_SQL, params=lambda ctx, i: like(ctx, "titles", i, 2)),
+    Case("series_seasons", svc.SEASONS_SQL, params=lambda ctx, i: (pick(ctx, "series_ids", i),)),
+    Case("season_episodes", svc.EPISODES_SQL, params=lambda ctx, i: (pick(ctx, "season_ids", i),)),
+    # Analytics tab
+    Case("view_logs", svc.PAYMENT_LOG_SQL, params=lambda ctx, i: (20,)),
+    Case("payment_summary", svc.PAYMENT_SUMMARY_SQL),
+    Case("watch_stats", svc.WATCH_STATS_SQL, params=lambda ctx, i: (15,)),
+    Case("revenue_total", svc.REVENUE_TOTAL_SQL),
+    Case("revenue_month", svc.REVENUE_MONTH_SQL),
+    Case("payment_success_count", svc.PAYMENT_SUCCESS_COUNT_SQL),
+    Case("payment_count", svc.PAYMENT_COUNT_SQL),
+    Case("user_count", svc.USER_COUNT_SQL),
+    Case("active_sub_count", svc.ACTIVE_SUB_COUNT_SQL),
+    Case("new_users_month", svc.NEW_USERS_MONTH_SQL),
+    Case("payment_methods", svc.PAYMENT_METHODS_SQL),
+    Case("plan_stats", svc.PLAN_STATS_SQL),
+    Case("content_count", svc.CONTENT_COUNT_SQL),
+    Case("content_type_count", svc.CONTENT_TYPE_COUNT_SQL,
+         params=lambda ctx, i: (("movie", "series")[i % 2],)),
+    # Devices tab
+    Case("view_devices", svc.DEVICE_LIST_SQL),
+    Case("search_devices", svc.DEVICE_SEARCH_SQL[True, True],
+         params=lambda ctx, i: like(ctx, "names", i, 3) + (svc.DEVICE_TYPES[i % 3],)),
+    Case("device_type_counts", svc.DEVICE_TYPE_COUNTS_SQL),
+    Case("active_users", svc.ACTIVE_USERS_SQL, params=lambda ctx, i: (10,)),
+    # Stored procedures
+    Case("proc_AddNewUser", proc="AddNewUser", writes=True,
+         params=lambda ctx, i: ("Bench", "User", f"harness{i}@bench.example", f"6{i:011d}")),
+    Case("proc_RenewSubscription", proc="RenewSubscription", writes=True,
+         params=lambda ctx, i: (pick(ctx, "sub_ids", i),)),
+    Case("proc_GetWatchHistory", proc="GetWatchHistory",
+         params=lambda ctx, i: (pick(ctx, "profile_ids", i),)),
+    Case("proc_TopRatedContent", proc="TopRatedContent",
+         params=lambda ctx, i: ((5, 10, 50)[i % 3],)),
+    Case("proc_ContinueWatching", proc="ContinueWatching",
+         params=lambda ctx, i: (pick(ctx, "profile_ids", i), 10)),
+    Case("proc_RecommendForProfile", proc="RecommendForProfile",
+         params=lambda ctx, i: (pick(ctx, "profile_ids", i), 10)),
+    # Functions
+    Case("func_DaysLeft", "SELECT DaysLeft(%s)", params=lambda ctx, i: (pick(ctx, "sub_ids", i),)),
+    Case("func_IsActive", "SELECT IsActive(%s)", params=lambda ctx, i: (pick(ctx, "user_ids", i),)),
+    Case("func_AvgContentRating", "SELECT AvgContentRating(%s)",
+         params=lambda ctx, i: (pick(ctx, "content_ids", i),)),
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(timings_ms, rows):
+    timings = sorted(timings_ms)
+    return {
+        "n": len(timings),
+        "mean_ms": sum(timings) / len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+        "p99_ms": percentile(timings, 99),
+        "max_ms": timings[-1],
+        "rows": rows,
+    }
+
+
+def run_case(conn, case, ctx, iterations, warmup):
+    cursor = conn.cursor()
+    timings = []
+    rows = 0
+    for i in range(warmup + iterations):
+        started = time.perf_counter()
+        rows = case.run(cursor, ctx, i)
+        elapsed = (time.perf_counter() - started) * 1000
+        if case.writes:
+            conn.rollback()
+        if i >= warmup:
+            timings.append(elapsed)
+    cursor.close()
+    return summarize(timings, rows)
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of human-readable regression messages"""
+    problems = []
+    for name, result in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            limit = base[metric] * (1 + tolerance)
+            if result[metric] > limit and result[metric] - base[metric] > MIN_DELTA_MS:
+                problems.append(f"{name}: {metric} {result[metric]:.2f} ms > "
+                                f"baseline {base[metric]:.2f} ms (+{tolerance:.0%})")
+        if base.get("rows") is not None and result["rows"] != base["rows"]:
+            problems.append(f"{name}: returned {result['rows']} rows, baseline {base['rows']}")
+    return problems
+
+
+def print_report(results, baseline):
+    base_cases = baseline.get("cases", {}) if baseline else {}
+    print(f"{'case':<26}{'n':>6}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+          f"{'rows':>10}{'vs base':>10}")
+    for name, r in results.items():
+        base = base_cases.get(name)
+        delta = f"{(r['p50_ms'] / base['p50_ms'] - 1):+.0%}" if base and base["p50_ms"] else "-"
+        print(f"{name:<26}{r['n']:>6}{r['mean_ms']:>10.2f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}{r['rows']:>10}{delta:>10}")
+
+
+def table_sizes(cursor):
+    sizes = {}
+    for table in ("User", "User_Subscription", "Payment", "Watch_History", "Content", "Device"):
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        sizes[table] = cursor.fetchone()[0]
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark OTT queries and stored routines")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--only", help="run cases whose name contains this text")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    cursor = conn.cursor()
+    ctx = sample_context(cursor)
+    sizes = table_sizes(cursor)
+    cursor.close()
+    print("Data set:", ", ".join(f"{table}={rows:,}" for table, rows in sizes.items()))
+
+    results = {}
+    for case in CASES:
+        if args.only and args.only not in case.name:
+            continue
+        results[case.name] = run_case(conn, case, ctx, args.iterations, args.warmup)
+    conn.close()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"recorded": datetime.now().isoformat(timespec="seconds"),
+                       "host": platform.node(), "tables": sizes, "cases": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("\nNo baseline yet; run with --save-baseline to record one.")
+        return 0
+    if baseline.get("tables") != sizes:
+        print("\nWarning: data set differs from the baseline, comparison may be meaningless.")
+    problems = compare(results, baseline, args.tolerance)
+    if problems:
+        print("\nRegressions:")
+        for problem in problems:
+            print("  " + problem)
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
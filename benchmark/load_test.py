@@ -0,0 +1,112 @@
+"""Load test for the local read API (ott_api.py).
+
+Runs N concurrent clients against a running server for a fixed time. Each
+client loops over a mix of endpoints, revalidating with If-None-Match like a
+well-behaved consumer. Reports requests/sec, status counts and latency
+percentiles per endpoint and overall.
+
+    python ott_api.py &
+    python -m benchmark.load_test --clients 1000 --duration 30
+
+1000 clients need 1000 sockets on each side; raise `ulimit -n` first if the
+default is 1024. Needs aiohttp.
+"""
+import argparse
+import asyncio
+import importlib.util
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+from benchmark.harness import percentile
+
+# (path, weight): mostly list pages, some search and analytics
+MIX = [
+    ("/users?limit=50", 20),
+    ("/users?q=a&limit=20", 5),
+    ("/subscriptions?limit=50", 15),
+    ("/content?limit=50", 20),
+    ("/content?q=the&limit=20", 10),
+    ("/content/top-rated?n=10", 15),
+    ("/analytics", 15),
+]
+
+
+async def client(session, base_url, deadline, latencies, statuses, rng, revalidate):
+    paths = [path for path, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    etags = {}
+    while time.perf_counter() < deadline:
+        path = rng.choices(paths, weights)[0]
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        started = time.perf_counter()
+        try:
+            async with session.get(base_url + path, headers=headers) as response:
+                await response.read()
+                status = response.status
+                if status == 200 and "ETag" in response.headers:
+                    etags[path] = response.headers["ETag"]
+        except Exception as e:
+            status = type(e).__name__
+        latencies[path.split("?")[0]].append((time.perf_counter() - started) * 1000)
+        statuses[status] += 1
+
+
+async def run(base_url, clients, duration, revalidate, seed):
+    import aiohttp
+
+    latencies = defaultdict(list)
+    statuses = Counter()
+    connector = aiohttp.TCPConnector(limit=clients)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # One warm request so the first wave does not all miss the cache
+        async with session.get(base_url + "/health") as response:
+            await response.read()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(client(session, base_url, deadline, latencies, statuses,
+                                      random.Random(seed + i), revalidate) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def report(latencies, statuses, elapsed):
+    total = sum(statuses.values())
+    print(f"{total:,} requests in {elapsed:.1f}s = {total / elapsed:,.0f} req/s")
+    print("status: " + ", ".join(f"{status} x{count:,}" for status, count in statuses.most_common()))
+    print(f"{'endpoint':<22}{'count':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    every = []
+    for path in sorted(latencies):
+        samples = sorted(latencies[path])
+        every.extend(samples)
+        print(f"{path:<22}{len(samples):>9,}{percentile(samples, 50):>9.1f}{percentile(samples, 95):>9.1f}"
+              f"{percentile(samples, 99):>9.1f}{samples[-1]:>9.1f}")
+    every.sort()
+    if every:
+        print(f"{'all':<22}{len(every):>9,}{percentile(every, 50):>9.1f}{percentile(every, 95):>9.1f}"
+              f"{percentile(every, 99):>9.1f}{every[-1]:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-client load test for ott_api.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--no-etag", action="store_true", help="never send If-None-Match")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    if importlib.util.find_spec("aiohttp") is None:
+        print("The load test needs aiohttp: pip install aiohttp")
+        return 1
+    latencies, statuses, elapsed = asyncio.run(run(args.url.rstrip("/"), args.clients, args.duration,
+                                                   not args.no_etag, args.seed))
+    report(latencies, statuses, elapsed)
+    errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 500)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
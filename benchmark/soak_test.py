@@ -0,0 +1,390 @@
+"""Concurrency soak test: simultaneous operators and renewal workers.
+
+Runs N operator sessions and M background renewal workers, each on its own
+connection, against a local MySQL for a fixed time. They all go through the
+same ott_service write paths the GUI uses (AddNewUser, RenewSubscription,
+batched user deletes) and work on a small set of hot subscriptions, so
+renewals collide. Operators renew several selected rows at once in whatever
+order they were picked, like a multi-select in the Subscriptions tab.
+
+Reported: throughput and latency per operation, client-side deadlocks and
+lock wait timeouts, and the server's row-lock wait counters. Afterwards the
+invariants are checked and the exit code is 1 if any broke:
+
+  - every committed renewal wrote exactly one Payment (no duplicate payments;
+    RenewSubscription sets @ott_skip_auto_renew so the auto_renew_payment
+    trigger stays quiet, see ott.sql)
+  - every hot subscription's end_date moved by exactly its committed renewals
+  - every user added by an operator has one email, one phone and a
+    User_Directory row, and nothing is left of the users it deleted
+
+The users it adds are removed at the end; the hot subscriptions get their
+end dates back and the payments written during the run are deleted, unless
+--keep is given.
+
+    python -m benchmark.soak_test --operators 8 --renewers 4 --duration 60
+"""
+import argparse
+import calendar
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from db_connect import connect_db
+import ott_service as svc
+from benchmark.harness import percentile
+
+DEADLOCK = 1213            # ER_LOCK_DEADLOCK
+LOCK_WAIT_TIMEOUT = 1205   # ER_LOCK_WAIT_TIMEOUT
+EMAIL_DOMAIN = "soak.invalid"
+
+# Operator actions and their weights
+OPERATOR_MIX = [("renew", 5), ("add_user", 3), ("delete_user", 2), ("search", 2)]
+
+
+def add_months(day, months):
+    """DATE_ADD(day, INTERVAL months MONTH): clamps to the last day of the month"""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+class Stats:
+    """Outcome counters shared by all workers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.outcomes = Counter()          # (action, outcome) -> count
+        self.renewals = Counter()          # subscription_id -> committed renewals
+        self.added = set()                 # emails of users committed by operators
+        self.deleted = set()               # user ids deleted by operators
+
+    def record(self, action, outcome, started):
+        with self.lock:
+            self.outcomes[action, outcome] += 1
+            if outcome == "ok":
+                self.latencies[action].append((time.perf_counter() - started) * 1000)
+
+
+def _outcome(error):
+    errno = getattr(error, "errno", None)
+    if errno == DEADLOCK:
+        return "deadlock"
+    if errno == LOCK_WAIT_TIMEOUT:
+        return "lock_wait_timeout"
+    return "error"
+
+
+def _rows(conn, sql, params=None):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _marks(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _connect(lock_wait_timeout):
+    conn = connect_db()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION innodb_lock_wait_timeout = %s", (lock_wait_timeout,))
+    cursor.close()
+    return conn
+
+
+def _run(stats, action, work):
+    started = time.perf_counter()
+    try:
+        work()
+    except Exception as e:
+        outcome = _outcome(e)
+        if outcome == "error":
+            print(f"{action} failed: {e}")
+        stats.record(action, outcome, started)
+        return False
+    stats.record(action, "ok", started)
+    return True
+
+
+def operator(worker_id, args, hot, stats, stop, errors):
+    rng = random.Random(args.seed + worker_id)
+    actions = [action for action, _ in OPERATOR_MIX]
+    weights = [weight for _, weight in OPERATOR_MIX]
+    own = []        # (user_id, email) added by this operator and not yet deleted
+    n = 0
+    try:
+        conn = _connect(args.lock_wait_timeout)
+    except Exception as e:
+        errors.append(e)
+        return
+    try:
+        while not stop.is_set():
+            action = rng.choices(actions, weights)[0]
+            if action == "renew":
+                picked = rng.sample(hot, rng.randint(1, min(3, len(hot))))
+                if _run(stats, action, lambda: svc.renew_subscriptions(conn, picked)):
+                    with stats.lock:
+                        stats.renewals.update(picked)
+            elif action == "add_user":
+                n += 1
+                email = f"op{worker_id}-{args.run_tag}-{n}@{EMAIL_DOMAIN}"
+                phone = f"{int(args.run_tag, 16) % 10000:04d}{worker_id:03d}{n:08d}"
+                user = ("Soak", f"Operator{worker_id}", email, phone)
+                if _run(stats, action, lambda: svc.add_users(conn, [user])):
+                    rows = _rows(conn, "SELECT user_id FROM User_Email WHERE email = %s", (email,))
+                    with stats.lock:
+                        stats.added.add(email)
+                    if rows:
+                        own.append((rows[0][0], email))
+            elif action == "delete_user":
+                if not own:
+                    continue
+                user_id, email = own.pop(rng.randrange(len(own)))
+                if _run(stats, action, lambda: svc.delete_users(conn, [user_id])):
+                    with stats.lock:
+                        stats.added.discard(email)
+                        stats.deleted.add(user_id)
+                else:
+                    own.append((user_id, email))
+            else:
+                _run(stats, action, lambda: svc.search_users(conn, f"Operator{worker_id}"))
+    finally:
+        conn.close()
+
+
+def renewer(worker_id, args, hot, stats, stop, errors):
+    """Background renewal job: renews one due auto-renewal subscription at a time"""
+    rng = random.Random(args.seed + 1000 + worker_id)
+    due = [sub_id for sub_id in hot if hot[sub_id]["auto_renewal"]] or list(hot)
+    try:
+        conn = _connect(args.lock_wait_timeout)
+    except Exception as e:
+        errors.append(e)
+        return
+    try:
+        while not stop.is_set():
+            sub_id = rng.choice(due)
+            if _run(stats, "auto_renew", lambda: svc.renew_subscription(conn, sub_id)):
+                with stats.lock:
+                    stats.renewals[sub_id] += 1
+            if args.renew_interval:
+                stop.wait(args.renew_interval)
+    finally:
+        conn.close()
+
+
+# ---------------- SERVER COUNTERS ----------------
+def lock_counters(conn):
+    """Row lock waits/time from SHOW GLOBAL STATUS plus the InnoDB deadlock metric"""
+    rows = _rows(conn, "SHOW GLOBAL STATUS LIKE 'Innodb_row_lock%'")
+    counters = {name: int(value) for name, value in rows}
+    try:
+        rows = _rows(conn, "SELECT `COUNT` FROM information_schema.INNODB_METRICS WHERE NAME = 'lock_deadlocks'")
+        counters["lock_deadlocks"] = int(rows[0][0]) if rows else 0
+    except Exception:
+        pass
+    return counters
+
+
+# ---------------- SETUP / CHECKS ----------------
+def pick_hot(conn, count, rng):
+    rows = _rows(conn, """SELECT us.subscription_id, us.end_date, us.status, us.auto_renewal,
+                                      sp.duration_months
+                               FROM User_Subscription us
+                               JOIN Subscription_Plan sp ON sp.plan_id = us.plan_id
+                               ORDER BY us.subscription_id""")
+    chosen = rng.sample(rows, min(count, len(rows)))
+    return {sub_id: {"end_date": end_date, "status": status, "auto_renewal": bool(auto), "months": months}
+            for sub_id, end_date, status, auto, months in chosen}
+
+
+def check_invariants(conn, hot, stats, payment_baseline):
+    """Human-readable descriptions of every broken invariant"""
+    problems = []
+    ids = list(hot)
+    marks = _marks(ids)
+    paid = dict(_rows(conn, f"""SELECT subscription_id, COUNT(*) FROM Payment
+                                     WHERE payment_id > %s AND subscription_id IN ({marks})
+                                     GROUP BY subscription_id""", [payment_baseline] + ids))
+    extra = {sub_id: paid.get(sub_id, 0) - stats.renewals[sub_id] for sub_id in ids}
+    duplicates = {sub_id: n for sub_id, n in extra.items() if n > 0}
+    missing = {sub_id: -n for sub_id, n in extra.items() if n < 0}
+    if duplicates:
+        auto = sum(1 for sub_id in duplicates if hot[sub_id]["auto_renewal"])
+        problems.append(f"duplicate payments: {sum(duplicates.values()):,} extra Payment rows on "
+                        f"{len(duplicates)} subscriptions ({auto} with auto_renewal; is the "
+                        f"@ott_skip_auto_renew guard from ott.sql installed?), e.g. "
+                        + ", ".join(f"#{s} +{n}" for s, n in sorted(duplicates.items())[:5]))
+    if missing:
+        problems.append(f"missing payments: {sum(missing.values()):,} committed renewals without a Payment")
+
+    ends = dict(_rows(conn, f"SELECT subscription_id, end_date FROM User_Subscription "
+                                 f"WHERE subscription_id IN ({marks})", ids))
+    drifted = []
+    for sub_id, row in hot.items():
+        expected = row["end_date"]
+        for _ in range(stats.renewals[sub_id]):
+            expected = add_months(expected, row["months"])
+        if ends.get(sub_id) != expected:
+            drifted.append(f"#{sub_id} {ends.get(sub_id)} != {expected}")
+    if drifted:
+        problems.append(f"end_date drift on {len(drifted)} subscriptions, e.g. " + ", ".join(drifted[:5]))
+
+    if stats.added:
+        emails = sorted(stats.added)
+        rows = _rows(conn, f"""SELECT e.email,
+                                           (SELECT COUNT(*) FROM User_Email x WHERE x.user_id = e.user_id),
+                                           (SELECT COUNT(*) FROM User_Phone p WHERE p.user_id = e.user_id),
+                                           (SELECT COUNT(*) FROM User_Directory d WHERE d.user_id = e.user_id)
+                                    FROM User_Email e WHERE e.email IN ({_marks(emails)})""", emails)
+        found = {email: counts for email, *counts in rows}
+        broken = [email for email in emails if found.get(email) != [1, 1, 1]]
+        if broken:
+            problems.append(f"{len(broken)} added users without exactly one email/phone/directory row, "
+                            f"e.g. {broken[0]}")
+    if stats.deleted:
+        user_ids = sorted(stats.deleted)
+        left = _rows(conn, f"""SELECT (SELECT COUNT(*) FROM User WHERE user_id IN ({_marks(user_ids)}))
+                                          + (SELECT COUNT(*) FROM User_Directory
+                                             WHERE user_id IN ({_marks(user_ids)}))""",
+                           user_ids + user_ids)[0][0]
+        if left:
+            problems.append(f"{left} rows left behind by deleted users")
+    return problems
+
+
+def cleanup(conn, hot, payment_baseline, run_tag):
+    """Put the hot subscriptions back and remove what the run created"""
+    ids = list(hot)
+    cursor = conn.cursor()
+    try:
+        # Restoring end_date is not a renewal: keep auto_renew_payment quiet
+        cursor.execute("SET @ott_skip_auto_renew = 1")
+        for sub_id, row in hot.items():
+            cursor.execute("UPDATE User_Subscription SET end_date = %s, status = %s WHERE subscription_id = %s",
+                           (row["end_date"], row["status"], sub_id))
+        cursor.execute("SET @ott_skip_auto_renew = NULL")
+        cursor.execute(f"""DELETE FROM Payment_Log WHERE payment_id IN
+                           (SELECT payment_id FROM Payment
+                            WHERE payment_id > %s AND subscription_id IN ({_marks(ids)}))""",
+                       [payment_baseline] + ids)
+        cursor.execute(f"DELETE FROM Payment WHERE payment_id > %s AND subscription_id IN ({_marks(ids)})",
+                       [payment_baseline] + ids)
+        cursor.execute("""DELETE u FROM User u JOIN User_Email e ON e.user_id = u.user_id
+                          WHERE e.email LIKE %s""", (f"%-{run_tag}-%@{EMAIL_DOMAIN}",))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# ---------------- REPORT ----------------
+def report(stats, elapsed, before, after):
+    actions = sorted({action for action, _ in stats.outcomes})
+    total_ok = sum(count for (_, outcome), count in stats.outcomes.items() if outcome == "ok")
+    print(f"\n{total_ok:,} committed operations in {elapsed:.1f}s = {total_ok / elapsed:,.1f} ops/s")
+    print(f"{'operation':<14}{'ok':>8}{'deadlock':>10}{'lock wait':>11}{'error':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for action in actions:
+        samples = sorted(stats.latencies[action])
+        print(f"{action:<14}{stats.outcomes[action, 'ok']:>8,}{stats.outcomes[action, 'deadlock']:>10,}"
+              f"{stats.outcomes[action, 'lock_wait_timeout']:>11,}{stats.outcomes[action, 'error']:>8,}"
+              f"{percentile(samples, 50):>9.1f}{percentile(samples, 95):>9.1f}{percentile(samples, 99):>9.1f}")
+    waits = after.get("Innodb_row_lock_waits", 0) - before.get("Innodb_row_lock_waits", 0)
+    wait_ms = after.get("Innodb_row_lock_time", 0) - before.get("Innodb_row_lock_time", 0)
+    line = (f"server: {waits:,} row lock waits, {wait_ms:,} ms waiting"
+            f" ({wait_ms / waits if waits else 0:.1f} ms avg, max {after.get('Innodb_row_lock_time_max', 0):,} ms)")
+    if "lock_deadlocks" in after:
+        line += f", {after['lock_deadlocks'] - before.get('lock_deadlocks', 0):,} deadlocks"
+    print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test concurrent operators and renewal workers")
+    parser.add_argument("--operators", type=int, default=8)
+    parser.add_argument("--renewers", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--hot", type=int, default=20, help="subscriptions everyone renews")
+    parser.add_argument("--renew-interval", type=float, default=0.0,
+                        help="seconds each renewal worker sleeps between renewals")
+    parser.add_argument("--lock-wait-timeout", type=int, default=5, help="innodb_lock_wait_timeout, seconds")
+    parser.add_argument("--max-deadlock-rate", type=float, default=0.05,
+                        help="fail when more than this share of writes deadlock or time out")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="leave the rows written by the run in place")
+    args = parser.parse_args(argv)
+    args.run_tag = f"{int(time.time()):x}"
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    hot = pick_hot(conn, args.hot, random.Random(args.seed))
+    if not hot:
+        print("No subscriptions to renew; load data first (python -m benchmark.datagen)")
+        return 1
+    payment_baseline = svc._scalar(conn, "SELECT COALESCE(MAX(payment_id), 0) FROM Payment")
+    auto = sum(1 for row in hot.values() if row["auto_renewal"])
+    print(f"{args.operators} operators, {args.renewers} renewal workers, {len(hot)} hot subscriptions "
+          f"({auto} auto-renewing), {args.duration:.0f}s")
+
+    stats = Stats()
+    stop = threading.Event()
+    errors = []
+    threads = [threading.Thread(target=operator, args=(i, args, list(hot), stats, stop, errors))
+               for i in range(args.operators)]
+    threads += [threading.Thread(target=renewer, args=(i, args, hot, stats, stop, errors))
+                for i in range(args.renewers)]
+    before = lock_counters(conn)
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        print("Interrupted, stopping workers")
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = lock_counters(conn)
+    for error in errors:
+        print(f"worker could not start: {error}")
+
+    report(stats, elapsed, before, after)
+    conn.commit()  # end the snapshot so the checks see every worker's commits
+    problems = check_invariants(conn, hot, stats, payment_baseline)
+    writes = sum(count for (action, _), count in stats.outcomes.items() if action != "search")
+    conflicts = sum(count for (action, outcome), count in stats.outcomes.items()
+                    if action != "search" and outcome in ("deadlock", "lock_wait_timeout"))
+    if writes and conflicts / writes > args.max_deadlock_rate:
+        problems.append(f"{conflicts:,} of {writes:,} writes ({conflicts / writes:.1%}) deadlocked or timed out "
+                        f"(limit {args.max_deadlock_rate:.0%})")
+    if errors:
+        problems.append(f"{len(errors)} workers could not connect")
+
+    if not args.keep:
+        cleanup(conn, hot, payment_baseline, args.run_tag)
+    conn.close()
+
+    if problems:
+        print("\nINVARIANTS BROKEN:")
+        for problem in problems:
+            print(f"  - {problem}")
+        return 1
+    print("\nAll invariants held.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
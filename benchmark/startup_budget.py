@@ -0,0 +1,112 @@
+"""Cold-start budget check for ott_gui.py.
+
+Starts the GUI in fresh interpreters with --profile-startup, which builds the
+window and the first tab, loads its data and exits. The median of each run's
+first paint, first-tab-ready and per-phase totals (import, construct,
+snapshot, connect, query) is compared with the budget; the exit code is 1 if
+any is over. With a saved snapshot (ott_snapshot) the first tab is ready
+before the connection is up; the time until live data replaces it is
+reported as "fresh". Needs a display and the database; headless CI can use Xvfb:
+
+    xvfb-run -a python -m benchmark.startup_budget --runs 5
+    python -m benchmark.startup_budget --ready-ms 1500 --budget import=400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+GUI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ott_gui.py")
+
+# Medians in ms; phases without a budget are only reported
+DEFAULT_BUDGET = {
+    "first_paint": 1000.0,
+    "ready": 2500.0,
+    "import": 700.0,
+}
+
+
+def run_once(timeout):
+    """One cold start; the profile dict plus the process wall time"""
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, GUI, "--profile-startup", "--profile-json", path],
+                                cwd=os.path.dirname(GUI), capture_output=True, text=True, timeout=timeout)
+        wall_ms = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"ott_gui.py exited with {result.returncode}:\n{result.stdout}{result.stderr}")
+        with open(path) as f:
+            profile = json.load(f)
+    finally:
+        os.remove(path)
+    profile["wall_ms"] = wall_ms
+    return profile
+
+
+def parse_budget(items):
+    budget = dict(DEFAULT_BUDGET)
+    for item in items:
+        name, _, value = item.partition("=")
+        if not value:
+            raise SystemExit(f"--budget expects name=ms, got {item!r}")
+        budget[name] = float(value)
+    return budget
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check ott_gui.py cold start against a time budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-paint-ms", type=float, help="budget for the first frame")
+    parser.add_argument("--ready-ms", type=float, help="budget until the first tab shows its data")
+    parser.add_argument("--budget", action="append", default=[], metavar="PHASE=MS",
+                        help="budget for a phase total (import, construct, snapshot, connect, query); repeatable")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per run")
+    args = parser.parse_args(argv)
+    budget = parse_budget(args.budget)
+    if args.first_paint_ms is not None:
+        budget["first_paint"] = args.first_paint_ms
+    if args.ready_ms is not None:
+        budget["ready"] = args.ready_ms
+
+    if sys.platform.startswith("linux") and not os.getenv("DISPLAY"):
+        print("No DISPLAY; run under Xvfb: xvfb-run -a python -m benchmark.startup_budget")
+        return 1
+
+    samples = {}
+    for i in range(args.runs):
+        try:
+            profile = run_once(args.timeout)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"run {i + 1} failed: {e}")
+            return 1
+        measured = {"first_paint": profile["first_paint_ms"], "ready": profile["ready_ms"],
+                    "fresh": profile["fresh_ms"], "wall": profile["wall_ms"], **profile["totals"]}
+        for name, ms in measured.items():
+            samples.setdefault(name, []).append(ms)
+        print(f"run {i + 1}: first paint {profile['first_paint_ms']:.0f} ms, ready {profile['ready_ms']:.0f} ms, "
+              f"process {profile['wall_ms']:.0f} ms")
+
+    over = []
+    print(f"\n{'measure':<14}{'median ms':>11}{'max ms':>10}{'budget':>10}")
+    for name, values in samples.items():
+        median = statistics.median(values)
+        limit = budget.get(name)
+        print(f"{name:<14}{median:>11.1f}{max(values):>10.1f}{limit if limit is not None else '-':>10}")
+        if limit is not None and median > limit:
+            over.append(f"{name} {median:.0f} ms > {limit:.0f} ms")
+
+    if over:
+        print("\nOVER BUDGET: " + "; ".join(over))
+        return 1
+    print("\nWithin budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
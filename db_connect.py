@@ -1,5 +1,7 @@
 import mysql.connector
+import mysql.connector.pooling
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()  # Loads the .env file
@@ -16,3 +18,29 @@ def connect_db():
     except mysql.connector.Error as err:
         print("Error:", err)
         return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(size=5):
+    """Shared connection pool, created on first use.
+
+    Sessions are not reset when a connection is returned, so the prepared
+    statements cached per connection by ott_statements stay valid. Safe to
+    call from several threads; only the first creates the pool.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name="ott",
+                    pool_size=size,
+                    pool_reset_session=False,
+                    host=os.getenv("DB_HOST"),
+                    user=os.getenv("DB_USER"),
+                    password=os.getenv("DB_PASSWORD"),
+                    database=os.getenv("DB_NAME")
+                )
+    return _pool
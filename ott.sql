@@ -451,6 +451,7 @@ DELIMITER ;
  
  
 -- Trigger 4 — Update auto-renewal payments automatically
+-- (Redefined under "Payment settlement" below: skipped while @ott_skip_auto_renew is set)
 DELIMITER $$
 CREATE TRIGGER auto_renew_payment
 AFTER UPDATE ON User_Subscription
@@ -511,6 +512,7 @@ DELIMITER ;
 
 -- Procedure 2 — Renew Subscription
 -- Extends the subscription by its plan duration and logs payment automatically.
+-- (Redefined under "Payment settlement" below so auto_renew_payment does not add a second payment)
 DELIMITER $$
 CREATE PROCEDURE RenewSubscription(IN sub_id INT)
 BEGIN
@@ -807,3 +809,406 @@ ORDER BY g.total_watches DESC;
 
 
 
+
+
+-- Background user deletion (ott_deletion.py)
+-- One row per user being deleted. Dependent rows are removed child-first in
+-- small batches; step and rows_deleted are committed with every batch, so an
+-- interrupted job resumes from where it stopped.
+CREATE TABLE User_Deletion_Job (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    status ENUM('pending','running','done','failed') NOT NULL DEFAULT 'pending',
+    step VARCHAR(50),
+    rows_deleted BIGINT NOT NULL DEFAULT 0,
+    error VARCHAR(255),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_deletion_status (status, job_id)
+);
+
+
+-- Recommendations (ott_recommend.py)
+-- Top-k similar titles per content_id, rebuilt in the background from
+-- co-watching and shared genres.
+CREATE TABLE Content_Similarity (
+    content_id INT NOT NULL,
+    rank_no SMALLINT NOT NULL,
+    similar_content_id INT NOT NULL,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (content_id, rank_no),
+    FOREIGN KEY (content_id) REFERENCES Content(content_id) ON DELETE CASCADE,
+    FOREIGN KEY (similar_content_id) REFERENCES Content(content_id) ON DELETE CASCADE
+);
+
+-- Last Watch_History row folded into Content_Similarity
+CREATE TABLE Recommendation_State (
+    id TINYINT PRIMARY KEY,
+    last_history_id INT NOT NULL,
+    built_at DATETIME
+);
+
+-- Lets a profile's recent titles and "already watched" checks use one index range
+CREATE INDEX idx_history_profile_content ON Watch_History (profile_id, content_id, watch_date);
+
+-- Procedure 5 — Recommendations for a profile
+-- Sums neighbour scores of the profile's 20 most recent titles, skipping anything already watched.
+DELIMITER $$
+CREATE PROCEDURE RecommendForProfile(IN profileId INT, IN limitN INT)
+BEGIN
+    SELECT
+        C.content_id,
+        C.title,
+        C.content_type,
+        ROUND(SUM(S.score), 4) AS score
+    FROM (
+        SELECT content_id
+        FROM Watch_History
+        WHERE profile_id = profileId
+        GROUP BY content_id
+        ORDER BY MAX(watch_date) DESC
+        LIMIT 20
+    ) Seed
+    JOIN Content_Similarity S ON S.content_id = Seed.content_id
+    JOIN Content C ON C.content_id = S.similar_content_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM Watch_History WH
+        WHERE WH.profile_id = profileId AND WH.content_id = S.similar_content_id
+    )
+    GROUP BY C.content_id, C.title, C.content_type
+    ORDER BY score DESC
+    LIMIT limitN;
+END$$
+DELIMITER ;
+
+-- Example:
+-- CALL RecommendForProfile(1, 10);
+
+
+-- Continue watching
+-- One row per (profile, title, episode) with the latest progress, kept by
+-- the trigger below, so resume lookups never scan Watch_History.
+-- episode_key is episode_id or 0 for movies (NULLs cannot share a primary key).
+CREATE TABLE Profile_Progress (
+    profile_id INT NOT NULL,
+    content_id INT NOT NULL,
+    episode_key INT NOT NULL DEFAULT 0,
+    episode_id INT NULL,
+    completion_percentage DECIMAL(5,2) CHECK (completion_percentage >= 0 AND completion_percentage <= 100),
+    last_watched DATETIME NOT NULL,
+    PRIMARY KEY (profile_id, content_id, episode_key),
+    INDEX idx_progress_recent (profile_id, last_watched),
+    FOREIGN KEY (profile_id) REFERENCES Profile(profile_id) ON DELETE CASCADE,
+    FOREIGN KEY (content_id) REFERENCES Content(content_id) ON DELETE CASCADE,
+    FOREIGN KEY (episode_id) REFERENCES Episode(episode_id) ON DELETE SET NULL
+);
+
+-- Backfill from existing history: latest row per (profile, title, episode)
+INSERT INTO Profile_Progress (profile_id, content_id, episode_key, episode_id, completion_percentage, last_watched)
+SELECT profile_id, content_id, IFNULL(episode_id, 0), episode_id, completion_percentage, watch_date
+FROM (
+    SELECT WH.*,
+           ROW_NUMBER() OVER (PARTITION BY profile_id, content_id, IFNULL(episode_id, 0)
+                              ORDER BY watch_date DESC, history_id DESC) AS rn
+    FROM Watch_History WH
+    WHERE profile_id IS NOT NULL AND content_id IS NOT NULL AND watch_date IS NOT NULL
+) Latest
+WHERE rn = 1;
+
+-- Trigger 6 — Keep Profile_Progress current
+-- Upserts the watch event; an older, late-arriving event never overwrites newer progress.
+DELIMITER $$
+CREATE TRIGGER update_profile_progress
+AFTER INSERT ON Watch_History
+FOR EACH ROW
+BEGIN
+    IF NEW.profile_id IS NOT NULL AND NEW.content_id IS NOT NULL THEN
+        INSERT INTO Profile_Progress (profile_id, content_id, episode_key, episode_id, completion_percentage, last_watched)
+        VALUES (NEW.profile_id, NEW.content_id, IFNULL(NEW.episode_id, 0), NEW.episode_id,
+                NEW.completion_percentage, IFNULL(NEW.watch_date, NOW()))
+        ON DUPLICATE KEY UPDATE
+            -- completion first: it compares against last_watched before that is moved forward
+            completion_percentage = IF(IFNULL(NEW.watch_date, NOW()) >= last_watched,
+                                       NEW.completion_percentage, completion_percentage),
+            last_watched = GREATEST(last_watched, IFNULL(NEW.watch_date, NOW()));
+    END IF;
+END$$
+DELIMITER ;
+
+-- Procedure 6 — Continue watching
+-- Most recent unfinished titles/episodes of a profile; reads only Profile_Progress.
+DELIMITER $$
+CREATE PROCEDURE ContinueWatching(IN profileId INT, IN limitN INT)
+BEGIN
+    SELECT
+        C.content_id,
+        C.title,
+        E.title AS episode_title,
+        PP.completion_percentage,
+        PP.last_watched
+    FROM Profile_Progress PP
+    JOIN Content C ON C.content_id = PP.content_id
+    LEFT JOIN Episode E ON E.episode_id = PP.episode_id
+    WHERE PP.profile_id = profileId
+      AND PP.completion_percentage < 95
+    ORDER BY PP.last_watched DESC
+    LIMIT limitN;
+END$$
+DELIMITER ;
+
+-- Example:
+-- CALL ContinueWatching(1, 10);
+
+-- Recommendations now seed from Profile_Progress instead of grouping the full history
+DROP PROCEDURE IF EXISTS RecommendForProfile;
+DELIMITER $$
+CREATE PROCEDURE RecommendForProfile(IN profileId INT, IN limitN INT)
+BEGIN
+    SELECT
+        C.content_id,
+        C.title,
+        C.content_type,
+        ROUND(SUM(S.score), 4) AS score
+    FROM (
+        SELECT content_id
+        FROM Profile_Progress
+        WHERE profile_id = profileId
+        GROUP BY content_id
+        ORDER BY MAX(last_watched) DESC
+        LIMIT 20
+    ) Seed
+    JOIN Content_Similarity S ON S.content_id = Seed.content_id
+    JOIN Content C ON C.content_id = S.similar_content_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM Profile_Progress PP
+        WHERE PP.profile_id = profileId AND PP.content_id = S.similar_content_id
+    )
+    GROUP BY C.content_id, C.title, C.content_type
+    ORDER BY score DESC
+    LIMIT limitN;
+END$$
+DELIMITER ;
+
+
+-- User directory read model
+-- One row per user with the primary (lowest id) email and phone, so the
+-- Users tab lists and searches a single table instead of joining three.
+-- Kept current by the triggers below; User deletes cascade to it.
+CREATE TABLE User_Directory (
+    user_id INT PRIMARY KEY,
+    first_name VARCHAR(50) NOT NULL,
+    last_name VARCHAR(50),
+    email VARCHAR(100),
+    phone_number VARCHAR(15),
+    registration_date DATE NOT NULL,
+    search_key VARCHAR(202) AS (CONCAT_WS(' ', first_name, last_name, email)) STORED,
+    -- Holds (search_key, user_id): searches scan this narrow index, then fetch matches by primary key
+    INDEX idx_directory_search (search_key),
+    FOREIGN KEY (user_id) REFERENCES User(user_id) ON DELETE CASCADE
+);
+
+-- Procedure 7 — Rebuild one user's directory row from User, User_Email and User_Phone
+DELIMITER $$
+CREATE PROCEDURE RefreshUserDirectory(IN uid INT)
+BEGIN
+    INSERT INTO User_Directory (user_id, first_name, last_name, email, phone_number, registration_date)
+    SELECT U.user_id, U.first_name, U.last_name,
+           (SELECT UE.email FROM User_Email UE WHERE UE.user_id = U.user_id ORDER BY UE.email_id LIMIT 1),
+           (SELECT UP.phone_number FROM User_Phone UP WHERE UP.user_id = U.user_id ORDER BY UP.phone_id LIMIT 1),
+           U.registration_date
+    FROM User U
+    WHERE U.user_id = uid
+    ON DUPLICATE KEY UPDATE
+        first_name = VALUES(first_name), last_name = VALUES(last_name), email = VALUES(email),
+        phone_number = VALUES(phone_number), registration_date = VALUES(registration_date);
+END$$
+DELIMITER ;
+
+-- Backfill every existing user
+INSERT INTO User_Directory (user_id, first_name, last_name, email, phone_number, registration_date)
+SELECT U.user_id, U.first_name, U.last_name,
+       (SELECT UE.email FROM User_Email UE WHERE UE.user_id = U.user_id ORDER BY UE.email_id LIMIT 1),
+       (SELECT UP.phone_number FROM User_Phone UP WHERE UP.user_id = U.user_id ORDER BY UP.phone_id LIMIT 1),
+       U.registration_date
+FROM User U;
+
+-- Trigger 7 — Keep User_Directory in sync
+-- Cascaded deletes do not fire triggers; User_Directory cascades from User itself.
+DELIMITER $$
+CREATE TRIGGER directory_user_insert AFTER INSERT ON User
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(NEW.user_id);
+END$$
+
+CREATE TRIGGER directory_user_update AFTER UPDATE ON User
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(NEW.user_id);
+END$$
+
+CREATE TRIGGER directory_email_insert AFTER INSERT ON User_Email
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(NEW.user_id);
+END$$
+
+CREATE TRIGGER directory_email_update AFTER UPDATE ON User_Email
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(NEW.user_id);
+    IF NOT (OLD.user_id <=> NEW.user_id) THEN
+        CALL RefreshUserDirectory(OLD.user_id);
+    END IF;
+END$$
+
+CREATE TRIGGER directory_email_delete AFTER DELETE ON User_Email
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(OLD.user_id);
+END$$
+
+CREATE TRIGGER directory_phone_insert AFTER INSERT ON User_Phone
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(NEW.user_id);
+END$$
+
+CREATE TRIGGER directory_phone_update AFTER UPDATE ON User_Phone
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(NEW.user_id);
+    IF NOT (OLD.user_id <=> NEW.user_id) THEN
+        CALL RefreshUserDirectory(OLD.user_id);
+    END IF;
+END$$
+
+CREATE TRIGGER directory_phone_delete AFTER DELETE ON User_Phone
+FOR EACH ROW
+BEGIN
+    CALL RefreshUserDirectory(OLD.user_id);
+END$$
+DELIMITER ;
+
+
+-- Series drill-down: per-episode views and average completion are read
+-- from this index alone (see EPISODES_SQL in ott_service.py)
+CREATE INDEX idx_history_episode ON Watch_History (episode_id, completion_percentage);
+
+
+-- Archiving (ott_archive.py)
+-- One row per Parquet file of rows moved out of Payment, Payment_Log or
+-- Device_Activity; file_path is relative to the archive directory.
+CREATE TABLE Archive_Manifest (
+    archive_id INT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    file_path VARCHAR(255),
+    row_count INT NOT NULL,
+    min_id INT NOT NULL,
+    max_id INT NOT NULL,
+    min_time DATETIME,
+    max_time DATETIME,
+    file_bytes BIGINT,
+    sha256 CHAR(64),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_manifest_range (table_name, max_time, min_time)
+);
+
+-- Archived payments per month, method and status, so revenue totals still include them
+CREATE TABLE Archived_Payment_Summary (
+    month CHAR(7) NOT NULL,
+    payment_method ENUM('card','upi','netbanking','wallet') NOT NULL,
+    status ENUM('success','failed','pending') NOT NULL,
+    transactions INT NOT NULL,
+    total_amount DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (month, payment_method, status)
+);
+
+-- The archiver walks each table oldest first
+CREATE INDEX idx_payment_date ON Payment (payment_date);
+CREATE INDEX idx_payment_log_time ON Payment_Log (log_time);
+CREATE INDEX idx_device_activity_start ON Device_Activity (watch_start);
+
+
+-- Payment settlement (ott_settlement.py)
+-- Workers claim pending payments oldest first with FOR UPDATE SKIP LOCKED;
+-- this index lets each claim read and lock only the rows it takes.
+CREATE INDEX idx_payment_status ON Payment (status, payment_id);
+
+-- Trigger 8 — Log payments settled after insert (payment_success_log only sees inserts)
+DELIMITER $$
+CREATE TRIGGER payment_settled_log
+AFTER UPDATE ON Payment
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'pending' AND NEW.status = 'success' THEN
+        INSERT INTO Payment_Log (payment_id, log_message)
+        VALUES (NEW.payment_id, CONCAT('Payment of ₹', NEW.amount, ' by Subscription ID ', NEW.subscription_id, ' was successful.'));
+    ELSEIF OLD.status = 'pending' AND NEW.status = 'failed' THEN
+        INSERT INTO Payment_Log (payment_id, log_message)
+        VALUES (NEW.payment_id, CONCAT('Payment of ₹', NEW.amount, ' by Subscription ID ', NEW.subscription_id, ' failed.'));
+    END IF;
+END$$
+DELIMITER ;
+
+-- Extending a subscription for a payment that already exists must not
+-- insert a second one. Sessions doing that set @ott_skip_auto_renew = 1:
+-- RenewSubscription (which writes its own payment) and the settlement workers.
+DROP TRIGGER IF EXISTS auto_renew_payment;
+DELIMITER $$
+CREATE TRIGGER auto_renew_payment
+AFTER UPDATE ON User_Subscription
+FOR EACH ROW
+BEGIN
+    IF COALESCE(@ott_skip_auto_renew, 0) = 0
+       AND NEW.auto_renewal = TRUE AND NEW.status = 'active' AND OLD.end_date <> NEW.end_date THEN
+        INSERT INTO Payment (subscription_id, amount, payment_method, status)
+        SELECT NEW.subscription_id, SP.price, 'card', 'success'
+        FROM Subscription_Plan SP
+        WHERE SP.plan_id = NEW.plan_id;
+    END IF;
+END$$
+DELIMITER ;
+
+DROP PROCEDURE IF EXISTS RenewSubscription;
+DELIMITER $$
+CREATE PROCEDURE RenewSubscription(IN sub_id INT)
+BEGIN
+    DECLARE months INT;
+    DECLARE amount DECIMAL(8,2);
+    DECLARE pid INT;
+    DECLARE skip_before INT DEFAULT @ott_skip_auto_renew;
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        SET @ott_skip_auto_renew = skip_before;
+        RESIGNAL;
+    END;
+
+    -- Lock the subscription first, so the plan and price read here are the
+    -- ones the update below extends by; the plan row itself stays unlocked
+    SELECT SP.duration_months, SP.price, SP.plan_id
+    INTO months, amount, pid
+    FROM User_Subscription US
+    JOIN Subscription_Plan SP ON US.plan_id = SP.plan_id
+    WHERE US.subscription_id = sub_id
+    FOR UPDATE OF US;
+
+    -- The payment below is the renewal's only payment
+    SET @ott_skip_auto_renew = 1;
+    UPDATE User_Subscription
+    SET end_date = DATE_ADD(end_date, INTERVAL months MONTH),
+        status = 'active'
+    WHERE subscription_id = sub_id;
+    SET @ott_skip_auto_renew = skip_before;
+
+    INSERT INTO Payment (subscription_id, amount, payment_method, status)
+    VALUES (sub_id, amount, 'upi', 'success');
+END$$
+DELIMITER ;
+
+
+-- Cohort report (ott_cohorts.py)
+-- Each pool worker reads one registration month of users at a time;
+-- subscriptions and watch months follow through the foreign key indexes
+-- and idx_history_profile_content.
+CREATE INDEX idx_user_registration ON User (registration_date);
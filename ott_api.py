@@ -0,0 +1,365 @@
+"""Local read-only HTTP API over the OTT database.
+
+Serves users, subscriptions, content, top-rated titles and an analytics
+snapshot as JSON to other internal tools, so they share one async
+connection pool instead of each opening its own connections.
+
+    python ott_api.py                      # http://127.0.0.1:8080
+    python ott_api.py --port 9000 --pool-size 30
+
+Endpoints (all GET):
+    /users?q=&limit=&before=          keyset pages, newest first
+    /subscriptions?limit=&before=
+    /content?q=&limit=&before=
+    /content/top-rated?n=
+    /analytics                        revenue, user, content, plan and payment stats
+    /health
+
+List responses are {"items": [...], "next": <before value or null>}; pass
+"next" back as ?before= for the following page. Responses are cached for a
+few seconds and carry an ETag; clients sending If-None-Match get 304 while
+the data is unchanged. With OTT_CDC=1 the cache is also dropped on binlog
+events for the tables behind each endpoint (see ott_cdc.py).
+
+Needs aiohttp and aiomysql (pip install aiohttp aiomysql).
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+import ott_service as svc
+
+load_dotenv()
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+LIST_TTL = 5.0
+ANALYTICS_TTL = 30.0
+CACHE_ENTRIES = 10000   # distinct URLs kept; least recently used go first
+SWEEP_INTERVAL = 60.0   # seconds between drops of every expired entry
+# Before any real id; keyset pages walk ids downwards from here
+FIRST_PAGE = 2 ** 31 - 1
+
+
+# ---------------- SQL ----------------
+USER_PAGE_SQL = svc.USER_SELECT + """
+               WHERE d.user_id < %s {where}
+               ORDER BY d.user_id DESC
+               LIMIT %s"""
+USER_PAGE_SEARCH = "AND d.search_key LIKE %s"
+
+SUBSCRIPTION_PAGE_SQL = """SELECT us.subscription_id, u.first_name, u.last_name, sp.plan_name,
+               us.start_date, us.end_date, us.status, us.auto_renewal
+               FROM User_Subscription us
+               JOIN User u ON us.user_id = u.user_id
+               JOIN Subscription_Plan sp ON us.plan_id = sp.plan_id
+               WHERE us.subscription_id < %s
+               ORDER BY us.subscription_id DESC
+               LIMIT %s"""
+
+CONTENT_PAGE_SQL = svc.CONTENT_SELECT + """
+               WHERE c.content_id < %s {where}
+               ORDER BY c.content_id DESC
+               LIMIT %s"""
+CONTENT_PAGE_SEARCH = "AND (c.title LIKE %s OR c.language LIKE %s)"
+
+# Cache prefixes to drop when a table changes (only with OTT_CDC=1)
+INVALIDATES = {
+    "User": ("/users", "/subscriptions", "/analytics"),
+    "User_Subscription": ("/subscriptions", "/analytics"),
+    "Payment": ("/analytics",),
+    "Rating_Review": ("/content",),
+    "Content": ("/content", "/analytics"),
+    "Content_Genre": ("/content", "/analytics"),
+}
+
+
+# ---------------- CACHE ----------------
+class ResponseCache:
+    """TTL cache of encoded JSON bodies with ETags.
+
+    Concurrent misses for the same key share one in-flight query, so a burst
+    of identical requests costs a single round trip to MySQL. Every search
+    term and page is its own key, so the cache holds at most max_entries
+    (least recently used dropped first) and expired entries are swept out
+    every SWEEP_INTERVAL seconds.
+    """
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self._entries = OrderedDict()   # key -> (body, etag, expires_at), least recently used first
+        self._inflight = {}             # key -> Future
+        self.max_entries = max_entries
+        self._swept_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _sweep(self, now):
+        if now - self._swept_at < SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        for key in [k for k, entry in self._entries.items() if entry[2] <= now]:
+            del self._entries[key]
+
+    async def get(self, key, ttl, produce):
+        now = time.monotonic()
+        self._sweep(now)
+        entry = self._entries.get(key)
+        if entry:
+            if entry[2] > now:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0], entry[1]
+            del self._entries[key]
+
+        future = self._inflight.get(key)
+        if future is None:
+            self.misses += 1
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            try:
+                body = json.dumps(await produce(), default=str, separators=(",", ":")).encode()
+                etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+                self._store(key, (body, etag, time.monotonic() + ttl))
+                future.set_result((body, etag))
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # mark retrieved in case nobody else is waiting
+                raise
+            except BaseException:
+                future.cancel()
+                raise
+            finally:
+                del self._inflight[key]
+            return body, etag
+        return await asyncio.shield(future)
+
+    def invalidate(self, prefixes):
+        for key in [k for k in self._entries if k.startswith(prefixes)]:
+            del self._entries[key]
+
+
+# ---------------- QUERIES ----------------
+async def _fetch(pool, query, params=None, record=None):
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            # CALL returns an extra status result; drain it so the connection is reusable
+            while await cursor.nextset():
+                pass
+    return [record(*row)._asdict() for row in rows] if record else rows
+
+
+def _like(term):
+    return f"%{term}%"
+
+
+async def _scalar(pool, query, params=None):
+    rows = await _fetch(pool, query, params)
+    return rows[0][0] if rows else None
+
+
+def _page(items, limit, key):
+    """Body for a keyset page; next is the smallest key when the page is full"""
+    ids = {item[key] for item in items}
+    return {"items": items, "next": min(ids) if len(ids) == limit else None}
+
+
+async def users_page(pool, term, limit, before):
+    if term:
+        query = USER_PAGE_SQL.format(where=USER_PAGE_SEARCH)
+        params = (before, _like(term), limit)
+    else:
+        query, params = USER_PAGE_SQL.format(where=""), (before, limit)
+    return _page(await _fetch(pool, query, params, svc.UserRecord), limit, "user_id")
+
+
+async def subscriptions_page(pool, limit, before):
+    items = await _fetch(pool, SUBSCRIPTION_PAGE_SQL, (before, limit), svc.SubscriptionRecord)
+    return _page(items, limit, "subscription_id")
+
+
+async def content_page(pool, term, limit, before):
+    if term:
+        query = CONTENT_PAGE_SQL.format(where=CONTENT_PAGE_SEARCH)
+        params = (before, _like(term), _like(term), limit)
+    else:
+        query, params = CONTENT_PAGE_SQL.format(where=""), (before, limit)
+    return _page(await _fetch(pool, query, params, svc.ContentRecord), limit, "content_id")
+
+
+async def top_rated(pool, n):
+    return {"items": await _fetch(pool, "CALL TopRatedContent(%s)", (n,), svc.TopRatedRecord)}
+
+
+async def analytics(pool):
+    """Every dashboard figure, each query on its own pooled connection"""
+    scalars = (svc.REVENUE_TOTAL_SQL, svc.REVENUE_MONTH_SQL, svc.PAYMENT_SUCCESS_COUNT_SQL,
+               svc.PAYMENT_COUNT_SQL, svc.USER_COUNT_SQL, svc.ACTIVE_SUB_COUNT_SQL,
+               svc.NEW_USERS_MONTH_SQL)
+    results = await asyncio.gather(
+        *(_scalar(pool, query) for query in scalars),
+        *(_scalar(pool, query, params) for query, params in svc.CONTENT_STATS_QUERIES),
+        _fetch(pool, svc.PAYMENT_METHODS_SQL, record=svc.PaymentMethodStat),
+        _fetch(pool, svc.PLAN_STATS_SQL, record=svc.PlanStat),
+        _fetch(pool, svc.WATCH_STATS_SQL, (15,), svc.WatchStatRecord),
+    )
+    total, month, success, payments, users, active, new, content, movies, series = results[:10]
+    methods, plans, watch = results[10:]
+    return {
+        "revenue": svc.RevenueSummary(total or 0, month or 0, ((success or 0) / (payments or 1)) * 100)._asdict(),
+        "users": svc.UserStats(users, active, new)._asdict(),
+        "content": svc.ContentStats(content, movies, series)._asdict(),
+        "payment_methods": methods,
+        "plans": plans,
+        "most_watched": watch,
+    }
+
+
+# ---------------- HTTP ----------------
+def _int_param(request, name, default, low=1, high=None):
+    from aiohttp import web
+
+    value = request.query.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"{name} must be an integer")
+    if number < low or (high is not None and number > high):
+        raise web.HTTPBadRequest(text=f"{name} must be between {low} and {high or 'max'}")
+    return number
+
+
+def create_app(pool_size=20):
+    """aiohttp application; the pool opens on startup and closes on cleanup"""
+    try:
+        import aiomysql
+        from aiohttp import web
+    except ImportError:
+        raise RuntimeError("The API needs aiohttp and aiomysql: pip install aiohttp aiomysql")
+
+    cache = ResponseCache()
+    app = web.Application()
+    app["cache"] = cache
+
+    async def respond(request, ttl, produce):
+        key = request.path_qs
+        body, etag = await cache.get(key, ttl, produce)
+        headers = {"ETag": etag, "Cache-Control": f"max-age={int(ttl)}"}
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    async def users(request):
+        term = request.query.get("q", "").strip()
+        limit = _int_param(request, "limit", DEFAULT_LIMIT, high=MAX_LIMIT)
+        before = _int_param(request, "before", FIRST_PAGE)
+        return await respond(request, LIST_TTL, lambda: users_page(app["pool"], term, limit, before))
+
+    async def subscriptions(request):
+        limit = _int_param(request, "limit", DEFAULT_LIMIT, high=MAX_LIMIT)
+        before = _int_param(request, "before", FIRST_PAGE)
+        return await respond(request, LIST_TTL, lambda: subscriptions_page(app["pool"], limit, before))
+
+    async def content(request):
+        term = request.query.get("q", "").strip()
+        limit = _int_param(request, "limit", DEFAULT_LIMIT, high=MAX_LIMIT)
+        before = _int_param(request, "before", FIRST_PAGE)
+        return await respond(request, LIST_TTL, lambda: content_page(app["pool"], term, limit, before))
+
+    async def content_top_rated(request):
+        n = _int_param(request, "n", 10, high=MAX_LIMIT)
+        return await respond(request, LIST_TTL, lambda: top_rated(app["pool"], n))
+
+    async def analytics_snapshot(request):
+        return await respond(request, ANALYTICS_TTL, lambda: analytics(app["pool"]))
+
+    async def health(request):
+        pool = app["pool"]
+        return web.json_response({"pool_size": pool.size, "pool_free": pool.freesize,
+                                  "cache_hits": cache.hits, "cache_misses": cache.misses,
+                                  "cache_entries": len(cache)})
+
+    async def open_pool(app):
+        app["pool"] = await aiomysql.create_pool(
+            host=os.getenv("DB_HOST"), port=int(os.getenv("DB_PORT", "3306")),
+            user=os.getenv("DB_USER"), password=os.getenv("DB_PASSWORD"), db=os.getenv("DB_NAME"),
+            minsize=1, maxsize=pool_size, autocommit=True)
+        app["cdc"] = _start_invalidation(cache)
+
+    async def close_pool(app):
+        if app["cdc"] is not None:
+            app["cdc"].stop()
+        app["pool"].close()
+        await app["pool"].wait_closed()
+
+    app.on_startup.append(open_pool)
+    app.on_cleanup.append(close_pool)
+    app.router.add_get("/users", users)
+    app.router.add_get("/subscriptions", subscriptions)
+    app.router.add_get("/content", content)
+    app.router.add_get("/content/top-rated", content_top_rated)
+    app.router.add_get("/analytics", analytics_snapshot)
+    app.router.add_get("/health", health)
+    return app
+
+
+def _start_invalidation(cache):
+    """Drop cached responses on binlog events when OTT_CDC is on; returns the consumer or None"""
+    import ott_cdc
+
+    if not ott_cdc.cdc_enabled():
+        return None
+    loop = asyncio.get_running_loop()
+    bus = ott_cdc.EventBus()
+
+    def on_change(event):
+        prefixes = INVALIDATES.get(event.table, ())
+        if prefixes:
+            loop.call_soon_threadsafe(cache.invalidate, prefixes)
+
+    bus.subscribe("*", on_change)
+    try:
+        return ott_cdc.BinlogConsumer(bus).start()
+    except Exception as e:
+        print(f"Cache invalidation from binlog disabled: {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the OTT database over a local read-only HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=20, help="MySQL connections in the pool")
+    args = parser.parse_args(argv)
+
+    try:
+        app = create_app(args.pool_size)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    from aiohttp import web
+    web.run_app(app, host=args.host, port=args.port, backlog=2048, access_log=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
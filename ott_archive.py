@@ -0,0 +1,340 @@
+"""Tiered archiving of old Payment, Payment_Log and Device_Activity rows.
+
+Rows older than a horizon are moved, oldest first, into zstd-compressed
+Parquet files under archive/<table>/ and deleted from MySQL, so the hot
+tables stay small enough to live in the buffer pool. Each batch is one
+transaction:
+
+    lock the oldest rows (SELECT ... FOR UPDATE)
+    write them to a Parquet file, read it back and compare the ids
+    record the file in Archive_Manifest (row count, id and time range, sha256)
+    delete exactly those rows, then commit
+
+A failure anywhere rolls the batch back and removes its file. Archived
+payments are also folded into Archived_Payment_Summary so the revenue
+dashboards keep counting them.
+
+query() reads a table through the archive: it merges live rows with the
+archived files whose time range overlaps the request.
+
+    python ott_archive.py                          # every table, default horizons
+    python ott_archive.py Payment_Log --horizon-days 90
+    python ott_archive.py --status                 # hot table sizes vs. buffer pool
+
+Needs pyarrow (pip install pyarrow).
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from db_connect import connect_db
+from ott_export import ParquetSink
+
+ARCHIVE_DIR = os.getenv("OTT_ARCHIVE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "archive")
+BATCH_ROWS = 20000
+# Never archive the current month: the month revenue figure reads only live rows
+MIN_HORIZON_DAYS = 31
+
+
+class ArchiveSpec(NamedTuple):
+    table: str
+    key: str
+    time_column: str
+    horizon_days: int
+
+
+SPECS = {
+    "Payment": ArchiveSpec("Payment", "payment_id", "payment_date", 730),
+    "Payment_Log": ArchiveSpec("Payment_Log", "log_id", "log_time", 180),
+    "Device_Activity": ArchiveSpec("Device_Activity", "activity_id", "watch_start", 90),
+}
+
+
+class TableStatus(NamedTuple):
+    table: str
+    live_rows: int
+    live_mb: float
+    archived_rows: int
+    archived_files: int
+    archived_mb: float
+
+
+class ArchiveStopped(Exception):
+    pass
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Archiving needs pyarrow: pip install pyarrow")
+    return pq
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# ---------------- ARCHIVING ----------------
+def _verify(path, key, ids):
+    """Read the file back and check it holds exactly these ids; returns its sha256"""
+    pq = _require_pyarrow()
+    stored = pq.read_table(path, columns=[key]).column(key).to_pylist()
+    if sorted(stored) != sorted(ids):
+        raise RuntimeError(f"{path}: archived ids do not match the rows read ({len(stored)} vs {len(ids)})")
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _summarize_payments(cursor, columns, rows):
+    """Fold archived payments into Archived_Payment_Summary (same transaction)"""
+    date_i, method_i = columns.index("payment_date"), columns.index("payment_method")
+    status_i, amount_i = columns.index("status"), columns.index("amount")
+    totals = {}
+    for row in rows:
+        month = row[date_i].strftime("%Y-%m") if row[date_i] else "unknown"
+        key = (month, row[method_i], row[status_i])
+        count, amount = totals.get(key, (0, 0))
+        totals[key] = (count + 1, amount + row[amount_i])
+    cursor.executemany("""INSERT INTO Archived_Payment_Summary
+                          (month, payment_method, status, transactions, total_amount)
+                          VALUES (%s, %s, %s, %s, %s)
+                          ON DUPLICATE KEY UPDATE transactions = transactions + VALUES(transactions),
+                                                  total_amount = total_amount + VALUES(total_amount)""",
+                       [key + value for key, value in totals.items()])
+
+
+def _archive_batch(conn, spec, cutoff, batch_rows):
+    """Archive up to batch_rows rows older than cutoff; returns how many"""
+    cursor = conn.cursor()
+    path = None
+    try:
+        # Autocommit is off: the locking read opens the batch's transaction
+        cursor.execute(f"""SELECT * FROM {spec.table}
+                           WHERE {spec.time_column} < %s
+                           ORDER BY {spec.time_column}, {spec.key}
+                           LIMIT %s FOR UPDATE""", (cutoff, batch_rows))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return 0
+        description = cursor.description
+        columns = [column[0] for column in description]
+        key_i, time_i = columns.index(spec.key), columns.index(spec.time_column)
+        ids = [row[key_i] for row in rows]
+        times = [row[time_i] for row in rows if row[time_i] is not None]
+
+        cursor.execute("""INSERT INTO Archive_Manifest (table_name, row_count, min_id, max_id, min_time, max_time)
+                          VALUES (%s, %s, %s, %s, %s, %s)""",
+                       (spec.table, len(rows), min(ids), max(ids), min(times, default=None), max(times, default=None)))
+        archive_id = cursor.lastrowid
+
+        directory = os.path.join(ARCHIVE_DIR, spec.table)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{spec.table}_{archive_id:08d}.parquet")
+        sink = ParquetSink(path + ".part", description)
+        sink.write(rows)
+        sink.close()
+        os.replace(path + ".part", path)
+        checksum = _verify(path, spec.key, ids)
+
+        cursor.execute("UPDATE Archive_Manifest SET file_path = %s, file_bytes = %s, sha256 = %s WHERE archive_id = %s",
+                       (os.path.relpath(path, ARCHIVE_DIR), os.path.getsize(path), checksum, archive_id))
+        if spec.table == "Payment":
+            _summarize_payments(cursor, columns, rows)
+        cursor.execute(f"DELETE FROM {spec.table} WHERE {spec.key} IN ({_placeholders(ids)})", ids)
+        if cursor.rowcount != len(ids):
+            raise RuntimeError(f"{spec.table}: deleted {cursor.rowcount} rows, archived {len(ids)}")
+        conn.commit()
+        path = None  # committed, keep the file
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if path is not None:
+            for leftover in (path, path + ".part"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+
+def archive_table(conn, table, horizon_days=None, batch_rows=BATCH_ROWS, progress=None, stop_event=None):
+    """Move every row older than the horizon into archive files; returns rows archived"""
+    _require_pyarrow()
+    spec = SPECS[table]
+    horizon_days = max(MIN_HORIZON_DAYS, horizon_days or spec.horizon_days)
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    archived = 0
+    while True:
+        if stop_event is not None and stop_event.is_set():
+            raise ArchiveStopped(f"Archiving stopped after {archived:,} {table} rows")
+        moved = _archive_batch(conn, spec, cutoff, batch_rows)
+        if not moved:
+            return archived
+        archived += moved
+        if progress:
+            progress(table, archived)
+
+
+def archive_all(conn, tables=None, horizon_days=None, batch_rows=BATCH_ROWS, progress=None, stop_event=None):
+    """archive_table() for each table; returns {table: rows archived}"""
+    return {table: archive_table(conn, table, horizon_days, batch_rows, progress, stop_event)
+            for table in (tables or SPECS)}
+
+
+def start_archive(tables=None, horizon_days=None, progress=None, done=None):
+    """Run archive_all() on its own connection in a background thread.
+
+    done(result, error) is called from the worker thread when it ends.
+    Returns the stop event; batches already committed stay archived.
+    """
+    stop_event = threading.Event()
+
+    def worker():
+        conn = None
+        try:
+            conn = connect_db()
+            if conn is None:
+                raise RuntimeError("Could not connect to the database")
+            result, error = archive_all(conn, tables, horizon_days, progress=progress, stop_event=stop_event), None
+        except Exception as e:
+            result, error = None, e
+        finally:
+            if conn is not None:
+                conn.close()
+        if done:
+            done(result, error)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return stop_event
+
+
+# ---------------- QUERY-THROUGH ----------------
+def query(conn, table, start=None, end=None, equals=None, limit=None):
+    """Rows of table as dicts, newest first, from live rows and archived files.
+
+    start/end bound the time column (start inclusive, end exclusive) and
+    equals is {column: value}. Archive files are only opened when their time
+    range overlaps and, with a limit, while they can still contribute rows.
+    """
+    spec = SPECS[table]
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f"{spec.time_column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{spec.time_column} < %s")
+        params.append(end)
+    for column, value in (equals or {}).items():
+        if not column.isidentifier():
+            raise ValueError(f"Bad column name {column!r}")
+        conditions.append(f"{column} = %s")
+        params.append(value)
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    order = f" ORDER BY {spec.time_column} DESC, {spec.key} DESC"
+
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(f"SELECT * FROM {table}{where}{order}" + (" LIMIT %s" if limit else ""),
+                   params + ([limit] if limit else []))
+    rows = cursor.fetchall()
+
+    manifest_sql = """SELECT file_path, max_time FROM Archive_Manifest
+                      WHERE table_name = %s AND file_path IS NOT NULL"""
+    manifest_params = [table]
+    if start is not None:
+        manifest_sql += " AND max_time >= %s"
+        manifest_params.append(start)
+    if end is not None:
+        manifest_sql += " AND min_time < %s"
+        manifest_params.append(end)
+    cursor.execute(manifest_sql + " ORDER BY max_time DESC", manifest_params)
+    files = cursor.fetchall()
+    cursor.close()
+    if not files:
+        return rows
+
+    pq = _require_pyarrow()
+    filters = [(spec.time_column, ">=", start)] if start is not None else []
+    if end is not None:
+        filters.append((spec.time_column, "<", end))
+    filters += [(column, "==", value) for column, value in (equals or {}).items()]
+
+    def newest_first(row):
+        return (row[spec.time_column] or datetime.min, row[spec.key])
+
+    for entry in files:
+        if limit and len(rows) >= limit:
+            rows.sort(key=newest_first, reverse=True)
+            # Stop once the file cannot hold anything newer than the current last row
+            if entry["max_time"] is not None and entry["max_time"] < newest_first(rows[limit - 1])[0]:
+                break
+        archived = pq.read_table(os.path.join(ARCHIVE_DIR, entry["file_path"]), filters=filters or None)
+        rows.extend(archived.to_pylist())
+    rows.sort(key=newest_first, reverse=True)
+    return rows[:limit] if limit else rows
+
+
+# ---------------- STATUS ----------------
+def status(conn):
+    """([TableStatus], buffer pool bytes)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT @@innodb_buffer_pool_size")
+    pool_bytes = cursor.fetchone()[0]
+    result = []
+    for table in SPECS:
+        cursor.execute("""SELECT TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH FROM information_schema.TABLES
+                          WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s""", (table,))
+        live_rows, live_bytes = cursor.fetchone() or (0, 0)
+        cursor.execute("""SELECT IFNULL(SUM(row_count), 0), COUNT(*), IFNULL(SUM(file_bytes), 0)
+                          FROM Archive_Manifest WHERE table_name = %s AND file_path IS NOT NULL""", (table,))
+        archived_rows, files, archived_bytes = cursor.fetchone()
+        result.append(TableStatus(table, live_rows or 0, (live_bytes or 0) / 1e6,
+                                  int(archived_rows), files, int(archived_bytes) / 1e6))
+    cursor.close()
+    return result, pool_bytes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old rows to compressed Parquet files")
+    parser.add_argument("tables", nargs="*", help=f"tables to archive: {', '.join(SPECS)} (default: all)")
+    parser.add_argument("--horizon-days", type=int, help="archive rows older than this (default per table)")
+    parser.add_argument("--batch", type=int, default=BATCH_ROWS)
+    parser.add_argument("--status", action="store_true", help="show hot and archived sizes, archive nothing")
+    args = parser.parse_args(argv)
+    unknown = [table for table in args.tables if table not in SPECS]
+    if unknown:
+        parser.error(f"cannot archive {', '.join(unknown)}")
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    try:
+        if not args.status:
+            started = time.perf_counter()
+            result = archive_all(conn, args.tables or None, args.horizon_days, args.batch,
+                                 progress=lambda table, rows: print(f"\r{table}: {rows:,} rows", end="", flush=True))
+            print(f"\nArchived {sum(result.values()):,} rows in {time.perf_counter() - started:.1f}s")
+        tables, pool_bytes = status(conn)
+    finally:
+        conn.close()
+
+    print(f"{'table':<18}{'live rows':>12}{'live MB':>10}{'archived':>12}{'files':>7}{'file MB':>9}")
+    for t in tables:
+        print(f"{t.table:<18}{t.live_rows:>12,}{t.live_mb:>10.1f}{t.archived_rows:>12,}{t.archived_files:>7}"
+              f"{t.archived_mb:>9.1f}")
+    hot_mb = sum(t.live_mb for t in tables)
+    print(f"hot tables {hot_mb:.1f} MB of a {pool_bytes / 1e6:.0f} MB buffer pool")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Change data capture from the MySQL binlog.
+
+Tails the binlog in row format and turns row events for the watched tables
+into ChangeEvent records published on an in-process EventBus. Caches and
+aggregates subscribe to the bus instead of polling the database.
+
+Optional: needs `pip install mysql-replication` and a server with
+
+    server_id = 1
+    log_bin = mysql-bin
+    binlog_format = ROW
+    binlog_row_image = FULL
+    binlog_row_metadata = FULL      # MySQL 8.0.24+, gives column names
+
+The DB user also needs REPLICATION SLAVE and REPLICATION CLIENT.
+Set OTT_CDC=1 in .env to have ott_gui.py refresh its views from events.
+"""
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from dotenv import load_dotenv
+
+import ott_service as svc
+
+load_dotenv()
+
+WATCHED_TABLES = ("Payment", "User", "User_Subscription", "Device", "Rating_Review",
+                  "Archived_Payment_Summary", "Content", "Content_Genre")
+
+
+class ChangeEvent(NamedTuple):
+    table: str
+    action: str               # 'insert', 'update' or 'delete'
+    before: Optional[dict]    # row before the change (update/delete)
+    after: Optional[dict]     # row after the change (insert/update)
+    logged_at: float          # binlog timestamp, whole seconds
+    received_at: float        # time.time() when the consumer decoded it
+
+
+def cdc_enabled():
+    return os.getenv("OTT_CDC", "").lower() in ("1", "true", "yes")
+
+
+# ---------------- EVENT BUS ----------------
+class EventBus:
+    """Fan-out of change events to subscribers, keyed by table name.
+
+    Callbacks run on the publishing (consumer) thread; GUI subscribers must
+    hand work over to the Tk thread themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, table, callback):
+        """Call callback(event) for changes to table ('*' for every table); returns an unsubscribe function"""
+        with self._lock:
+            self._subscribers.setdefault(table, []).append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                self._subscribers.get(table, []).remove(callback)
+        return unsubscribe
+
+    def publish(self, event):
+        with self._lock:
+            callbacks = self._subscribers.get(event.table, []) + self._subscribers.get("*", [])
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in change subscriber for {event.table}: {e}")
+
+
+# ---------------- BINLOG CONSUMER ----------------
+def connection_settings():
+    return {
+        "host": os.getenv("DB_HOST"),
+        "port": int(os.getenv("DB_PORT", "3306")),
+        "user": os.getenv("DB_USER"),
+        "passwd": os.getenv("DB_PASSWORD"),
+    }
+
+
+class BinlogConsumer:
+    """Reads row events from the current binlog position on a daemon thread"""
+
+    def __init__(self, bus, tables=WATCHED_TABLES, server_id=None):
+        self.bus = bus
+        self.tables = list(tables)
+        # Must differ from the server's and every replica's server_id
+        self.server_id = server_id or int(os.getenv("OTT_CDC_SERVER_ID", "4242"))
+        self.events_seen = 0
+        self.error = None
+        self._stream = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        try:
+            from pymysqlreplication import BinLogStreamReader
+            from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent, WriteRowsEvent
+        except ImportError:
+            raise RuntimeError("Binlog consumer needs mysql-replication: pip install mysql-replication")
+
+        self._stream = BinLogStreamReader(
+            connection_settings=connection_settings(),
+            server_id=self.server_id,
+            only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent],
+            only_schemas=[os.getenv("DB_NAME")],
+            only_tables=self.tables,
+            blocking=True,
+            resume_stream=True,  # start at the current end of the binlog
+        )
+        self._thread = threading.Thread(target=self._run, name="binlog-consumer", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        from pymysqlreplication.row_event import DeleteRowsEvent, UpdateRowsEvent
+
+        try:
+            for binlog_event in self._stream:
+                received_at = time.time()
+                for row in binlog_event.rows:
+                    if isinstance(binlog_event, UpdateRowsEvent):
+                        action, before, after = "update", row["before_values"], row["after_values"]
+                    elif isinstance(binlog_event, DeleteRowsEvent):
+                        action, before, after = "delete", row["values"], None
+                    else:
+                        action, before, after = "insert", None, row["values"]
+                    self.events_seen += 1
+                    self.bus.publish(ChangeEvent(binlog_event.table, action, before, after,
+                                                 binlog_event.timestamp, received_at))
+        except Exception as e:
+            if not self._stopping.is_set():
+                self.error = e
+                print(f"Binlog consumer stopped: {e}")
+
+    def stop(self):
+        self._stopping.set()
+        if self._stream is not None:
+            self._stream.close()
+
+
+# ---------------- LIVE AGGREGATES ----------------
+class PaymentTotals:
+    """Revenue figures kept current from Payment events instead of re-running SUM/COUNT"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = Decimal(0)
+        self.month = Decimal(0)
+        self.month_of = self._this_month()  # (year, month) that self.month is the revenue of
+        self.success_count = 0
+        self.count = 0
+
+    @staticmethod
+    def _this_month():
+        today = time.localtime()
+        return today.tm_year, today.tm_mon
+
+    def _roll_month(self):
+        """Start the month's revenue from zero once the calendar month changes"""
+        current = self._this_month()
+        if current != self.month_of:
+            self.month, self.month_of = Decimal(0), current
+        return current
+
+    def load(self, conn):
+        """Seed from the database once; events keep it current afterwards"""
+        cursor = conn.cursor()
+        values = []
+        for query in (svc.REVENUE_TOTAL_SQL, svc.REVENUE_MONTH_SQL,
+                      svc.PAYMENT_SUCCESS_COUNT_SQL, svc.PAYMENT_COUNT_SQL):
+            cursor.execute(query)
+            values.append(cursor.fetchone()[0] or 0)
+        cursor.close()
+        with self._lock:
+            self.total, self.month = Decimal(values[0]), Decimal(values[1])
+            self.month_of = self._this_month()
+            self.success_count, self.count = values[2], values[3]
+        return self
+
+    def _apply_row(self, row, sign):
+        self.count += sign
+        if row.get("status") != "success":
+            return
+        amount = Decimal(row.get("amount") or 0) * sign
+        self.success_count += sign
+        self.total += amount
+        paid = row.get("payment_date")
+        if paid is not None and (paid.year, paid.month) == self._roll_month():
+            self.month += amount
+
+    def _apply_archived(self, row, sign):
+        # ott_archive.py deletes payments and adds them here in one transaction
+        transactions = row.get("transactions") or 0
+        self.count += transactions * sign
+        if row.get("status") == "success":
+            self.success_count += transactions * sign
+            self.total += Decimal(row.get("total_amount") or 0) * sign
+
+    def apply(self, event):
+        with self._lock:
+            if event.table == "Archived_Payment_Summary":
+                for row, sign in ((event.before, -1), (event.after, +1)):
+                    if row:
+                        self._apply_archived(row, sign)
+                return
+            if event.before:
+                self._apply_row(event.before, -1)
+            if event.after:
+                self._apply_row(event.after, +1)
+
+    def summary(self):
+        with self._lock:
+            self._roll_month()
+            rate = (self.success_count / (self.count or 1)) * 100
+            return svc.RevenueSummary(self.total, self.month, rate)
+
+
+# ---------------- LATENCY ----------------
+class LatencyTracker:
+    """Collects change-to-screen latencies (seconds) for reporting"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return "no change events observed"
+
+        def pct(p):
+            return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+        return (f"{len(samples)} events: p50 {pct(50):.0f} ms, p95 {pct(95):.0f} ms, "
+                f"p99 {pct(99):.0f} ms, max {samples[-1] * 1000:.0f} ms")
@@ -0,0 +1,399 @@
+"""Cohort retention and churn report.
+
+Users are bucketed by registration month. For every cohort and every month
+of age since registration (month 0 = the registration month) the report
+counts the cohort's users who
+
+  subscribed  had a subscription covering that month (start_date..end_date)
+  watching    watched anything that month (Watch_History through Profile)
+  churned     had subscribed at some point up to that month but not in it
+
+Each cohort is one task in a process pool: the worker streams that cohort's
+user ids, subscription months and distinct watch months out of MySQL in
+fetchmany() chunks on its own connection, and counts them with a few
+vectorized NumPy passes over a users x months grid.
+
+Results are cached in .ott_cache/cohorts.npz with a fingerprint per cohort
+(count and XOR of its user ids, subscription rows and profile ids, computed
+by the server) and the last Watch_History id seen. A later run recomputes
+only cohorts whose fingerprint changed or that got new history, and every
+cohort once a new month starts.
+
+    python ott_cohorts.py                 # incremental report, printed as a table
+    python ott_cohorts.py --full --workers 8
+
+Needs numpy.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import NamedTuple
+
+from db_connect import connect_db
+
+FETCH_ROWS = 100000
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ott_cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "cohorts.npz")
+METRICS = ("subscribed", "watching", "churned")
+
+COHORT = "YEAR(U.registration_date) * 12 + MONTH(U.registration_date) - 1"
+
+USERS_SQL = """SELECT user_id FROM User
+               WHERE registration_date >= %s AND registration_date < %s"""
+SUBSCRIPTIONS_SQL = """SELECT US.user_id,
+                              YEAR(US.start_date) * 12 + MONTH(US.start_date) - 1,
+                              YEAR(US.end_date) * 12 + MONTH(US.end_date) - 1
+                       FROM User U
+                       JOIN User_Subscription US ON US.user_id = U.user_id
+                       WHERE U.registration_date >= %s AND U.registration_date < %s"""
+WATCH_MONTHS_SQL = """SELECT DISTINCT P.user_id, YEAR(WH.watch_date) * 12 + MONTH(WH.watch_date) - 1
+                      FROM User U
+                      JOIN Profile P ON P.user_id = U.user_id
+                      JOIN Watch_History WH ON WH.profile_id = P.profile_id
+                      WHERE U.registration_date >= %s AND U.registration_date < %s
+                        AND WH.watch_date IS NOT NULL"""
+
+# (cohort, count, xor) per cohort; together they change whenever a cohort's rows do
+FINGERPRINT_SQL = [
+    f"SELECT {COHORT} AS cohort, COUNT(*), BIT_XOR(U.user_id) FROM User U GROUP BY cohort",
+    f"""SELECT {COHORT} AS cohort, COUNT(*),
+               BIT_XOR(CRC32(CONCAT_WS(',', US.subscription_id, US.start_date, US.end_date)))
+        FROM User U JOIN User_Subscription US ON US.user_id = U.user_id GROUP BY cohort""",
+    f"""SELECT {COHORT} AS cohort, COUNT(*), BIT_XOR(P.profile_id)
+        FROM User U JOIN Profile P ON P.user_id = U.user_id GROUP BY cohort""",
+]
+TOUCHED_SQL = f"""SELECT DISTINCT {COHORT}
+                  FROM Watch_History WH
+                  JOIN Profile P ON P.profile_id = WH.profile_id
+                  JOIN User U ON U.user_id = P.user_id
+                  WHERE WH.history_id > %s"""
+
+
+class CohortsStopped(Exception):
+    pass
+
+
+class CohortData(NamedTuple):
+    """One cohort's rows as int64 numpy arrays; months are year * 12 + month - 1"""
+    user_ids: object
+    sub_users: object
+    sub_start: object
+    sub_end: object
+    watch_users: object
+    watch_months: object
+
+
+class CohortReport(NamedTuple):
+    """Counts per cohort (rows, oldest first) and month of age (columns), as numpy arrays"""
+    as_of: int            # month index of the report
+    cohorts: object       # month index per row
+    sizes: object         # users per cohort
+    subscribed: object    # [row, months since registration] user counts
+    watching: object
+    churned: object
+    recomputed: int       # cohorts computed this run; the rest came from the cache
+
+    def rates(self, metric):
+        """Counts of a metric as shares of each cohort; NaN past a cohort's age"""
+        import numpy as np
+        counts = getattr(self, metric).astype(np.float64)
+        rates = np.divide(counts, self.sizes[:, None], out=np.zeros_like(counts), where=self.sizes[:, None] > 0)
+        ages = np.arange(counts.shape[1])
+        rates[ages[None, :] > (self.as_of - self.cohorts)[:, None]] = np.nan
+        return rates
+
+
+def month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def month_start(index):
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_label(index):
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+# ---------------- KERNEL ----------------
+def cohort_counts(cohort, as_of, data):
+    """(size, subscribed, watching, churned) for ages 0..as_of - cohort"""
+    import numpy as np
+
+    user_ids = np.sort(data.user_ids)
+    n, width = len(user_ids), as_of - cohort + 1
+    if n == 0 or width <= 0:
+        empty = np.zeros(max(width, 0), dtype=np.int64)
+        return n, empty, empty, empty
+
+    # Subscribed: +1 at each interval's first month, -1 after its last, summed along each user's row
+    rows = np.searchsorted(user_ids, data.sub_users)
+    start = np.clip(data.sub_start - cohort, 0, width)
+    end = np.clip(data.sub_end - cohort + 1, 0, width)
+    keep = start < end
+    rows, start, end = rows[keep], start[keep], end[keep]
+    stride = width + 1
+    diff = (np.bincount(rows * stride + start, minlength=n * stride)
+            - np.bincount(rows * stride + end, minlength=n * stride))
+    covered = np.cumsum(diff.reshape(n, stride), axis=1)[:, :width] > 0
+    subscribed = covered.sum(axis=0)
+    churned = (np.logical_or.accumulate(covered, axis=1) & ~covered).sum(axis=0)
+
+    # Watching: one flag per user and month
+    age = data.watch_months - cohort
+    keep = (age >= 0) & (age < width)
+    active = np.zeros(n * width, dtype=bool)
+    active[np.searchsorted(user_ids, data.watch_users[keep]) * width + age[keep]] = True
+    watching = active.reshape(n, width).sum(axis=0)
+    return n, subscribed, watching, churned
+
+
+# ---------------- LOADING ----------------
+_worker_conn = None  # one connection per pool process
+
+
+def _connection():
+    global _worker_conn
+    if _worker_conn is None:
+        _worker_conn = connect_db()
+        if _worker_conn is None:
+            raise RuntimeError("Could not connect to the database")
+    return _worker_conn
+
+
+def _stream(conn, query, params, columns):
+    """Result rows as an int64 array of shape (rows, columns), FETCH_ROWS at a time"""
+    import numpy as np
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            chunks.append(np.asarray(rows, dtype=np.int64).reshape(-1, columns))
+    finally:
+        cursor.close()
+    return np.concatenate(chunks) if chunks else np.empty((0, columns), dtype=np.int64)
+
+
+def load_cohort(cohort, as_of):
+    """A cohort's rows from the database, on the calling process's own connection"""
+    conn = _connection()
+    params = (month_start(cohort), month_start(cohort + 1))
+    try:
+        users = _stream(conn, USERS_SQL, params, 1)
+        subs = _stream(conn, SUBSCRIPTIONS_SQL, params, 3)
+        watch = _stream(conn, WATCH_MONTHS_SQL, params, 2)
+    finally:
+        conn.rollback()  # end the read snapshot so the next cohort sees current data
+    return CohortData(users[:, 0], subs[:, 0], subs[:, 1], subs[:, 2], watch[:, 0], watch[:, 1])
+
+
+def _compute_cohort(load, cohort, as_of):
+    return cohort, cohort_counts(cohort, as_of, load(cohort, as_of))
+
+
+def compute(cohorts, as_of, load=load_cohort, workers=None, progress=None, stop_event=None):
+    """{cohort: (size, subscribed, watching, churned)}, one process-pool task per cohort.
+
+    load(cohort, as_of) -> CohortData runs in the pool processes, so it must
+    be picklable (a module-level function or a functools.partial of one).
+    progress(done, total) is called as cohorts finish.
+    """
+    results = {}
+    if not cohorts:
+        return results
+    # Pool processes start from a clean server process, not a fork of the
+    # caller, which may be the GUI with Tk and other threads running
+    context = multiprocessing.get_context("spawn" if sys.platform == "win32" else "forkserver")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        # Oldest cohorts first: they span the most months
+        futures = [pool.submit(_compute_cohort, load, cohort, as_of) for cohort in sorted(cohorts)]
+        for future in as_completed(futures):
+            if stop_event is not None and stop_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                raise CohortsStopped(f"Stopped after {len(results)} of {len(cohorts)} cohorts")
+            cohort, counts = future.result()
+            results[cohort] = counts
+            if progress:
+                progress(len(results), len(cohorts))
+    return results
+
+
+def assemble(as_of, counts, recomputed):
+    """A CohortReport from {cohort: (size, subscribed, watching, churned)}"""
+    import numpy as np
+
+    cohorts = np.asarray(sorted(counts), dtype=np.int64)
+    width = int(as_of - cohorts[0] + 1) if len(cohorts) else 0
+    sizes = np.zeros(len(cohorts), dtype=np.int64)
+    grids = {metric: np.zeros((len(cohorts), width), dtype=np.int64) for metric in METRICS}
+    for row, cohort in enumerate(cohorts):
+        size, *metrics = counts[int(cohort)]
+        sizes[row] = size
+        for metric, values in zip(METRICS, metrics):
+            grids[metric][row, :len(values)] = values
+    return CohortReport(as_of, cohorts, sizes, grids["subscribed"], grids["watching"], grids["churned"], recomputed)
+
+
+# ---------------- CACHE ----------------
+def fingerprints(conn):
+    """{cohort: (count, xor) per fingerprint query, flattened}"""
+    prints = {}
+    cursor = conn.cursor()
+    try:
+        for i, query in enumerate(FINGERPRINT_SQL):
+            cursor.execute(query)
+            for cohort, count, xor in cursor.fetchall():
+                prints.setdefault(cohort, [0] * (2 * len(FINGERPRINT_SQL)))[2 * i:2 * i + 2] = [count, int(xor)]
+    finally:
+        cursor.close()
+    return {cohort: tuple(values) for cohort, values in prints.items() if cohort is not None}
+
+
+def _touched_since(conn, history_id):
+    """Cohorts with Watch_History rows past history_id, and the current last id.
+
+    With no history_id (nothing cached) every cohort is recomputed anyway, so
+    only the last id is read.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(history_id), 0) FROM Watch_History")
+        last_id = cursor.fetchone()[0]
+        if history_id is None:
+            return set(), last_id
+        cursor.execute(TOUCHED_SQL, (history_id,))
+        return {row[0] for row in cursor.fetchall()}, last_id
+    finally:
+        cursor.close()
+
+
+def _load_cache():
+    """(as_of, {cohort: counts}, {cohort: fingerprint}, last history id), or None"""
+    import numpy as np
+    if not os.path.exists(CACHE_PATH):
+        return None
+    with np.load(CACHE_PATH) as cache:
+        as_of = int(cache["as_of"])
+        counts = {int(cohort): (int(size), *(cache[metric][row, :as_of - cohort + 1] for metric in METRICS))
+                  for row, (cohort, size) in enumerate(zip(cache["cohorts"], cache["sizes"]))}
+        prints = {int(cohort): tuple(int(v) for v in fp) for cohort, fp in zip(cache["cohorts"], cache["fingerprints"])}
+        return as_of, counts, prints, int(cache["last_history_id"])
+
+
+def _save_cache(report, prints, last_history_id):
+    import numpy as np
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temp_path = CACHE_PATH + ".tmp.npz"
+    np.savez_compressed(temp_path, as_of=report.as_of, last_history_id=last_history_id,
+                        cohorts=report.cohorts, sizes=report.sizes,
+                        fingerprints=np.asarray([prints[int(c)] for c in report.cohorts], dtype=np.int64)
+                        .reshape(len(report.cohorts), 2 * len(FINGERPRINT_SQL)),
+                        subscribed=report.subscribed, watching=report.watching, churned=report.churned)
+    os.replace(temp_path, CACHE_PATH)
+
+
+def cached_report():
+    """The last computed report, without touching the database; None if there is none"""
+    cache = _load_cache()
+    if cache is None:
+        return None
+    as_of, counts, _, _ = cache
+    return assemble(as_of, counts, 0) if counts else None
+
+
+# ---------------- REPORT ----------------
+def report(conn, workers=None, full=False, progress=None, stop_event=None, as_of=None):
+    """Compute the report, reusing cached cohorts that have not changed"""
+    as_of = month_index(date.today()) if as_of is None else as_of
+    cache = None if full else _load_cache()
+    if cache is not None and cache[0] != as_of:
+        cache = None  # a new month adds a column to every cohort
+    touched, last_history_id = _touched_since(conn, cache[3] if cache else None)
+    prints = fingerprints(conn)
+    conn.rollback()
+
+    cached_counts, cached_prints = (cache[1], cache[2]) if cache else ({}, {})
+    current = [cohort for cohort in prints if cohort <= as_of]  # no registrations dated in the future
+    stale = {cohort for cohort in current
+             if cohort not in cached_counts or cached_prints.get(cohort) != prints[cohort] or cohort in touched}
+    counts = {cohort: cached_counts[cohort] for cohort in current if cohort not in stale}
+    counts.update(compute(stale, as_of, workers=workers, progress=progress, stop_event=stop_event))
+
+    result = assemble(as_of, counts, len(stale))
+    if len(result.cohorts):
+        _save_cache(result, prints, last_history_id)
+    return result
+
+
+def start_report(workers=None, full=False, progress=None, done=None):
+    """Run report() in a background thread on its own connection.
+
+    done(report, error) is called from the worker thread when it ends.
+    Returns the stop event; set it to abandon the run.
+    """
+    stop_event = threading.Event()
+
+    def worker():
+        conn = connect_db()
+        try:
+            if conn is None:
+                raise RuntimeError("Could not connect to the database")
+            result, error = report(conn, workers, full, progress, stop_event), None
+        except Exception as e:
+            result, error = None, e
+        finally:
+            if conn is not None:
+                conn.close()
+        if done:
+            done(result, error)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return stop_event
+
+
+def format_table(result, metric="subscribed", months=12):
+    """Text table of the first months of a metric, one line per cohort"""
+    rates = result.rates(metric)
+    lines = [f"{'cohort':<9}{'users':>10}" + "".join(f"{'M' + str(age):>6}" for age in range(months))]
+    for row, cohort in enumerate(result.cohorts):
+        cells = "".join(f"{'' if rate != rate else f'{rate:.0%}':>6}" for rate in rates[row, :months])
+        lines.append(f"{month_label(int(cohort)):<9}{int(result.sizes[row]):>10,}{cells}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cohort retention and churn report")
+    parser.add_argument("--full", action="store_true", help="ignore the cache and recompute every cohort")
+    parser.add_argument("--workers", type=int, help="pool processes (default: one per CPU)")
+    parser.add_argument("--metric", choices=METRICS, default="subscribed")
+    parser.add_argument("--months", type=int, default=12, help="months of age to print")
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    started = time.perf_counter()
+    try:
+        result = report(conn, args.workers, args.full,
+                        progress=lambda done, total: print(f"\r{done}/{total} cohorts", end="", flush=True))
+    finally:
+        conn.close()
+    print(f"\n{len(result.cohorts)} cohorts, {int(result.sizes.sum()):,} users, {result.recomputed} recomputed "
+          f"in {time.perf_counter() - started:.1f}s\n")
+    print(format_table(result, args.metric, args.months))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Background, resumable user deletion.
+
+Deleting a User row lets ON DELETE CASCADE remove every subscription,
+payment, profile, watch history row and device in one transaction, which
+holds locks for as long as the heaviest user takes. Here each user becomes a
+job in User_Deletion_Job and its dependent rows are deleted child-first in
+small batches, one short transaction per batch. The job's step and row count
+are committed with every batch, so a crashed or stopped run simply resumes.
+A batch that hits a deadlock or lock wait timeout is rolled back and tried
+again; a job that fails anyway is marked 'failed' and is only retried by an
+explicit --resume, so a permanent error is not replayed on every start.
+
+    python ott_deletion.py 12 13 14        # queue and run jobs for these users
+    python ott_deletion.py --resume        # finish jobs left by an earlier run, failed ones included
+"""
+import argparse
+import sys
+import threading
+import time
+
+from db_connect import connect_db
+
+BATCH_SIZE = 1000
+# Short pause between batches so interactive transactions can take the locks
+BATCH_PAUSE = 0.01
+BATCH_RETRIES = 5
+DEADLOCK = 1213            # ER_LOCK_DEADLOCK
+LOCK_WAIT_TIMEOUT = 1205   # ER_LOCK_WAIT_TIMEOUT
+
+# (step, table, key column, which id list the key refers to), children first
+STEPS = [
+    ("device_activity_by_profile", "Device_Activity", "profile_id", "profiles"),
+    ("device_activity_by_device", "Device_Activity", "device_id", "devices"),
+    ("watch_history", "Watch_History", "profile_id", "profiles"),
+    ("progress", "Profile_Progress", "profile_id", "profiles"),
+    ("watchlist", "Watchlist", "profile_id", "profiles"),
+    ("reviews", "Rating_Review", "profile_id", "profiles"),
+    ("profiles", "Profile", "user_id", "user"),
+    ("payments", "Payment", "subscription_id", "subscriptions"),
+    ("subscriptions", "User_Subscription", "user_id", "user"),
+    ("devices", "Device", "user_id", "user"),
+    ("emails", "User_Email", "user_id", "user"),
+    ("phones", "User_Phone", "user_id", "user"),
+    ("user", "User", "user_id", "user"),
+]
+STEP_NAMES = [step[0] for step in STEPS]
+
+
+class DeletionStopped(Exception):
+    pass
+
+
+def enqueue(conn, user_ids):
+    """Create one pending job per user; returns the job ids"""
+    cursor = conn.cursor()
+    job_ids = []
+    try:
+        for user_id in user_ids:
+            cursor.execute("INSERT INTO User_Deletion_Job (user_id) VALUES (%s)", (int(user_id),))
+            job_ids.append(cursor.lastrowid)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return job_ids
+
+
+def unfinished_jobs(conn, include_failed=False):
+    """Job ids that are pending or were interrupted while running, and failed ones if asked"""
+    statuses = ("pending", "running", "failed") if include_failed else ("pending", "running")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""SELECT job_id FROM User_Deletion_Job
+                           WHERE status IN ({", ".join(["%s"] * len(statuses))}) ORDER BY job_id""", statuses)
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _owned_ids(cursor, user_id):
+    """Ids of the rows that hang off a user, looked up once per job"""
+    ids = {"user": [user_id]}
+    for key, sql in [("profiles", "SELECT profile_id FROM Profile WHERE user_id = %s"),
+                     ("subscriptions", "SELECT subscription_id FROM User_Subscription WHERE user_id = %s"),
+                     ("devices", "SELECT device_id FROM Device WHERE user_id = %s")]:
+        cursor.execute(sql, (user_id,))
+        ids[key] = [row[0] for row in cursor.fetchall()]
+    return ids
+
+
+def run_job(conn, job_id, batch_size=BATCH_SIZE, progress=None, stop_event=None):
+    """Delete one user's rows batch by batch; returns the rows deleted.
+
+    progress(job_id, user_id, step, rows_deleted) is called after each batch.
+    Setting stop_event leaves the job 'running' so a later run resumes it.
+    A batch is retried up to BATCH_RETRIES times after a deadlock or lock
+    wait timeout; any other error marks the job 'failed' and is raised. If
+    the job cannot be marked, a note saying so is added to that error.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT user_id, status, step, rows_deleted FROM User_Deletion_Job WHERE job_id = %s",
+                       (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"No deletion job {job_id}")
+        user_id, status, done_step, rows_deleted = row
+        if status == "done":
+            return rows_deleted
+
+        cursor.execute("UPDATE User_Deletion_Job SET status = 'running', error = NULL WHERE job_id = %s",
+                       (job_id,))
+        conn.commit()
+
+        ids = _owned_ids(cursor, user_id)
+        conn.commit()
+        first = STEP_NAMES.index(done_step) + 1 if done_step in STEP_NAMES else 0
+
+        retries = 0
+        for step, table, column, id_key in STEPS[first:]:
+            keys = ids[id_key]
+            while keys:
+                if stop_event is not None and stop_event.is_set():
+                    raise DeletionStopped(f"Stopped job {job_id} during {step}")
+                placeholders = ", ".join(["%s"] * len(keys))
+                try:
+                    cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders}) LIMIT %s",
+                                   keys + [batch_size])
+                    deleted = cursor.rowcount
+                    cursor.execute("UPDATE User_Deletion_Job SET rows_deleted = %s WHERE job_id = %s",
+                                   (rows_deleted + deleted, job_id))
+                    conn.commit()
+                except Exception as e:
+                    if getattr(e, "errno", None) not in (DEADLOCK, LOCK_WAIT_TIMEOUT) or retries >= BATCH_RETRIES:
+                        raise
+                    # A lock wait timeout only undoes the statement; drop the whole batch
+                    conn.rollback()
+                    retries += 1
+                    time.sleep(BATCH_PAUSE * 2 ** retries)
+                    continue
+                retries = 0
+                rows_deleted += deleted
+                if progress:
+                    progress(job_id, user_id, step, rows_deleted)
+                if deleted < batch_size:
+                    break
+                time.sleep(BATCH_PAUSE)
+            cursor.execute("UPDATE User_Deletion_Job SET step = %s WHERE job_id = %s", (step, job_id))
+            conn.commit()
+
+        cursor.execute("UPDATE User_Deletion_Job SET status = 'done' WHERE job_id = %s", (job_id,))
+        conn.commit()
+        return rows_deleted
+    except DeletionStopped:
+        conn.rollback()
+        raise
+    except Exception as e:
+        # Keep the original error if the connection itself is gone
+        try:
+            conn.rollback()
+            cursor.execute("UPDATE User_Deletion_Job SET status = 'failed', error = %s WHERE job_id = %s",
+                           (str(e)[:255], job_id))
+            conn.commit()
+        except Exception as bookkeeping:
+            e.add_note(f"Could not mark deletion job {job_id} failed: {bookkeeping}")
+        raise
+    finally:
+        cursor.close()
+
+
+def run_jobs(job_ids, batch_size=BATCH_SIZE, progress=None, stop_event=None, connect=connect_db):
+    """Run jobs one after another on a dedicated connection; returns rows deleted"""
+    conn = connect()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+    total = 0
+    try:
+        for job_id in job_ids:
+            total += run_job(conn, job_id, batch_size, progress, stop_event)
+    finally:
+        conn.close()
+    return total
+
+
+def start_deletion(job_ids, batch_size=BATCH_SIZE, progress=None, done=None):
+    """Run jobs in a background thread.
+
+    done(rows_deleted, error) is called from the worker thread when it ends.
+    Returns the stop event; set it to pause, and resume later with the same jobs.
+    """
+    stop_event = threading.Event()
+
+    def worker():
+        try:
+            rows = run_jobs(job_ids, batch_size, progress, stop_event)
+            error = None
+        except Exception as e:
+            rows, error = None, e
+        if done:
+            done(rows, error)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return stop_event
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete OTT users in small background batches")
+    parser.add_argument("user_ids", nargs="*", type=int)
+    parser.add_argument("--resume", action="store_true", help="run unfinished and failed jobs from earlier runs")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    job_ids = unfinished_jobs(conn, include_failed=True) if args.resume else []
+    job_ids += enqueue(conn, args.user_ids)
+    conn.close()
+    if not job_ids:
+        print("Nothing to delete.")
+        return 0
+
+    def progress(job_id, user_id, step, rows):
+        print(f"\rjob {job_id} (user {user_id}): {step:<28} {rows:>10,} rows", end="", flush=True)
+
+    total = run_jobs(job_ids, args.batch, progress)
+    print(f"\nDeleted {total:,} rows across {len(job_ids)} job(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Streaming CSV / Parquet export for large result sets.
+
+Rows are read through an unbuffered cursor in fetchmany() chunks and written
+out chunk by chunk, so memory stays bounded by the chunk size no matter how
+many rows the table holds. Each export runs on its own connection because an
+unbuffered cursor keeps the connection busy until the last row is read.
+
+    python ott_export.py payments payments.parquet
+    python ott_export.py users users.csv --chunk 5000
+
+Parquet output needs pyarrow (pip install pyarrow).
+"""
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+
+from db_connect import connect_db
+import ott_service as svc
+
+CHUNK_ROWS = 10000
+
+TABLE_ESTIMATE_SQL = """SELECT TABLE_ROWS FROM information_schema.TABLES
+                        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"""
+
+
+class ExportSpec:
+    """What to export: a query plus a cheap way to guess its row count"""
+
+    def __init__(self, label, query, count_query=None, estimate_table=None):
+        self.label = label
+        self.query = query
+        self.count_query = count_query
+        self.estimate_table = estimate_table
+
+    def expected_rows(self, conn):
+        """Row count for progress reporting; an estimate for the big tables"""
+        cursor = conn.cursor()
+        try:
+            if self.estimate_table:
+                cursor.execute(TABLE_ESTIMATE_SQL, (self.estimate_table,))
+            elif self.count_query:
+                cursor.execute(self.count_query)
+            else:
+                return None
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] is not None else None
+        finally:
+            cursor.close()
+
+
+EXPORTS = {
+    "users": ExportSpec("Users", svc.USER_LIST_SQL, count_query=svc.USER_COUNT_SQL),
+    "subscriptions": ExportSpec("Subscriptions", svc.SUBSCRIPTION_LIST_SQL,
+                                count_query="SELECT COUNT(*) FROM User_Subscription"),
+    "payments": ExportSpec("Payments", """SELECT payment_id, subscription_id, amount, payment_date,
+                               payment_method, status
+                               FROM Payment ORDER BY payment_id""", estimate_table="Payment"),
+    "payment_summary": ExportSpec("Payment Summary", svc.PAYMENT_SUMMARY_SQL),
+    "watch_history": ExportSpec("Watch History", """SELECT history_id, profile_id, content_id, episode_id,
+                                    device_id, watch_date, completion_percentage
+                                    FROM Watch_History ORDER BY history_id""",
+                                estimate_table="Watch_History"),
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+# ---------------- WRITERS ----------------
+class CsvSink:
+    def __init__(self, path, columns):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def arrow_type(pa, type_code):
+    """Arrow type for a MySQL column type, so all-NULL chunks still fit the schema"""
+    from mysql.connector import FieldType
+    if type_code in (FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG,
+                     FieldType.LONGLONG, FieldType.YEAR):
+        return pa.int64()
+    if type_code in (FieldType.DECIMAL, FieldType.NEWDECIMAL):
+        return pa.decimal128(38, 6)
+    if type_code in (FieldType.FLOAT, FieldType.DOUBLE):
+        return pa.float64()
+    if type_code in (FieldType.DATE, FieldType.NEWDATE):
+        return pa.date32()
+    if type_code in (FieldType.DATETIME, FieldType.TIMESTAMP):
+        return pa.timestamp("us")
+    return pa.string()
+
+
+class ParquetSink:
+    """Writes one zstd-compressed row group per chunk"""
+
+    def __init__(self, path, description):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pa
+        self.columns = [column[0] for column in description]
+        self.schema = pa.schema([(column[0], arrow_type(pa, column[1])) for column in description])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        data = {name: [row[i] for row in rows] for i, name in enumerate(self.columns)}
+        self.writer.write_table(self.pa.Table.from_pydict(data, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def sink_for(path, description):
+    if path.lower().endswith(".parquet"):
+        return ParquetSink(path, description)
+    return CsvSink(path, [column[0] for column in description])
+
+
+# ---------------- EXPORT ----------------
+def export(name, path, chunk_rows=CHUNK_ROWS, progress=None, cancel_event=None, connect=connect_db):
+    """Stream the named export into path (.csv or .parquet).
+
+    progress(rows_written, expected_rows) is called after every chunk and
+    setting cancel_event stops the export and removes the partial file.
+    Returns the number of rows written.
+    """
+    spec = EXPORTS[name]
+    conn = connect()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+
+    expected = spec.expected_rows(conn)
+    temp_path = path + ".part"
+    sink = None
+    written = 0
+    finished = False
+    try:
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(spec.query)
+        sink = sink_for(temp_path, cursor.description)
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ExportCancelled(f"{spec.label} export cancelled after {written:,} rows")
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            sink.write(rows)
+            written += len(rows)
+            if progress:
+                progress(written, expected)
+        sink.close()
+        sink = None
+        cursor.close()
+        os.replace(temp_path, path)
+        finished = True
+        return written
+    finally:
+        if sink is not None:
+            sink.close()
+        if not finished:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            # Unread rows would have to be drained before a normal close
+            conn.shutdown()
+        else:
+            conn.close()
+
+
+def start_export(name, path, chunk_rows=CHUNK_ROWS, progress=None, done=None):
+    """Run export() in a background thread.
+
+    done(rows_written, error) is called from the worker thread when it ends.
+    Returns the cancel event; set it to stop the export.
+    """
+    cancel_event = threading.Event()
+
+    def worker():
+        try:
+            rows = export(name, path, chunk_rows, progress, cancel_event)
+            error = None
+        except Exception as e:
+            rows, error = None, e
+        if done:
+            done(rows, error)
+
+    threading.Thread(target=worker, daemon=True).start()
+    return cancel_event
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export OTT data to CSV or Parquet")
+    parser.add_argument("name", choices=sorted(EXPORTS))
+    parser.add_argument("path", help="output file, .csv or .parquet")
+    parser.add_argument("--chunk", type=int, default=CHUNK_ROWS, help="rows per fetchmany()")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+
+    def progress(rows, expected):
+        total = f"/~{expected:,}" if expected else ""
+        print(f"\r{rows:,}{total} rows", end="", flush=True)
+
+    rows = export(args.name, args.path, args.chunk, progress)
+    print(f"\nWrote {rows:,} rows to {args.path} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""In-memory bitmap index for faceted content browsing.
+
+One bitset per facet value (genre, language, rating, content type), stored
+as a Python int with bit content_id set for every title that has the value.
+Filtering is OR within a facet and AND across facets; the count next to
+each value is a popcount of its bitset ANDed with the filters of the other
+facets, so all counts for a selection take a few dozen big-int operations
+instead of one COUNT query per value.
+
+The index is loaded once from Content and Content_Genre and then kept
+current from binlog change events (ott_cdc) through apply().
+"""
+import threading
+
+import ott_service as svc
+
+DIMENSIONS = ("genre", "language", "rating", "content_type")
+RATING_ORDER = ("G", "PG", "PG-13", "R", "NC-17")
+
+
+def bits_of(content_ids):
+    """Bitset with the bit of every id set"""
+    bits = 0
+    for content_id in content_ids:
+        bits |= 1 << content_id
+    return bits
+
+
+def ids_of(bits):
+    """Ids whose bit is set, ascending"""
+    # One pass over the binary digits beats peeling off the lowest bit per id
+    digits = bin(bits)[:1:-1]
+    return [i for i, digit in enumerate(digits) if digit == "1"]
+
+
+class FacetIndex:
+    """Bitsets per facet value over content_id, safe to update from the CDC thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bits = {dimension: {} for dimension in DIMENSIONS}  # dimension -> value -> bitset
+        self.all = 0
+        self.genre_names = {}
+        self._content = {}   # content_id -> (language, rating, content_type)
+        self._genres = {}    # content_id -> {genre_id}
+
+    def load(self, conn):
+        """Build the whole index from the database"""
+        return self.fill(svc.content_facets(conn), svc.content_genres(conn), svc.genre_names(conn))
+
+    def fill(self, content, genres, names):
+        """Build the whole index from content_facets, content_genres and genre_names rows"""
+        with self._lock:
+            self.bits = {dimension: {} for dimension in DIMENSIONS}
+            self.all = 0
+            self._content, self._genres = {}, {}
+            self.genre_names = names
+            for content_id, language, rating, content_type in content:
+                self._add_content(content_id, language, rating, content_type)
+            for content_id, genre_id in genres:
+                self._set_genre(content_id, genre_id, True)
+        return self
+
+    # ---------------- UPDATES ----------------
+    def _set(self, dimension, value, content_id, on):
+        if value is None:
+            return
+        values = self.bits[dimension]
+        if on:
+            values[value] = values.get(value, 0) | (1 << content_id)
+        elif value in values:
+            remaining = values[value] & ~(1 << content_id)
+            if remaining:
+                values[value] = remaining
+            else:
+                del values[value]
+
+    def _add_content(self, content_id, language, rating, content_type):
+        self._content[content_id] = (language, rating, content_type)
+        self.all |= 1 << content_id
+        for dimension, value in zip(("language", "rating", "content_type"), (language, rating, content_type)):
+            self._set(dimension, value, content_id, True)
+
+    def _remove_content(self, content_id, keep_genres=False):
+        attributes = self._content.pop(content_id, None)
+        if attributes is not None:
+            for dimension, value in zip(("language", "rating", "content_type"), attributes):
+                self._set(dimension, value, content_id, False)
+        self.all &= ~(1 << content_id)
+        if keep_genres:
+            return
+        # Content_Genre rows go with ON DELETE CASCADE, which the binlog does not carry
+        for genre_id in self._genres.pop(content_id, ()):
+            self._set("genre", genre_id, content_id, False)
+
+    def _set_genre(self, content_id, genre_id, on):
+        genres = self._genres.setdefault(content_id, set())
+        if on:
+            genres.add(genre_id)
+        else:
+            genres.discard(genre_id)
+        self._set("genre", genre_id, content_id, on)
+
+    def apply(self, event):
+        """Update from a Content or Content_Genre change event"""
+        with self._lock:
+            if event.table == "Content":
+                before, after = event.before, event.after
+                if before:
+                    # An update that keeps the id keeps its genres
+                    same_id = after is not None and after["content_id"] == before["content_id"]
+                    self._remove_content(before["content_id"], keep_genres=same_id)
+                if after:
+                    self._add_content(after["content_id"], after.get("language"), after.get("rating"),
+                                      after.get("content_type"))
+            elif event.table == "Content_Genre":
+                if event.before:
+                    self._set_genre(event.before["content_id"], event.before["genre_id"], False)
+                if event.after:
+                    self._set_genre(event.after["content_id"], event.after["genre_id"], True)
+
+    # ---------------- QUERIES ----------------
+    def _union(self, dimension, values):
+        bits = 0
+        for value in values:
+            bits |= self.bits[dimension].get(value, 0)
+        return bits
+
+    def _masks(self, filters):
+        return {dimension: self._union(dimension, values) for dimension, values in filters.items() if values}
+
+    def select(self, filters, base=None):
+        """Bitset of the titles matching {dimension: values}; values OR together, dimensions AND"""
+        with self._lock:
+            bits = self.all if base is None else self.all & base
+            for mask in self._masks(filters).values():
+                bits &= mask
+            return bits
+
+    def counts(self, filters, base=None):
+        """{dimension: {value: titles}} for every value, each counted under the other dimensions' filters"""
+        with self._lock:
+            masks = self._masks(filters)
+            start = self.all if base is None else self.all & base
+            result = {}
+            for dimension in DIMENSIONS:
+                others = start
+                for other, mask in masks.items():
+                    if other != dimension:
+                        others &= mask
+                result[dimension] = {value: (bits & others).bit_count()
+                                     for value, bits in self.bits[dimension].items()}
+            return result
+
+    def values(self, dimension):
+        """Values present for a dimension, in display order"""
+        with self._lock:
+            values = list(self.bits[dimension])
+        if dimension == "rating":
+            return sorted(values, key=lambda value: RATING_ORDER.index(value) if value in RATING_ORDER else 99)
+        if dimension == "genre":
+            return sorted(values, key=self.label_for("genre"))
+        return sorted(values)
+
+    def label_for(self, dimension):
+        """Function giving the display text of a value"""
+        if dimension == "genre":
+            return lambda genre_id: self.genre_names.get(genre_id, f"Genre {genre_id}")
+        if dimension == "content_type":
+            return lambda value: value.title()
+        return str
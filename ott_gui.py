@@ -1,35 +1,199 @@
+import time
+_started = time.perf_counter()  # for the startup profile
+
 import tkinter as tk
-from tkinter import ttk, messagebox
-from db_connect import connect_db
-import ttkbootstrap as tb
-from ttkbootstrap.constants import *
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
-
-# ---------------- APP WINDOW ----------------
-root = tb.Window(themename="darkly")
-root.title("OTT Database Manager")
-root.geometry("1200x750")
-root.state('zoomed')  # Start maximized
-
-# ---------------- DB CONNECTION ----------------
-conn = connect_db()
-cursor = conn.cursor()
+import argparse
+import functools
+import json
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+import ott_service as svc
+import ott_statements
+import ott_cdc
+import ott_series
+import ott_facets
+import ott_snapshot
+# ttkbootstrap, db_connect (mysql.connector) and the export/deletion/archive/
+# recommendation modules are imported where first used, after the window is up
+
+# Set by main(); callbacks below read the connection and widgets from module scope.
+# conn is None until the database answers, and stays None in offline mode
+root = None
+conn = None
+
+# Tabs are built the first time they are shown; keys of TABS already built
+built_tabs = set()
+
+# ---------------- STARTUP PROFILE ----------------
+# (category, name, ms) for every timed step from the first import on
+startup_phases = [("import", "ott_gui and its modules", (time.perf_counter() - _started) * 1000)]
+
+@contextmanager
+def profiled(category, name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases.append((category, name, (time.perf_counter() - started) * 1000))
+
+def since_start_ms():
+    return (time.perf_counter() - _started) * 1000
+
+def report_startup(first_paint_ms, ready_ms, fresh_ms, json_path=None):
+    """Print the timing breakdown and optionally write it as JSON"""
+    print(f"{'phase':<10}{'step':<34}{'ms':>9}")
+    totals = {}
+    for category, name, ms in startup_phases:
+        totals[category] = totals.get(category, 0.0) + ms
+        print(f"{category:<10}{name:<34}{ms:>9.1f}")
+    print("totals: " + ", ".join(f"{category} {ms:.1f} ms" for category, ms in totals.items()))
+    print(f"first paint {first_paint_ms:.1f} ms, first tab ready {ready_ms:.1f} ms, "
+          f"live data {fresh_ms:.1f} ms (from import)")
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"first_paint_ms": first_paint_ms, "ready_ms": ready_ms, "fresh_ms": fresh_ms,
+                       "totals": totals,
+                       "phases": [{"category": c, "name": n, "ms": ms} for c, n, ms in startup_phases]},
+                      f, indent=2)
+
+# Live updates from the binlog, only when OTT_CDC is enabled
+cdc_consumer = None
+cdc_changes = queue.Queue()
+cdc_latency = ott_cdc.LatencyTracker()
+payment_totals = None
+
+# Large lists are kept as compact RowStores and formatted a page at a time
+# as they scroll into view: tree -> [store, rows shown, (sort column, reverse)]
+tree_rows = {}
+ROW_PAGE = 500
+subscription_store = None  # all subscriptions, before the status filter
+
+# Faceted browse over the content list: bitmap index, loaded rows by id,
+# toggle state per (facet, value), and the last title search as a bitset
+facet_index = ott_facets.FacetIndex()
+content_by_id = {}
+facet_vars = {}
+facet_buttons = {}
+facet_base = None
+FACET_LABELS = {"genre": "Genre", "language": "Language", "rating": "Rating", "content_type": "Type"}
+
+# Seasons/episodes loaded on demand for the series drill-down
+series_cache = ott_series.SeriesCache()
+PREFETCH_DELAY_MS = 250
+
+# Retention heatmap: the report on screen, read from ott_cohorts' own cache
+# until recomputed (it is never part of the snapshot)
+cohort_report = None
+COHORT_METRICS = {"Subscribed": "subscribed", "Watching": "watching", "Churned": "churned"}
+
+# Warm start: views are recorded as they load and saved on exit; the next
+# launch shows the saved copy, marked stale, until the database answers
+snapshot = ott_snapshot.Snapshot()
+stale_views = set()          # views on screen from the snapshot
+prefetched = {}              # view -> value the background reconcile loaded
+connect_results = queue.Queue()
+
+# view -> loader; views read their data through fetch()
+VIEW_LOADERS = {
+    "users": svc.user_rows,
+    "subscriptions": svc.subscription_rows,
+    "content": svc.list_content,
+    "content_facets": svc.content_facets,
+    "content_genres": svc.content_genres,
+    "genre_names": svc.genre_names,
+    "revenue": svc.revenue_summary,
+    "user_stats": svc.user_stats,
+    "payment_methods": svc.payment_methods,
+    "plan_stats": svc.plan_stats,
+    "content_stats": svc.content_stats,
+    "payment_logs": lambda conn: svc.payment_logs(conn, 20),
+    "watch_stats": lambda conn: svc.watch_stats(conn, 15),
+    "devices": svc.device_rows,
+    "device_types": svc.device_type_counts,
+    "active_users": lambda conn: svc.most_active_users(conn, 10),
+}
 
 # ---------------- UTILITY FUNCTIONS ----------------
+class NotInSnapshot(LookupError):
+    """A view asked for while not connected that the snapshot does not hold"""
+
+def fetch(name):
+    """A view's data: fresh from the database, or the saved copy until connected"""
+    if name in prefetched:
+        value = prefetched.pop(name)
+    elif conn is not None:
+        value = VIEW_LOADERS[name](conn)
+    elif name in snapshot:
+        stale_views.add(name)
+        return snapshot.get(name)
+    else:
+        raise NotInSnapshot(f"{name} is not in the snapshot")
+    stale_views.discard(name)
+    snapshot.record(name, value)
+    return value
+
+def online_only(action):
+    """For callbacks that query or write: without a connection, say so instead"""
+    @functools.wraps(action)
+    def guarded(*args, **kwargs):
+        if conn is None:
+            messagebox.showinfo("Read-Only", "Not connected to the database. The data shown is the "
+                                             "last saved snapshot and cannot be changed or searched.")
+            return None
+        return action(*args, **kwargs)
+    return guarded
+
 def clear_entries(*entries):
     """Clear all entry widgets"""
     for entry in entries:
         entry.delete(0, tk.END)
 
-def refresh_treeview(tree, query, columns):
+def refresh_treeview(tree, rows):
     """Refresh a treeview with new data"""
     for item in tree.get_children():
         tree.delete(item)
-    cursor.execute(query)
-    for row in cursor.fetchall():
+    for row in rows:
         tree.insert('', 'end', values=row)
 
+def show_rows(tree, store, sort=None):
+    """Show a RowStore in a treeview, formatting only the first page"""
+    tree.delete(*tree.get_children())
+    tree_rows[tree] = [store, 0, sort]
+    show_more_rows(tree)
+
+def show_more_rows(tree):
+    store, shown, _ = tree_rows[tree]
+    end = min(shown + ROW_PAGE, len(store))
+    for i in range(shown, end):
+        tree.insert('', 'end', values=store.format(i))
+    tree_rows[tree][1] = end
+
+def page_rows_on_scroll(tree, scrollbar):
+    """Format the next page when the view nears the end; headings sort in memory"""
+    def on_scroll(first, last):
+        scrollbar.set(first, last)
+        entry = tree_rows.get(tree)
+        if entry and float(last) > 0.95 and entry[1] < len(entry[0]):
+            tree.after_idle(show_more_rows, tree)
+    tree.configure(yscrollcommand=on_scroll)
+    for index, col in enumerate(tree["columns"]):
+        tree.heading(col, command=lambda index=index: sort_rows(tree, index))
+
+def sort_rows(tree, index):
+    """Re-sort the rows behind a treeview by one column; a second click reverses"""
+    if tree not in tree_rows:
+        return
+    store, _, sort = tree_rows[tree]
+    reverse = sort == (index, False)
+    show_rows(tree, store.sort(store.fields[index], reverse), (index, reverse))
+
 # ---------------- USER MANAGEMENT FUNCTIONS ----------------
+@online_only
 def add_user():
     first = entry_first.get().strip()
     last = entry_last.get().strip()
@@ -41,8 +205,7 @@ def add_user():
         return
 
     try:
-        cursor.callproc("AddNewUser", [first, last, email, phone])
-        conn.commit()
+        svc.add_user(conn, first, last, email, phone)
         messagebox.showinfo("Success", f"User {first} {last} added successfully!")
         clear_entries(entry_first, entry_last, entry_email, entry_phone)
         view_users()
@@ -50,45 +213,33 @@ def add_user():
         messagebox.showerror("Database Error", str(e))
 
 def view_users():
-    query = """SELECT u.user_id, u.first_name, u.last_name, ue.email, up.phone_number, u.registration_date
-               FROM User u
-               LEFT JOIN User_Email ue ON u.user_id = ue.user_id
-               LEFT JOIN User_Phone up ON u.user_id = up.user_id
-               ORDER BY u.user_id DESC"""
-    refresh_treeview(tree_users, query, None)
+    show_rows(tree_users, fetch("users"))
 
+@online_only
 def search_users():
-    search_term = entry_user_search.get().strip()
-    if not search_term:
-        view_users()
-        return
-    
-    query = f"""SELECT u.user_id, u.first_name, u.last_name, ue.email, up.phone_number, u.registration_date
-               FROM User u
-               LEFT JOIN User_Email ue ON u.user_id = ue.user_id
-               LEFT JOIN User_Phone up ON u.user_id = up.user_id
-               WHERE u.first_name LIKE '%{search_term}%' 
-               OR u.last_name LIKE '%{search_term}%'
-               OR ue.email LIKE '%{search_term}%'"""
-    refresh_treeview(tree_users, query, None)
+    show_rows(tree_users, svc.user_rows(conn, entry_user_search.get()))
 
+@online_only
 def delete_user():
-    """Delete selected user from the database"""
+    """Delete the selected users in the background"""
     selected = tree_users.selection()
     if not selected:
         messagebox.showerror("Error", "Please select a user to delete")
         return
-    
+
     # Get user details
-    item = tree_users.item(selected[0])
-    user_data = item['values']
-    user_id = user_data[0]
-    user_name = f"{user_data[1]} {user_data[2]}"
-    
+    users = [tree_users.item(item)['values'] for item in selected]
+    user_ids = [user_data[0] for user_data in users]
+    if len(users) == 1:
+        user_data = users[0]
+        who = f"user '{user_data[1]} {user_data[2]}' (ID: {user_data[0]})"
+    else:
+        who = f"{len(users)} selected users"
+
     # Confirm deletion
     confirm = messagebox.askyesno(
-        "Confirm Delete", 
-        f"Are you sure you want to delete user '{user_name}' (ID: {user_id})?\n\n"
+        "Confirm Delete",
+        f"Are you sure you want to delete {who}?\n\n"
         "This will also delete:\n"
         "• All user subscriptions\n"
         "• All user profiles\n"
@@ -97,899 +248,543 @@ def delete_user():
         "• Email and phone records\n\n"
         "This action cannot be undone!"
     )
-    
+
     if confirm:
+        import ott_deletion
         try:
-            cursor.execute("DELETE FROM User WHERE user_id = %s", (user_id,))
-            conn.commit()
-            messagebox.showinfo("Success", f"User '{user_name}' deleted successfully!")
-            view_users()
+            job_ids = ott_deletion.enqueue(conn, user_ids)
         except Exception as e:
             messagebox.showerror("Database Error", str(e))
-            conn.rollback()
+            return
+        for item in selected:
+            tree_users.delete(item)
+        run_deletion_jobs(job_ids)
 
 # ---------------- SUBSCRIPTION FUNCTIONS ----------------
 def view_subscriptions():
-    query = """SELECT us.subscription_id, u.first_name, u.last_name, sp.plan_name, 
-               us.start_date, us.end_date, us.status, us.auto_renewal
-               FROM User_Subscription us
-               JOIN User u ON us.user_id = u.user_id
-               JOIN Subscription_Plan sp ON us.plan_id = sp.plan_id
-               ORDER BY us.subscription_id DESC"""
-    refresh_treeview(tree_subscriptions, query, None)
+    global subscription_store
+    subscription_store = fetch("subscriptions")
+    filter_subscriptions()
 
+def filter_subscriptions(event=None):
+    """Apply the status filter to the loaded subscriptions without a query"""
+    if subscription_store is None:
+        return
+    status = subscription_status_filter.get()
+    show_rows(tree_subscriptions,
+              subscription_store if status == "All" else subscription_store.where("status", status))
+
+@online_only
 def renew_subscription():
     try:
         sub_id = entry_sub_id.get().strip()
         if not sub_id:
             messagebox.showerror("Error", "Please enter Subscription ID")
             return
-        
-        cursor.callproc("RenewSubscription", [int(sub_id)])
-        conn.commit()
+
+        svc.renew_subscription(conn, int(sub_id))
         messagebox.showinfo("Success", f"Subscription {sub_id} renewed successfully!")
         entry_sub_id.delete(0, tk.END)
         view_subscriptions()
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
+@online_only
 def check_days_left():
     try:
         sub_id = entry_days_check.get().strip()
         if not sub_id:
             messagebox.showerror("Error", "Please enter Subscription ID")
             return
-        
-        cursor.execute(f"SELECT DaysLeft({sub_id})")
-        result = cursor.fetchone()
-        if result:
-            days = result[0]
+
+        days = svc.days_left(conn, int(sub_id))
+        if days is not None:
             if days > 0:
                 messagebox.showinfo("Days Remaining", f"Subscription has {days} days left")
             else:
                 messagebox.showwarning("Expired", f"Subscription expired {abs(days)} days ago")
+        else:
+            messagebox.showerror("Not Found", f"Subscription {sub_id} not found")
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
 # ---------------- CONTENT FUNCTIONS ----------------
 def view_content():
+    global facet_base
+    rows = fetch("content")
+    content_by_id.clear()
+    content_by_id.update((row.content_id, row) for row in rows)
+    facet_base = None
+    clear_facet_selection()
+    update_facet_counts({})
+    show_all_content(rows)
+
+def show_all_content(rows):
     global content_cards
-    
+
     # Clear existing content
     for widget in scrollable_frame_content.winfo_children():
         widget.destroy()
     content_cards = []
-    
-    query = """SELECT c.content_id, c.title, c.content_type, c.rating, c.language, 
-               c.release_date, ROUND(AvgContentRating(c.content_id), 2) as avg_rating,
-               c.description
-               FROM Content c
-               ORDER BY c.content_id DESC"""
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+
     # Group content by type
-    movies = [row for row in rows if row[2] == 'movie']
-    series = [row for row in rows if row[2] == 'series']
-    
+    movies = [row for row in rows if row.content_type == 'movie']
+    series = [row for row in rows if row.content_type == 'series']
+
     # Display Movies Section
     if movies:
-        movies_label = ttk.Label(scrollable_frame_content, text="🎬 Movies", 
+        movies_label = ttk.Label(scrollable_frame_content, text="🎬 Movies",
                                 font=("Helvetica", 18, "bold"), foreground="white", background="#141414")
         movies_label.pack(anchor="w", padx=20, pady=(20, 10))
-        
+
         movies_container = ttk.Frame(scrollable_frame_content)
         movies_container.pack(fill="x", padx=20, pady=(0, 20))
-        
+
         for idx, movie in enumerate(movies):
             create_content_card(movies_container, movie, idx % 4)
-    
+
     # Display Series Section
     if series:
-        series_label = ttk.Label(scrollable_frame_content, text="📺 Series", 
+        series_label = ttk.Label(scrollable_frame_content, text="📺 Series",
                                 font=("Helvetica", 18, "bold"), foreground="white", background="#141414")
         series_label.pack(anchor="w", padx=20, pady=(20, 10))
-        
+
         series_container = ttk.Frame(scrollable_frame_content)
         series_container.pack(fill="x", padx=20, pady=(0, 20))
-        
+
         for idx, show in enumerate(series):
             create_content_card(series_container, show, idx % 4)
 
 def create_content_card(parent, content_data, column):
     """Create a Netflix-style content card"""
     content_id, title, content_type, rating, language, release_date, avg_rating, description = content_data
-    
+
     # Card frame
     card = ttk.Frame(parent, bootstyle="dark", relief="raised", borderwidth=2)
     card.grid(row=column//4, column=column%4, padx=10, pady=10, sticky="nsew")
-    
+
     # Configure grid weights for responsiveness
     parent.columnconfigure(column%4, weight=1, minsize=250)
-    
+
     # Color based on rating
     rating_colors = {
         'G': '#4CAF50',
-        'PG': '#8BC34A', 
+        'PG': '#8BC34A',
         'PG-13': '#FFC107',
         'R': '#FF9800',
         'NC-17': '#F44336'
     }
     rating_color = rating_colors.get(rating, '#9E9E9E')
-    
+
     # Thumbnail placeholder (colored box with icon)
     thumbnail_frame = tk.Frame(card, bg=rating_color, height=140, width=240)
     thumbnail_frame.pack(fill="x", padx=5, pady=5)
     thumbnail_frame.pack_propagate(False)
-    
+
     icon = "🎬" if content_type == "movie" else "📺"
-    thumb_label = tk.Label(thumbnail_frame, text=icon, font=("Helvetica", 48), 
+    thumb_label = tk.Label(thumbnail_frame, text=icon, font=("Helvetica", 48),
                           bg=rating_color, fg="white")
     thumb_label.place(relx=0.5, rely=0.5, anchor="center")
-    
+
     # Rating badge
     rating_badge = tk.Label(thumbnail_frame, text=rating, font=("Helvetica", 10, "bold"),
                            bg="black", fg="white", padx=8, pady=2)
     rating_badge.place(x=5, y=5)
-    
+
     # Info section
     info_frame = ttk.Frame(card, bootstyle="dark")
     info_frame.pack(fill="both", expand=True, padx=8, pady=5)
-    
+
     # Title
     title_label = ttk.Label(info_frame, text=title[:30] + ("..." if len(title) > 30 else ""),
                            font=("Helvetica", 12, "bold"), foreground="white")
     title_label.pack(anchor="w", pady=(0, 5))
-    
+
     # Metadata row
     meta_frame = ttk.Frame(info_frame)
     meta_frame.pack(fill="x", pady=2)
-    
+
     # Language
     lang_label = ttk.Label(meta_frame, text=language, font=("Helvetica", 9),
                           foreground="#b3b3b3", background="#2a2a2a", padding=3)
     lang_label.pack(side="left", padx=(0, 5))
-    
+
     # Year
     year = str(release_date).split('-')[0] if release_date else "N/A"
     year_label = ttk.Label(meta_frame, text=year, font=("Helvetica", 9),
                           foreground="#b3b3b3", background="#2a2a2a", padding=3)
     year_label.pack(side="left", padx=(0, 5))
-    
+
     # Star rating
     if avg_rating and avg_rating > 0:
         stars = "⭐" * int(avg_rating)
         rating_text = f"{stars} {avg_rating}"
     else:
         rating_text = "☆ No ratings"
-    
+
     star_label = ttk.Label(meta_frame, text=rating_text, font=("Helvetica", 9),
                           foreground="#FFD700")
     star_label.pack(side="left")
-    
+
     # Description
     desc_text = description[:80] + "..." if description and len(description) > 80 else (description or "No description available")
     desc_label = ttk.Label(info_frame, text=desc_text, font=("Helvetica", 8),
                           foreground="#999999", wraplength=220)
     desc_label.pack(anchor="w", pady=(5, 5))
-    
-    # Hover effect
+
+    # Hover effect; resting on a series card prefetches its seasons
+    prefetch_job = []
+
     def on_enter(e):
         card.configure(relief="solid", borderwidth=3)
-        
+        if content_type == "series" and not prefetch_job and conn is not None:
+            prefetch_job.append(card.after(PREFETCH_DELAY_MS, lambda: series_cache.prefetch(content_id)))
+
     def on_leave(e):
         card.configure(relief="raised", borderwidth=2)
-    
+        if prefetch_job:
+            card.after_cancel(prefetch_job.pop())
+
     card.bind("<Enter>", on_enter)
     card.bind("<Leave>", on_leave)
-    
+
+    if content_type == "series":
+        def on_click(e):
+            if prefetch_job:
+                card.after_cancel(prefetch_job.pop())
+            open_series_detail(content_id, title)
+
+        for widget in (card, thumbnail_frame, thumb_label, info_frame, title_label, desc_label):
+            widget.bind("<Button-1>", on_click)
+            widget.configure(cursor="hand2")
+
     # Store reference
     content_cards.append(card)
 
+@online_only
+def open_series_detail(content_id, title):
+    """Season/episode drill-down; a season's episodes load when it is expanded"""
+    started = time.perf_counter()
+    try:
+        seasons = series_cache.seasons(conn, content_id)
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
+        return
+
+    window = tk.Toplevel(root)
+    window.title(f"📺 {title}")
+    window.geometry("760x520")
+    window.transient(root)
+
+    tree = ttk.Treeview(window, columns=("Duration", "Views", "Completion"), show="tree headings",
+                        bootstyle="info")
+    tree.heading("#0", text="Season / Episode")
+    tree.heading("Duration", text="Duration")
+    tree.heading("Views", text="Views")
+    tree.heading("Completion", text="Avg Completion")
+    tree.column("#0", width=360)
+    tree.column("Duration", width=100, anchor="center")
+    tree.column("Views", width=100, anchor="center")
+    tree.column("Completion", width=140, anchor="center")
+    tree.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+    status_label = ttk.Label(window, font=("Helvetica", 9), foreground="#999999")
+    status_label.pack(anchor="w", padx=10, pady=(0, 10))
+
+    season_nodes = {}
+    for season in seasons:
+        label = f"Season {season.season_number}" + (f" — {season.title}" if season.title else "")
+        node = tree.insert("", "end", text=label, values=("", "", f"{season.episode_count} episodes"))
+        season_nodes[node] = season.season_id
+        # Placeholder child so the season shows an expander before its episodes are loaded
+        tree.insert(node, "end", text="Loading...")
+    status_label.configure(text=f"{len(seasons)} seasons loaded in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def on_open(e):
+        node = tree.focus()
+        season_id = season_nodes.pop(node, None)
+        if season_id is None:
+            return  # already loaded
+        opened = time.perf_counter()
+        try:
+            rows = series_cache.episodes(conn, season_id)
+        except Exception as err:
+            season_nodes[node] = season_id
+            messagebox.showerror("Error", str(err), parent=window)
+            return
+        tree.delete(*tree.get_children(node))
+        for ep in rows:
+            completion = f"{ep.avg_completion:.0f}%" if ep.avg_completion is not None else "-"
+            tree.insert(node, "end", text=f"E{ep.episode_number}  {ep.title or ''}",
+                        values=(f"{ep.duration} min" if ep.duration else "-", ep.views, completion))
+        status_label.configure(text=f"{len(rows)} episodes loaded in {(time.perf_counter() - opened) * 1000:.0f} ms")
+
+    tree.bind("<<TreeviewOpen>>", on_open)
+
+@online_only
 def search_content():
-    global content_cards
-    
+    global facet_base
+
     search_term = entry_content_search.get().strip()
-    
+    if not search_term:
+        view_content()
+        return
+
+    rows = svc.search_content(conn, search_term)
+
+    # Facets now count and filter within the search results
+    facet_base = ott_facets.bits_of(row.content_id for row in rows)
+    clear_facet_selection()
+    update_facet_counts({})
+    show_content_results(rows, f"Search Results for '{search_term}'", f"No results found for '{search_term}'")
+
+def show_content_results(rows, heading, empty_text):
+    global content_cards
+
     # Clear existing content
     for widget in scrollable_frame_content.winfo_children():
         widget.destroy()
     content_cards = []
-    
-    if not search_term:
-        view_content()
-        return
-    
-    query = f"""SELECT c.content_id, c.title, c.content_type, c.rating, c.language, 
-               c.release_date, ROUND(AvgContentRating(c.content_id), 2) as avg_rating,
-               c.description
-               FROM Content c
-               WHERE c.title LIKE '%{search_term}%' OR c.language LIKE '%{search_term}%'
-               ORDER BY c.content_id DESC"""
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    
+
     if not rows:
-        no_results = ttk.Label(scrollable_frame_content, 
-                              text=f"No results found for '{search_term}'",
+        no_results = ttk.Label(scrollable_frame_content, text=empty_text,
                               font=("Helvetica", 16), foreground="#999999")
         no_results.pack(pady=50)
         return
-    
-    # Display search results
-    results_label = ttk.Label(scrollable_frame_content, 
-                             text=f"Search Results for '{search_term}' ({len(rows)} found)", 
+
+    # Display results
+    results_label = ttk.Label(scrollable_frame_content,
+                             text=f"{heading} ({len(rows)} found)",
                              font=("Helvetica", 18, "bold"), foreground="white", background="#141414")
     results_label.pack(anchor="w", padx=20, pady=(20, 10))
-    
+
     results_container = ttk.Frame(scrollable_frame_content)
     results_container.pack(fill="x", padx=20, pady=(0, 20))
-    
+
     for idx, content in enumerate(rows):
         create_content_card(results_container, content, idx % 4)
 
+# ---------------- CONTENT BROWSE ----------------
+def load_facets():
+    facet_index.fill(fetch("content_facets"), fetch("content_genres"), fetch("genre_names"))
+    build_facet_panel()
+
+def build_facet_panel():
+    """One row of toggle buttons per facet; selections survive a rebuild"""
+    for widget in frame_facets.winfo_children():
+        widget.destroy()
+    facet_buttons.clear()
+    for row, dimension in enumerate(ott_facets.DIMENSIONS):
+        ttk.Label(frame_facets, text=FACET_LABELS[dimension], font=("Helvetica", 10, "bold")).grid(
+            row=row, column=0, padx=5, pady=2, sticky="w")
+        values_frame = ttk.Frame(frame_facets)
+        values_frame.grid(row=row, column=1, pady=2, sticky="w")
+        for value in facet_index.values(dimension):
+            var = facet_vars.setdefault((dimension, value), tk.BooleanVar(value=False))
+            button = ttk.Checkbutton(values_frame, variable=var, command=apply_facets,
+                                     bootstyle="success-outline-toolbutton")
+            button.pack(side="left", padx=2)
+            facet_buttons[dimension, value] = button
+    update_facet_counts(selected_facets())
+
+def selected_facets():
+    filters = {}
+    for (dimension, value), var in facet_vars.items():
+        if var.get() and (dimension, value) in facet_buttons:
+            filters.setdefault(dimension, set()).add(value)
+    return filters
+
+def clear_facet_selection():
+    for var in facet_vars.values():
+        var.set(False)
+
+def update_facet_counts(filters):
+    """Label every facet value with the titles it would leave, from the bitmap index"""
+    counts = facet_index.counts(filters, facet_base)
+    for (dimension, value), button in facet_buttons.items():
+        label = facet_index.label_for(dimension)(value)
+        button.config(text=f"{label} ({counts[dimension].get(value, 0)})")
+
+def apply_facets():
+    """Intersect the selected facets and show the matching titles"""
+    filters = selected_facets()
+    update_facet_counts(filters)
+    if not filters and facet_base is None:
+        show_all_content(list(content_by_id.values()))
+        return
+    ids = ott_facets.ids_of(facet_index.select(filters, facet_base))
+    rows = [content_by_id[content_id] for content_id in reversed(ids) if content_id in content_by_id]
+    heading = "Search Results" if facet_base is not None else "Browse"
+    show_content_results(rows, heading, "No titles match these filters")
+
+def refresh_browse():
+    """After content changes: reload the card data and redraw the facets around the current selection"""
+    content_by_id.clear()
+    content_by_id.update((row.content_id, row) for row in fetch("content"))
+    build_facet_panel()
+    apply_facets()
+
+@online_only
 def view_top_rated():
     try:
         limit = entry_top_n.get().strip() or "10"
-        cursor.callproc("TopRatedContent", [int(limit)])
-        for result in cursor.stored_results():
-            rows = result.fetchall()
-        
-        for item in tree_top_rated.get_children():
-            tree_top_rated.delete(item)
-        
-        for row in rows:
-            tree_top_rated.insert('', 'end', values=row)
+        refresh_treeview(tree_top_rated, svc.top_rated(conn, int(limit)))
     except Exception as e:
         messagebox.showerror("Error", str(e))
 
-# ---------------- ANALYTICS FUNCTIONS ----------------
-def view_logs():
-    query = "SELECT * FROM Payment_Log ORDER BY log_time DESC LIMIT 20"
-    refresh_treeview(tree_logs, query, None)
-
-def view_payment_summary():
-    query = """SELECT DATE_FORMAT(payment_date, '%Y-%m') as month, 
-               payment_method, COUNT(*) as transactions, SUM(amount) as total_amount
-               FROM Payment
-               WHERE status = 'success'
-               GROUP BY DATE_FORMAT(payment_date, '%Y-%m'), payment_method
-               ORDER BY month DESC"""
-    refresh_treeview(tree_payment_summary, query, None)
-
-def view_watch_stats():
-    query = """SELECT c.title, COUNT(*) as views, 
-               ROUND(AVG(wh.completion_percentage), 2) as avg_completion
-               FROM Watch_History wh
-               JOIN Content c ON wh.content_id = c.content_id
-               GROUP BY c.title
-               ORDER BY views DESC
-               LIMIT 15"""
-    refresh_treeview(tree_watch_stats, query, None)
+@online_only
+def view_recommendations():
+    profile_id = entry_rec_profile.get().strip()
+    if not profile_id:
+        messagebox.showwarning("Input Error", "Please enter a Profile ID!")
+        return
+    try:
+        refresh_treeview(tree_recommendations, svc.recommendations(conn, int(profile_id), 10))
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
 
-# ---------------- DEVICE MANAGEMENT ----------------
-def view_devices():
-    query = """SELECT d.device_id, u.first_name, u.last_name, d.device_name, 
-               d.device_type, d.last_used
-               FROM Device d
-               JOIN User u ON d.user_id = u.user_id
-               ORDER BY d.last_used DESC"""
-    refresh_treeview(tree_devices, query, None)
+@online_only
+def view_continue_watching():
+    profile_id = entry_rec_profile.get().strip()
+    if not profile_id:
+        messagebox.showwarning("Input Error", "Please enter a Profile ID!")
+        return
+    try:
+        rows = svc.continue_watching(conn, int(profile_id), 10)
+        refresh_treeview(tree_continue, [(r.content_id, r.title, r.episode_title or "-",
+                                          f"{r.completion_percentage or 0:.0f}%", r.last_watched)
+                                         for r in rows])
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
 
-# ---------------- UI SETUP ----------------
-# Header
-header_frame = ttk.Frame(root, bootstyle="dark")
-header_frame.pack(fill="x", padx=10, pady=10)
-
-ttk.Label(header_frame, text="🎬 OTT Database Manager", 
-          font=("Helvetica", 24, "bold")).pack(side="left", padx=10)
-
-ttk.Label(header_frame, text=f"📅 {datetime.now().strftime('%B %d, %Y')}", 
-          font=("Helvetica", 12)).pack(side="right", padx=10)
-
-# Main Notebook
-notebook = ttk.Notebook(root, bootstyle="dark")
-notebook.pack(expand=True, fill='both', padx=10, pady=5)
-
-# ============ TAB 1: USERS ============
-tab_users = ttk.Frame(notebook)
-notebook.add(tab_users, text="👤 Users")
-
-# Add User Section
-frame_add_user = ttk.LabelFrame(tab_users, text="➕ Add New User", padding=15, bootstyle="primary")
-frame_add_user.pack(fill="x", padx=15, pady=10)
-
-user_input_frame = ttk.Frame(frame_add_user)
-user_input_frame.pack(fill="x")
-
-# Row 1
-ttk.Label(user_input_frame, text="First Name:", font=("Helvetica", 10)).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-entry_first = ttk.Entry(user_input_frame, width=20, bootstyle="primary")
-entry_first.grid(row=0, column=1, padx=5, pady=5)
-
-ttk.Label(user_input_frame, text="Last Name:", font=("Helvetica", 10)).grid(row=0, column=2, padx=5, pady=5, sticky="w")
-entry_last = ttk.Entry(user_input_frame, width=20, bootstyle="primary")
-entry_last.grid(row=0, column=3, padx=5, pady=5)
+@online_only
+def rebuild_recommendations():
+    """Rebuild the neighbour lists in a child process and poll until it exits"""
+    import ott_recommend
+    try:
+        process = ott_recommend.start_rebuild()
+    except Exception as e:
+        messagebox.showerror("Error", str(e))
+        return
+    button_rebuild.configure(state="disabled", text="⏳ Rebuilding...")
 
-# Row 2
-ttk.Label(user_input_frame, text="Email:", font=("Helvetica", 10)).grid(row=1, column=0, padx=5, pady=5, sticky="w")
-entry_email = ttk.Entry(user_input_frame, width=25, bootstyle="primary")
-entry_email.grid(row=1, column=1, padx=5, pady=5)
+    def poll():
+        if process.is_alive():
+            root.after(500, poll)
+            return
+        button_rebuild.configure(state="normal", text="🔁 Rebuild")
+        if process.exitcode == 0:
+            messagebox.showinfo("Recommendations", "Recommendations rebuilt.")
+        else:
+            messagebox.showerror("Recommendations", f"Rebuild failed (exit code {process.exitcode}).")
 
-ttk.Label(user_input_frame, text="Phone:", font=("Helvetica", 10)).grid(row=1, column=2, padx=5, pady=5, sticky="w")
-entry_phone = ttk.Entry(user_input_frame, width=20, bootstyle="primary")
-entry_phone.grid(row=1, column=3, padx=5, pady=5)
+    root.after(500, poll)
 
-ttk.Button(user_input_frame, text="✓ Add User", command=add_user, 
-           bootstyle="success", width=15).grid(row=1, column=4, padx=10, pady=5)
+# ---------------- ANALYTICS FUNCTIONS ----------------
+def view_logs():
+    refresh_treeview(tree_logs, fetch("payment_logs"))
 
-# Search and View Users
-frame_view_users = ttk.LabelFrame(tab_users, text="👥 All Users", padding=15, bootstyle="info")
-frame_view_users.pack(fill="both", expand=True, padx=15, pady=10)
-
-search_frame = ttk.Frame(frame_view_users)
-search_frame.pack(fill="x", pady=(0, 10))
-
-ttk.Label(search_frame, text="🔍 Search:", font=("Helvetica", 10)).pack(side="left", padx=5)
-entry_user_search = ttk.Entry(search_frame, width=30, bootstyle="info")
-entry_user_search.pack(side="left", padx=5)
-ttk.Button(search_frame, text="Search", command=search_users, bootstyle="info").pack(side="left", padx=5)
-ttk.Button(search_frame, text="🔄 Refresh All", command=view_users, bootstyle="secondary").pack(side="left", padx=5)
-ttk.Button(search_frame, text="🗑️ Delete Selected", command=delete_user, bootstyle="danger").pack(side="left", padx=15)
-
-# Users Treeview
-tree_frame_users = ttk.Frame(frame_view_users)
-tree_frame_users.pack(fill="both", expand=True)
-
-scroll_users = ttk.Scrollbar(tree_frame_users)
-scroll_users.pack(side="right", fill="y")
-
-tree_users = ttk.Treeview(tree_frame_users, columns=("ID", "First", "Last", "Email", "Phone", "Reg Date"),
-                          show="headings", height=12, yscrollcommand=scroll_users.set, bootstyle="info")
-scroll_users.config(command=tree_users.yview)
-
-tree_users.heading("ID", text="User ID")
-tree_users.heading("First", text="First Name")
-tree_users.heading("Last", text="Last Name")
-tree_users.heading("Email", text="Email")
-tree_users.heading("Phone", text="Phone")
-tree_users.heading("Reg Date", text="Registration Date")
-
-tree_users.column("ID", width=80, anchor="center")
-tree_users.column("First", width=120)
-tree_users.column("Last", width=120)
-tree_users.column("Email", width=200)
-tree_users.column("Phone", width=120)
-tree_users.column("Reg Date", width=120, anchor="center")
-
-tree_users.pack(fill="both", expand=True)
-
-# ============ TAB 2: SUBSCRIPTIONS ============
-tab_subscriptions = ttk.Frame(notebook)
-notebook.add(tab_subscriptions, text="💳 Subscriptions")
-
-# Subscription Management
-frame_sub_manage = ttk.LabelFrame(tab_subscriptions, text="⚙️ Subscription Management", padding=15, bootstyle="warning")
-frame_sub_manage.pack(fill="x", padx=15, pady=10)
-
-sub_controls = ttk.Frame(frame_sub_manage)
-sub_controls.pack(fill="x")
-
-ttk.Label(sub_controls, text="Subscription ID:", font=("Helvetica", 10)).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-entry_sub_id = ttk.Entry(sub_controls, width=15, bootstyle="warning")
-entry_sub_id.grid(row=0, column=1, padx=5, pady=5)
-ttk.Button(sub_controls, text="🔄 Renew Subscription", command=renew_subscription, 
-           bootstyle="success", width=20).grid(row=0, column=2, padx=10, pady=5)
-
-ttk.Label(sub_controls, text="Check Days Left:", font=("Helvetica", 10)).grid(row=0, column=3, padx=15, pady=5, sticky="w")
-entry_days_check = ttk.Entry(sub_controls, width=15, bootstyle="info")
-entry_days_check.grid(row=0, column=4, padx=5, pady=5)
-ttk.Button(sub_controls, text="📅 Check Days", command=check_days_left, 
-           bootstyle="info", width=15).grid(row=0, column=5, padx=5, pady=5)
-
-# View Subscriptions
-frame_view_subs = ttk.LabelFrame(tab_subscriptions, text="📋 All Subscriptions", padding=15, bootstyle="primary")
-frame_view_subs.pack(fill="both", expand=True, padx=15, pady=10)
-
-ttk.Button(frame_view_subs, text="🔄 Refresh Subscriptions", command=view_subscriptions, 
-           bootstyle="primary").pack(pady=(0, 10))
-
-tree_frame_subs = ttk.Frame(frame_view_subs)
-tree_frame_subs.pack(fill="both", expand=True)
-
-scroll_subs = ttk.Scrollbar(tree_frame_subs)
-scroll_subs.pack(side="right", fill="y")
-
-tree_subscriptions = ttk.Treeview(tree_frame_subs, 
-                                  columns=("ID", "First", "Last", "Plan", "Start", "End", "Status", "Auto-Renew"),
-                                  show="headings", height=15, yscrollcommand=scroll_subs.set, bootstyle="primary")
-scroll_subs.config(command=tree_subscriptions.yview)
-
-for col in ["ID", "First", "Last", "Plan", "Start", "End", "Status", "Auto-Renew"]:
-    tree_subscriptions.heading(col, text=col)
-    tree_subscriptions.column(col, width=120, anchor="center")
-
-tree_subscriptions.pack(fill="both", expand=True)
-
-# ============ TAB 3: CONTENT ============
-tab_content = ttk.Frame(notebook)
-notebook.add(tab_content, text="🎬 Content")
-
-# Search Content
-frame_content_search = ttk.LabelFrame(tab_content, text="🔍 Search Content", padding=15, bootstyle="success")
-frame_content_search.pack(fill="x", padx=15, pady=10)
-
-content_search_frame = ttk.Frame(frame_content_search)
-content_search_frame.pack(fill="x")
-
-ttk.Label(content_search_frame, text="Title/Language:", font=("Helvetica", 10)).pack(side="left", padx=5)
-entry_content_search = ttk.Entry(content_search_frame, width=30, bootstyle="success")
-entry_content_search.pack(side="left", padx=5)
-ttk.Button(content_search_frame, text="🔍 Search", command=search_content, 
-           bootstyle="success").pack(side="left", padx=5)
-ttk.Button(content_search_frame, text="🔄 View All", command=view_content, 
-           bootstyle="secondary").pack(side="left", padx=5)
-
-# Content Display - Netflix Style
-frame_view_content = ttk.Frame(tab_content)
-frame_view_content.pack(fill="both", expand=True, padx=15, pady=10)
-
-# Canvas for scrolling
-canvas_content = tk.Canvas(frame_view_content, bg="#141414", highlightthickness=0)
-scrollbar_content = ttk.Scrollbar(frame_view_content, orient="vertical", command=canvas_content.yview)
-scrollable_frame_content = ttk.Frame(canvas_content)
-
-scrollable_frame_content.bind(
-    "<Configure>",
-    lambda e: canvas_content.configure(scrollregion=canvas_content.bbox("all"))
-)
-
-canvas_content.create_window((0, 0), window=scrollable_frame_content, anchor="nw")
-canvas_content.configure(yscrollcommand=scrollbar_content.set)
-
-canvas_content.pack(side="left", fill="both", expand=True)
-scrollbar_content.pack(side="right", fill="y")
-
-# Store content cards for updates
-content_cards = []
-
-# Top Rated Content
-frame_top_rated = ttk.LabelFrame(tab_content, text="⭐ Top Rated Content", padding=15, bootstyle="warning")
-frame_top_rated.pack(fill="x", padx=15, pady=10)
-
-top_rated_controls = ttk.Frame(frame_top_rated)
-top_rated_controls.pack(fill="x", pady=(0, 10))
-
-ttk.Label(top_rated_controls, text="Top N:", font=("Helvetica", 10)).pack(side="left", padx=5)
-entry_top_n = ttk.Entry(top_rated_controls, width=10, bootstyle="warning")
-entry_top_n.insert(0, "10")
-entry_top_n.pack(side="left", padx=5)
-ttk.Button(top_rated_controls, text="📊 View Top Rated", command=view_top_rated, 
-           bootstyle="warning").pack(side="left", padx=5)
-
-tree_top_rated = ttk.Treeview(frame_top_rated, columns=("Title", "Avg Rating", "Reviews"),
-                              show="headings", height=5, bootstyle="warning")
-tree_top_rated.heading("Title", text="Content Title")
-tree_top_rated.heading("Avg Rating", text="Average Rating")
-tree_top_rated.heading("Reviews", text="Total Reviews")
-tree_top_rated.column("Title", width=300)
-tree_top_rated.column("Avg Rating", width=150, anchor="center")
-tree_top_rated.column("Reviews", width=150, anchor="center")
-tree_top_rated.pack(fill="x")
-
-# ============ TAB 4: ANALYTICS ============
-tab_analytics = ttk.Frame(notebook)
-notebook.add(tab_analytics, text="📊 Analytics")
-
-# Create main container with two columns
-analytics_main = ttk.Frame(tab_analytics)
-analytics_main.pack(fill="both", expand=True, padx=10, pady=10)
-
-# Left Column
-left_column = ttk.Frame(analytics_main)
-left_column.pack(side="left", fill="both", expand=True, padx=(0, 5))
-
-# Right Column
-right_column = ttk.Frame(analytics_main)
-right_column.pack(side="right", fill="both", expand=True, padx=(5, 0))
-
-# === LEFT COLUMN ===
-
-# Revenue Summary Card
-frame_revenue = ttk.LabelFrame(left_column, text="💰 Revenue Overview", padding=15, bootstyle="success")
-frame_revenue.pack(fill="x", pady=(0, 10))
-
-revenue_display = ttk.Frame(frame_revenue)
-revenue_display.pack(fill="x")
-
-# Revenue metrics
-revenue_labels = {}
-for i, (key, label) in enumerate([("total", "Total Revenue"), ("month", "This Month"), ("success", "Success Rate")]):
-    metric_frame = ttk.Frame(revenue_display, bootstyle="dark")
-    metric_frame.pack(side="left", fill="x", expand=True, padx=5)
-    
-    ttk.Label(metric_frame, text=label, font=("Helvetica", 9), foreground="#999").pack()
-    revenue_labels[key] = ttk.Label(metric_frame, text="₹0.00", font=("Helvetica", 18, "bold"), foreground="#4CAF50")
-    revenue_labels[key].pack()
+def view_watch_stats():
+    refresh_treeview(tree_watch_stats, fetch("watch_stats"))
 
 def update_revenue_summary():
     try:
-        # Total revenue
-        cursor.execute("SELECT SUM(amount) FROM Payment WHERE status='success'")
-        total = cursor.fetchone()[0] or 0
-        revenue_labels["total"].config(text=f"₹{total:,.2f}")
-        
-        # This month revenue
-        cursor.execute("""SELECT SUM(amount) FROM Payment 
-                         WHERE status='success' AND MONTH(payment_date) = MONTH(CURDATE())
-                         AND YEAR(payment_date) = YEAR(CURDATE())""")
-        month_rev = cursor.fetchone()[0] or 0
-        revenue_labels["month"].config(text=f"₹{month_rev:,.2f}")
-        
-        # Success rate
-        cursor.execute("SELECT COUNT(*) FROM Payment WHERE status='success'")
-        success = cursor.fetchone()[0] or 0
-        cursor.execute("SELECT COUNT(*) FROM Payment")
-        total_payments = cursor.fetchone()[0] or 1
-        rate = (success / total_payments) * 100
-        revenue_labels["success"].config(text=f"{rate:.1f}%")
+        summary = payment_totals.summary() if payment_totals else fetch("revenue")
+        revenue_labels["total"].config(text=f"₹{summary.total:,.2f}")
+        revenue_labels["month"].config(text=f"₹{summary.month:,.2f}")
+        revenue_labels["success"].config(text=f"{summary.success_rate:.1f}%")
     except Exception as e:
         print(f"Error updating revenue: {e}")
 
-ttk.Button(frame_revenue, text="🔄 Refresh", command=update_revenue_summary, 
-           bootstyle="success-outline", width=15).pack(pady=(10, 0))
-
-# User Statistics Card
-frame_user_stats = ttk.LabelFrame(left_column, text="👥 User Statistics", padding=15, bootstyle="primary")
-frame_user_stats.pack(fill="x", pady=(0, 10))
-
-user_stats_display = ttk.Frame(frame_user_stats)
-user_stats_display.pack(fill="x")
-
-user_stat_labels = {}
-for key, label in [("total", "Total Users"), ("active", "Active Subs"), ("new", "New This Month")]:
-    stat_frame = ttk.Frame(user_stats_display, bootstyle="dark")
-    stat_frame.pack(side="left", fill="x", expand=True, padx=5)
-    
-    ttk.Label(stat_frame, text=label, font=("Helvetica", 9), foreground="#999").pack()
-    user_stat_labels[key] = ttk.Label(stat_frame, text="0", font=("Helvetica", 18, "bold"), foreground="#2196F3")
-    user_stat_labels[key].pack()
-
 def update_user_stats():
     try:
-        cursor.execute("SELECT COUNT(*) FROM User")
-        user_stat_labels["total"].config(text=str(cursor.fetchone()[0]))
-        
-        cursor.execute("SELECT COUNT(*) FROM User_Subscription WHERE status='active'")
-        user_stat_labels["active"].config(text=str(cursor.fetchone()[0]))
-        
-        cursor.execute("""SELECT COUNT(*) FROM User 
-                         WHERE MONTH(registration_date) = MONTH(CURDATE())
-                         AND YEAR(registration_date) = YEAR(CURDATE())""")
-        user_stat_labels["new"].config(text=str(cursor.fetchone()[0]))
+        stats = fetch("user_stats")
+        user_stat_labels["total"].config(text=str(stats.total))
+        user_stat_labels["active"].config(text=str(stats.active))
+        user_stat_labels["new"].config(text=str(stats.new))
     except Exception as e:
         print(f"Error updating user stats: {e}")
 
-ttk.Button(frame_user_stats, text="🔄 Refresh", command=update_user_stats, 
-           bootstyle="primary-outline", width=15).pack(pady=(10, 0))
-
-# Watch Statistics
-frame_watch_stats = ttk.LabelFrame(left_column, text="📺 Top Content by Views", padding=15, bootstyle="info")
-frame_watch_stats.pack(fill="both", expand=True, pady=(0, 10))
-
-ttk.Button(frame_watch_stats, text="🔄 Refresh Stats", command=view_watch_stats, 
-           bootstyle="info-outline", width=15).pack(pady=(0, 10))
-
-tree_frame_watch = ttk.Frame(frame_watch_stats)
-tree_frame_watch.pack(fill="both", expand=True)
-
-scroll_watch = ttk.Scrollbar(tree_frame_watch)
-scroll_watch.pack(side="right", fill="y")
-
-tree_watch_stats = ttk.Treeview(tree_frame_watch, 
-                                columns=("Title", "Views", "Avg Completion"),
-                                show="headings", height=10, yscrollcommand=scroll_watch.set, bootstyle="info")
-scroll_watch.config(command=tree_watch_stats.yview)
-
-tree_watch_stats.heading("Title", text="Content Title")
-tree_watch_stats.heading("Views", text="Views")
-tree_watch_stats.heading("Avg Completion", text="Completion %")
-tree_watch_stats.column("Title", width=200)
-tree_watch_stats.column("Views", width=80, anchor="center")
-tree_watch_stats.column("Avg Completion", width=100, anchor="center")
-tree_watch_stats.pack(fill="both", expand=True)
-
-# === RIGHT COLUMN ===
-
-# Payment Method Distribution
-frame_payment_methods = ttk.LabelFrame(right_column, text="💳 Payment Methods", padding=15, bootstyle="warning")
-frame_payment_methods.pack(fill="x", pady=(0, 10))
-
-payment_method_display = ttk.Frame(frame_payment_methods)
-payment_method_display.pack(fill="both", expand=True)
-
-payment_method_labels = {}
-
 def update_payment_methods():
     try:
-        cursor.execute("""SELECT payment_method, COUNT(*) as count, SUM(amount) as total
-                         FROM Payment WHERE status='success'
-                         GROUP BY payment_method""")
-        results = cursor.fetchall()
-        
+        results = fetch("payment_methods")
+
         # Clear previous
         for widget in payment_method_display.winfo_children():
             widget.destroy()
-        
+
         method_icons = {"card": "💳", "upi": "📱", "netbanking": "🏦", "wallet": "👛"}
-        
+
         for method, count, total in results:
             method_frame = ttk.Frame(payment_method_display, bootstyle="dark", relief="solid", borderwidth=1)
             method_frame.pack(fill="x", pady=5, padx=5)
-            
-            icon_label = ttk.Label(method_frame, text=method_icons.get(method, "💰"), 
+
+            icon_label = ttk.Label(method_frame, text=method_icons.get(method, "💰"),
                                   font=("Helvetica", 24))
             icon_label.pack(side="left", padx=10, pady=10)
-            
+
             info_frame = ttk.Frame(method_frame)
             info_frame.pack(side="left", fill="x", expand=True, pady=10)
-            
+
             ttk.Label(info_frame, text=method.upper(), font=("Helvetica", 12, "bold")).pack(anchor="w")
-            ttk.Label(info_frame, text=f"{count} transactions • ₹{total:,.2f}", 
+            ttk.Label(info_frame, text=f"{count} transactions • ₹{total:,.2f}",
                      font=("Helvetica", 9), foreground="#999").pack(anchor="w")
     except Exception as e:
         print(f"Error updating payment methods: {e}")
 
-ttk.Button(frame_payment_methods, text="🔄 Refresh", command=update_payment_methods, 
-           bootstyle="warning-outline", width=15).pack(pady=(10, 0))
-
-# Subscription Plans Distribution
-frame_plan_stats = ttk.LabelFrame(right_column, text="📊 Active Plans", padding=15, bootstyle="secondary")
-frame_plan_stats.pack(fill="x", pady=(0, 10))
-
-plan_stats_display = ttk.Frame(frame_plan_stats)
-plan_stats_display.pack(fill="both", expand=True)
-
 def update_plan_stats():
     try:
-        cursor.execute("""SELECT sp.plan_name, COUNT(*) as subscribers, sp.price
-                         FROM User_Subscription us
-                         JOIN Subscription_Plan sp ON us.plan_id = sp.plan_id
-                         WHERE us.status = 'active'
-                         GROUP BY sp.plan_name, sp.price""")
-        results = cursor.fetchall()
-        
+        results = fetch("plan_stats")
+
         # Clear previous
         for widget in plan_stats_display.winfo_children():
             widget.destroy()
-        
+
         plan_colors = {"Basic": "#4CAF50", "Standard": "#2196F3", "Premium": "#FF9800"}
-        
+
         for plan_name, subscribers, price in results:
             plan_frame = ttk.Frame(plan_stats_display, bootstyle="dark", relief="solid", borderwidth=1)
             plan_frame.pack(fill="x", pady=5, padx=5)
-            
+
             # Color indicator
             color_bar = tk.Frame(plan_frame, bg=plan_colors.get(plan_name, "#999"), width=5)
             color_bar.pack(side="left", fill="y")
-            
+
             info_frame = ttk.Frame(plan_frame)
             info_frame.pack(side="left", fill="x", expand=True, padx=10, pady=10)
-            
+
             ttk.Label(info_frame, text=plan_name, font=("Helvetica", 12, "bold")).pack(anchor="w")
-            ttk.Label(info_frame, text=f"{subscribers} subscribers • ₹{price}/month", 
+            ttk.Label(info_frame, text=f"{subscribers} subscribers • ₹{price}/month",
                      font=("Helvetica", 9), foreground="#999").pack(anchor="w")
     except Exception as e:
         print(f"Error updating plan stats: {e}")
 
-ttk.Button(frame_plan_stats, text="🔄 Refresh", command=update_plan_stats, 
-           bootstyle="secondary-outline", width=15).pack(pady=(10, 0))
-
-# Payment Logs
-frame_logs = ttk.LabelFrame(right_column, text="📜 Recent Payment Logs", padding=15, bootstyle="danger")
-frame_logs.pack(fill="both", expand=True, pady=(0, 10))
-
-ttk.Button(frame_logs, text="🔄 Refresh Logs", command=view_logs, 
-           bootstyle="danger-outline", width=15).pack(pady=(0, 10))
-
-tree_frame_logs = ttk.Frame(frame_logs)
-tree_frame_logs.pack(fill="both", expand=True)
-
-scroll_logs = ttk.Scrollbar(tree_frame_logs)
-scroll_logs.pack(side="right", fill="y")
-
-tree_logs = ttk.Treeview(tree_frame_logs, columns=("Log ID", "Payment ID", "Message", "Time"),
-                         show="headings", height=10, yscrollcommand=scroll_logs.set, bootstyle="danger")
-scroll_logs.config(command=tree_logs.yview)
-
-tree_logs.heading("Log ID", text="ID")
-tree_logs.heading("Payment ID", text="Pay ID")
-tree_logs.heading("Message", text="Message")
-tree_logs.heading("Time", text="Time")
-
-tree_logs.column("Log ID", width=50, anchor="center")
-tree_logs.column("Payment ID", width=60, anchor="center")
-tree_logs.column("Message", width=250)
-tree_logs.column("Time", width=120, anchor="center")
-tree_logs.pack(fill="both", expand=True)
-
-# Content Statistics
-frame_content_stats = ttk.LabelFrame(right_column, text="🎬 Content Stats", padding=15, bootstyle="success")
-frame_content_stats.pack(fill="x", pady=(0, 10))
-
-content_stats_display = ttk.Frame(frame_content_stats)
-content_stats_display.pack(fill="x")
-
-content_stat_labels = {}
-for key, label in [("total", "Total Content"), ("movies", "Movies"), ("series", "Series")]:
-    stat_frame = ttk.Frame(content_stats_display, bootstyle="dark")
-    stat_frame.pack(side="left", fill="x", expand=True, padx=5)
-    
-    ttk.Label(stat_frame, text=label, font=("Helvetica", 9), foreground="#999").pack()
-    content_stat_labels[key] = ttk.Label(stat_frame, text="0", font=("Helvetica", 18, "bold"), foreground="#4CAF50")
-    content_stat_labels[key].pack()
-
 def update_content_stats():
     try:
-        cursor.execute("SELECT COUNT(*) FROM Content")
-        content_stat_labels["total"].config(text=str(cursor.fetchone()[0]))
-        
-        cursor.execute("SELECT COUNT(*) FROM Content WHERE content_type='movie'")
-        content_stat_labels["movies"].config(text=str(cursor.fetchone()[0]))
-        
-        cursor.execute("SELECT COUNT(*) FROM Content WHERE content_type='series'")
-        content_stat_labels["series"].config(text=str(cursor.fetchone()[0]))
+        stats = fetch("content_stats")
+        content_stat_labels["total"].config(text=str(stats.total))
+        content_stat_labels["movies"].config(text=str(stats.movies))
+        content_stat_labels["series"].config(text=str(stats.series))
     except Exception as e:
         print(f"Error updating content stats: {e}")
 
-ttk.Button(frame_content_stats, text="🔄 Refresh", command=update_content_stats, 
-           bootstyle="success-outline", width=15).pack(pady=(10, 0))
-
-# ============ TAB 5: DEVICES ============
-tab_devices = ttk.Frame(notebook)
-notebook.add(tab_devices, text="📱 Devices")
-
-# Device Statistics Cards
-device_stats_frame = ttk.Frame(tab_devices)
-device_stats_frame.pack(fill="x", padx=15, pady=10)
-
-device_stat_labels = {}
-device_stat_frames = {}
-
-device_types_info = [
-    ("TV", "📺", "primary"),
-    ("Mobile", "📱", "success"),
-    ("Laptop", "💻", "info"),
-    ("Tablet", "📋", "warning"),
-    ("Other", "🖥️", "secondary")
-]
-
-for device_type, icon, style in device_types_info:
-    card = ttk.LabelFrame(device_stats_frame, text=f"{icon} {device_type}", 
-                         padding=15, bootstyle=style)
-    card.pack(side="left", fill="both", expand=True, padx=5)
-    
-    count_label = ttk.Label(card, text="0", font=("Helvetica", 32, "bold"))
-    count_label.pack()
-    
-    desc_label = ttk.Label(card, text="devices", font=("Helvetica", 10), foreground="#999")
-    desc_label.pack()
-    
-    device_stat_labels[device_type] = count_label
-    device_stat_frames[device_type] = card
+# ---------------- DEVICE MANAGEMENT ----------------
+def view_devices():
+    show_rows(tree_devices, fetch("devices"))
 
 def update_device_stats():
     """Update device type statistics"""
     try:
-        for device_type in device_stat_labels.keys():
-            cursor.execute(f"SELECT COUNT(*) FROM Device WHERE device_type='{device_type}'")
-            count = cursor.fetchone()[0]
-            device_stat_labels[device_type].config(text=str(count))
+        counts = fetch("device_types")
+        for device_type, label in device_stat_labels.items():
+            label.config(text=str(counts.get(device_type, 0)))
     except Exception as e:
         print(f"Error updating device stats: {e}")
 
-# Device Management Section
-device_management_frame = ttk.Frame(tab_devices)
-device_management_frame.pack(fill="both", expand=True, padx=15, pady=(0, 10))
-
-# Left side - Device List
-left_device_panel = ttk.LabelFrame(device_management_frame, text="🖥️ All Devices", 
-                                   padding=15, bootstyle="info")
-left_device_panel.pack(side="left", fill="both", expand=True, padx=(0, 5))
-
-# Search and filter controls
-device_controls = ttk.Frame(left_device_panel)
-device_controls.pack(fill="x", pady=(0, 10))
-
-ttk.Label(device_controls, text="🔍 Search User:", font=("Helvetica", 10)).pack(side="left", padx=5)
-entry_device_search = ttk.Entry(device_controls, width=25, bootstyle="info")
-entry_device_search.pack(side="left", padx=5)
-
-ttk.Label(device_controls, text="Filter Type:", font=("Helvetica", 10)).pack(side="left", padx=(15, 5))
-device_type_filter = ttk.Combobox(device_controls, values=["All", "TV", "Mobile", "Laptop", "Tablet", "Other"], 
-                                  width=12, state="readonly")
-device_type_filter.set("All")
-device_type_filter.pack(side="left", padx=5)
-
+@online_only
 def search_devices():
-    search_term = entry_device_search.get().strip()
-    device_filter = device_type_filter.get()
-    
-    query = """SELECT d.device_id, u.first_name, u.last_name, d.device_name, 
-               d.device_type, d.last_used
-               FROM Device d
-               JOIN User u ON d.user_id = u.user_id
-               WHERE 1=1"""
-    
-    if search_term:
-        query += f" AND (u.first_name LIKE '%{search_term}%' OR u.last_name LIKE '%{search_term}%' OR d.device_name LIKE '%{search_term}%')"
-    
-    if device_filter != "All":
-        query += f" AND d.device_type = '{device_filter}'"
-    
-    query += " ORDER BY d.last_used DESC"
-    refresh_treeview(tree_devices, query, None)
-
-ttk.Button(device_controls, text="🔍 Search", command=search_devices, 
-           bootstyle="info").pack(side="left", padx=5)
-ttk.Button(device_controls, text="🔄 Show All", command=view_devices, 
-           bootstyle="secondary").pack(side="left", padx=5)
-
-# Device TreeView
-tree_frame_devices = ttk.Frame(left_device_panel)
-tree_frame_devices.pack(fill="both", expand=True)
-
-scroll_devices = ttk.Scrollbar(tree_frame_devices)
-scroll_devices.pack(side="right", fill="y")
-
-tree_devices = ttk.Treeview(tree_frame_devices,
-                            columns=("Device ID", "First Name", "Last Name", "Device", "Type", "Last Used"),
-                            show="headings", height=18, yscrollcommand=scroll_devices.set, bootstyle="info")
-scroll_devices.config(command=tree_devices.yview)
-
-tree_devices.heading("Device ID", text="ID")
-tree_devices.heading("First Name", text="First Name")
-tree_devices.heading("Last Name", text="Last Name")
-tree_devices.heading("Device", text="Device Name")
-tree_devices.heading("Type", text="Type")
-tree_devices.heading("Last Used", text="Last Used")
-
-tree_devices.column("Device ID", width=60, anchor="center")
-tree_devices.column("First Name", width=100)
-tree_devices.column("Last Name", width=100)
-tree_devices.column("Device", width=150)
-tree_devices.column("Type", width=80, anchor="center")
-tree_devices.column("Last Used", width=140, anchor="center")
-
-tree_devices.pack(fill="both", expand=True)
-
-# Right side - Device Details & Actions
-right_device_panel = ttk.Frame(device_management_frame)
-right_device_panel.pack(side="right", fill="y", padx=(5, 0))
-
-# Device Details Card
-device_details_frame = ttk.LabelFrame(right_device_panel, text="📋 Device Details", 
-                                      padding=15, bootstyle="primary")
-device_details_frame.pack(fill="x", pady=(0, 10))
-
-device_detail_labels = {}
-detail_fields = [
-    ("device_id", "Device ID:"),
-    ("user_name", "User:"),
-    ("device_name", "Device Name:"),
-    ("device_type", "Type:"),
-    ("last_used", "Last Used:")
-]
-
-for key, label_text in detail_fields:
-    frame = ttk.Frame(device_details_frame)
-    frame.pack(fill="x", pady=5)
-    
-    ttk.Label(frame, text=label_text, font=("Helvetica", 9, "bold"), 
-             foreground="#999").pack(anchor="w")
-    device_detail_labels[key] = ttk.Label(frame, text="Select a device", 
-                                         font=("Helvetica", 10), wraplength=200)
-    device_detail_labels[key].pack(anchor="w", padx=(10, 0))
+    rows = svc.device_rows(conn, entry_device_search.get(), device_type_filter.get())
+    show_rows(tree_devices, rows)
 
 def on_device_select(event):
     """Show selected device details"""
@@ -997,41 +792,34 @@ def on_device_select(event):
     if selected:
         item = tree_devices.item(selected[0])
         values = item['values']
-        
+
         device_detail_labels["device_id"].config(text=str(values[0]))
         device_detail_labels["user_name"].config(text=f"{values[1]} {values[2]}")
         device_detail_labels["device_name"].config(text=str(values[3]))
         device_detail_labels["device_type"].config(text=str(values[4]))
         device_detail_labels["last_used"].config(text=str(values[5]))
 
-tree_devices.bind('<<TreeviewSelect>>', on_device_select)
-
-# Device Actions
-device_actions_frame = ttk.LabelFrame(right_device_panel, text="⚙️ Actions", 
-                                      padding=15, bootstyle="warning")
-device_actions_frame.pack(fill="x", pady=(0, 10))
-
+@online_only
 def delete_device():
     """Delete selected device"""
     selected = tree_devices.selection()
     if not selected:
         messagebox.showerror("Error", "Please select a device to delete")
         return
-    
+
     item = tree_devices.item(selected[0])
     device_data = item['values']
     device_id = device_data[0]
     device_name = device_data[3]
-    
+
     confirm = messagebox.askyesno(
-        "Confirm Delete", 
+        "Confirm Delete",
         f"Delete device '{device_name}' (ID: {device_id})?\n\nThis action cannot be undone!"
     )
-    
+
     if confirm:
         try:
-            cursor.execute("DELETE FROM Device WHERE device_id = %s", (device_id,))
-            conn.commit()
+            svc.delete_device(conn, device_id)
             messagebox.showinfo("Success", f"Device '{device_name}' deleted!")
             view_devices()
             update_device_stats()
@@ -1040,62 +828,1114 @@ def delete_device():
                 label.config(text="Select a device")
         except Exception as e:
             messagebox.showerror("Database Error", str(e))
-            conn.rollback()
-
-ttk.Button(device_actions_frame, text="🗑️ Delete Device", command=delete_device, 
-           bootstyle="danger", width=20).pack(fill="x", pady=5)
-ttk.Button(device_actions_frame, text="🔄 Refresh List", command=lambda: [view_devices(), update_device_stats()], 
-           bootstyle="secondary", width=20).pack(fill="x", pady=5)
-
-# Most Active Users Card
-active_users_frame = ttk.LabelFrame(right_device_panel, text="🏆 Most Active Users", 
-                                    padding=15, bootstyle="success")
-active_users_frame.pack(fill="both", expand=True)
-
-tree_active_users = ttk.Treeview(active_users_frame, 
-                                 columns=("User", "Devices"),
-                                 show="headings", height=8, bootstyle="success")
-tree_active_users.heading("User", text="User Name")
-tree_active_users.heading("Devices", text="Device Count")
-tree_active_users.column("User", width=140)
-tree_active_users.column("Devices", width=80, anchor="center")
-tree_active_users.pack(fill="both", expand=True)
 
 def update_active_users():
     """Show users with most devices"""
     try:
-        query = """SELECT CONCAT(u.first_name, ' ', u.last_name) as name, COUNT(d.device_id) as device_count
-                   FROM User u
-                   JOIN Device d ON u.user_id = d.user_id
-                   GROUP BY u.user_id, name
-                   ORDER BY device_count DESC
-                   LIMIT 10"""
-        refresh_treeview(tree_active_users, query, None)
+        refresh_treeview(tree_active_users, fetch("active_users"))
     except Exception as e:
         print(f"Error updating active users: {e}")
 
-ttk.Button(active_users_frame, text="🔄 Refresh", command=update_active_users, 
-           bootstyle="success-outline", width=15).pack(pady=(10, 0))
-
-# Footer
-footer_frame = ttk.Frame(root, bootstyle="dark")
-footer_frame.pack(fill="x", padx=10, pady=5)
-ttk.Label(footer_frame, text="© 2024 OTT Database Manager | Connected to MySQL Database", 
-          font=("Helvetica", 9)).pack()
-
-# Initial data load
-view_users()
-view_subscriptions()
-view_content()
-update_revenue_summary()
-update_user_stats()
-update_payment_methods()
-update_plan_stats()
-update_content_stats()
-view_logs()
-view_watch_stats()
-view_devices()
-update_device_stats()
-update_active_users()
-
-root.mainloop()
\ No newline at end of file
+# ---------------- BACKGROUND TASKS ----------------
+def progress_dialog(title, start, on_progress, on_done, cancel_text="✖ Cancel"):
+    """Show a progress window for a background task.
+
+    start(updates) launches the worker and returns its cancel event; the
+    worker puts ("progress", ...) and ("done", ...) tuples on updates. Tk
+    widgets are only touched from the polling loop on the main thread.
+    """
+    dialog = tk.Toplevel(root)
+    dialog.title(title)
+    dialog.transient(root)
+    dialog.resizable(False, False)
+
+    status_label = ttk.Label(dialog, text="Starting...", font=("Helvetica", 10))
+    status_label.pack(padx=20, pady=(15, 5))
+    progress_bar = ttk.Progressbar(dialog, length=360, mode="determinate", bootstyle="success-striped")
+    progress_bar.pack(padx=20, pady=5)
+
+    updates = queue.Queue()
+    cancel_event = start(updates)
+
+    ttk.Button(dialog, text=cancel_text, command=cancel_event.set,
+               bootstyle="danger", width=15).pack(pady=(5, 15))
+    dialog.protocol("WM_DELETE_WINDOW", cancel_event.set)
+
+    def poll():
+        try:
+            while True:
+                kind, *payload = updates.get_nowait()
+                if kind == "progress":
+                    on_progress(status_label, progress_bar, *payload)
+                    continue
+                dialog.destroy()
+                on_done(*payload)
+                return
+        except queue.Empty:
+            pass
+        dialog.after(100, poll)
+
+    poll()
+
+@online_only
+def export_data(name):
+    """Stream an export to CSV/Parquet in the background"""
+    import ott_export
+    label = ott_export.EXPORTS[name].label
+    path = filedialog.asksaveasfilename(title=f"Export {label}", initialfile=f"{name}.csv",
+                                        defaultextension=".csv",
+                                        filetypes=[("CSV", "*.csv"), ("Parquet", "*.parquet")])
+    if not path:
+        return
+
+    def start(updates):
+        return ott_export.start_export(
+            name, path,
+            progress=lambda rows, expected: updates.put(("progress", rows, expected)),
+            done=lambda rows, error: updates.put(("done", rows, error)))
+
+    def on_progress(status_label, progress_bar, rows, expected):
+        progress_bar.config(maximum=max(expected or rows, rows), value=rows)
+        total = f" of ~{expected:,}" if expected else ""
+        status_label.config(text=f"{rows:,}{total} rows written")
+
+    def on_done(rows, error):
+        if isinstance(error, ott_export.ExportCancelled):
+            messagebox.showwarning("Export Cancelled", str(error))
+        elif error:
+            messagebox.showerror("Export Error", str(error))
+        else:
+            messagebox.showinfo("Export Complete", f"Exported {rows:,} rows to {path}")
+
+    progress_dialog(f"Exporting {label}", start, on_progress, on_done)
+
+@online_only
+def archive_old_rows():
+    """Move rows past their horizon into archive files in the background"""
+    import ott_archive
+    horizons = ", ".join(f"{spec.table} > {spec.horizon_days} days" for spec in ott_archive.SPECS.values())
+    if not messagebox.askyesno("Archive Old Rows", f"Move rows older than their horizon to archive files?\n\n{horizons}"):
+        return
+
+    def start(updates):
+        return ott_archive.start_archive(
+            progress=lambda table, rows: updates.put(("progress", table, rows)),
+            done=lambda result, error: updates.put(("done", result, error)))
+
+    def on_progress(status_label, progress_bar, table, rows):
+        progress_bar.config(mode="indeterminate")
+        progress_bar.step(5)
+        status_label.config(text=f"{table}: {rows:,} rows archived")
+
+    def on_done(result, error):
+        if isinstance(error, ott_archive.ArchiveStopped):
+            messagebox.showwarning("Archiving Stopped", f"{error}\n\nCommitted batches stay archived.")
+        elif error:
+            messagebox.showerror("Archive Error", str(error))
+        else:
+            moved = "\n".join(f"{table}: {rows:,} rows" for table, rows in result.items())
+            messagebox.showinfo("Archive Complete", f"Archived\n{moved}")
+        view_logs()
+
+    progress_dialog("Archiving Old Rows", start, on_progress, on_done, cancel_text="⏸ Stop")
+
+def run_deletion_jobs(job_ids, title="Deleting Users"):
+    """Run user deletion jobs in the background with progress"""
+    import ott_deletion
+    jobs_seen = []
+
+    def start(updates):
+        return ott_deletion.start_deletion(
+            job_ids,
+            progress=lambda job_id, user_id, step, rows: updates.put(("progress", job_id, user_id, step, rows)),
+            done=lambda rows, error: updates.put(("done", rows, error)))
+
+    def on_progress(status_label, progress_bar, job_id, user_id, step, rows):
+        if job_id not in jobs_seen:
+            jobs_seen.append(job_id)
+        progress_bar.config(maximum=len(job_ids), value=len(jobs_seen) - 1)
+        status_label.config(text=f"User {user_id} ({len(jobs_seen)}/{len(job_ids)}): "
+                                 f"{step.replace('_', ' ')} • {rows:,} rows")
+
+    def on_done(rows, error):
+        if isinstance(error, ott_deletion.DeletionStopped):
+            messagebox.showwarning("Deletion Paused", f"{error}\n\nUnfinished users are resumed on next start.")
+        elif error:
+            # Notes carry bookkeeping errors, e.g. a job that could not be marked failed
+            details = "\n".join([str(error), *getattr(error, "__notes__", ())])
+            messagebox.showerror("Database Error", f"{details}\n\nUnfinished users are resumed on next start; "
+                                                   "run 'python ott_deletion.py --resume' to retry failed ones.")
+        else:
+            messagebox.showinfo("Success", f"Deleted {len(job_ids)} user(s) and {rows:,} related rows.")
+        if "users" in built_tabs:
+            view_users()
+
+    progress_dialog(title, start, on_progress, on_done, cancel_text="⏸ Stop")
+
+def resume_deletion_jobs():
+    """Pick up deletion jobs a previous session did not finish; failed ones wait for --resume"""
+    import ott_deletion
+    try:
+        job_ids = ott_deletion.unfinished_jobs(conn)
+    except Exception as e:
+        print(f"Error checking deletion jobs: {e}")
+        return
+    if job_ids:
+        run_deletion_jobs(job_ids, title="Resuming User Deletion")
+
+# ---------------- RETENTION ----------------
+def show_cached_cohorts():
+    """Draw the last computed cohort report; the database is not queried"""
+    global cohort_report
+    try:
+        import ott_cohorts
+        cohort_report = ott_cohorts.cached_report()
+    except ImportError as e:
+        cohort_status.config(text=f"The cohort report needs numpy ({e})")
+        return
+    if cohort_report is None:
+        cohort_status.config(text="No report yet — press Compute")
+    else:
+        cohort_status.config(text=f"{len(cohort_report.cohorts)} cohorts, {int(cohort_report.sizes.sum()):,} users, "
+                                  f"as of {ott_cohorts.month_label(cohort_report.as_of)} (cached)")
+    draw_cohorts()
+
+def cohort_color(rate):
+    """Cell color from the dark background (0%) to green (100%)"""
+    low, high = (0x30, 0x30, 0x30), (0x4C, 0xAF, 0x50)
+    return "#" + "".join(f"{round(a + (b - a) * rate):02x}" for a, b in zip(low, high))
+
+def draw_cohorts():
+    """Heatmap of the selected metric: a row per cohort, a column per month of age"""
+    import ott_cohorts
+    canvas = cohort_canvas
+    canvas.delete("all")
+    if cohort_report is None or not len(cohort_report.cohorts):
+        return
+    metric = COHORT_METRICS[cohort_metric.get()]
+    rates = cohort_report.rates(metric)
+    label_w, size_w, cell_w, cell_h = 80, 80, 46, 22
+    for age in range(rates.shape[1]):
+        canvas.create_text(label_w + size_w + age * cell_w + cell_w / 2, cell_h / 2,
+                           text=f"M{age}", fill="#999", font=("Helvetica", 8))
+    for row, cohort in enumerate(cohort_report.cohorts):
+        y = (row + 1) * cell_h
+        canvas.create_text(4, y + cell_h / 2, text=ott_cohorts.month_label(int(cohort)),
+                           anchor="w", fill="#ddd", font=("Helvetica", 9))
+        canvas.create_text(label_w + size_w - 6, y + cell_h / 2, text=f"{int(cohort_report.sizes[row]):,}",
+                           anchor="e", fill="#999", font=("Helvetica", 9))
+        for age, rate in enumerate(rates[row]):
+            if rate != rate:
+                break  # NaN: the cohort is not that old yet
+            x = label_w + size_w + age * cell_w
+            canvas.create_rectangle(x, y, x + cell_w - 1, y + cell_h - 1, fill=cohort_color(rate), width=0)
+            canvas.create_text(x + cell_w / 2, y + cell_h / 2, text=f"{rate:.0%}", fill="white",
+                               font=("Helvetica", 8))
+    canvas.configure(scrollregion=canvas.bbox("all"))
+
+@online_only
+def compute_cohorts(full=False):
+    """Recompute changed cohorts in a process pool, in the background"""
+    import ott_cohorts
+    started = time.perf_counter()
+
+    def start(updates):
+        return ott_cohorts.start_report(
+            full=full,
+            progress=lambda done, total: updates.put(("progress", done, total)),
+            done=lambda result, error: updates.put(("done", result, error)))
+
+    def on_progress(status_label, progress_bar, done, total):
+        progress_bar.config(maximum=total, value=done)
+        status_label.config(text=f"{done} of {total} cohorts computed")
+
+    def on_done(result, error):
+        global cohort_report
+        if isinstance(error, ott_cohorts.CohortsStopped):
+            messagebox.showwarning("Report Stopped", str(error))
+            return
+        if error:
+            messagebox.showerror("Report Error", str(error))
+            return
+        cohort_report = result
+        cached = len(result.cohorts) - result.recomputed
+        cohort_status.config(text=f"{len(result.cohorts)} cohorts, {int(result.sizes.sum()):,} users • "
+                                  f"{result.recomputed} recomputed, {cached} from cache in "
+                                  f"{time.perf_counter() - started:.1f}s")
+        draw_cohorts()
+
+    progress_dialog("Computing Retention", start, on_progress, on_done, cancel_text="⏸ Stop")
+
+# ---------------- LIVE UPDATES ----------------
+# Views to refresh when a watched table changes, by the tab showing them;
+# tabs not built yet load fresh data when first opened
+CDC_REFRESH = {
+    "Payment": {"analytics": lambda: [update_revenue_summary(), update_payment_methods(), view_logs()]},
+    "User": {"users": view_users, "analytics": update_user_stats},
+    "User_Subscription": {"subscriptions": view_subscriptions,
+                          "analytics": lambda: [update_user_stats(), update_plan_stats()]},
+    "Device": {"devices": lambda: [view_devices(), update_device_stats(), update_active_users()]},
+    "Rating_Review": {"content": view_top_rated},
+    "Content": {"content": refresh_browse},
+    "Content_Genre": {"content": lambda: [build_facet_panel(), apply_facets()]},
+    "Archived_Payment_Summary": {"analytics": lambda: [update_revenue_summary(), update_payment_methods()]},
+}
+
+def start_live_updates():
+    """Subscribe the dashboards to binlog change events"""
+    global cdc_consumer, payment_totals
+    bus = ott_cdc.EventBus()
+    try:
+        payment_totals = ott_cdc.PaymentTotals().load(conn)
+        bus.subscribe("Payment", payment_totals.apply)
+        bus.subscribe("Archived_Payment_Summary", payment_totals.apply)
+        bus.subscribe("Content", facet_index.apply)
+        bus.subscribe("Content_Genre", facet_index.apply)
+        bus.subscribe("*", cdc_changes.put)
+        cdc_consumer = ott_cdc.BinlogConsumer(bus).start()
+    except Exception as e:
+        payment_totals = None
+        print(f"Live updates disabled: {e}")
+        return
+    root.after(250, apply_live_changes)
+
+def apply_live_changes():
+    """Refresh each changed view once per tick, on the Tk thread"""
+    changes = []
+    try:
+        while True:
+            changes.append(cdc_changes.get_nowait())
+    except queue.Empty:
+        pass
+
+    for table in dict.fromkeys(change.table for change in changes):
+        for tab, refresh in CDC_REFRESH[table].items():
+            if tab not in built_tabs:
+                continue
+            try:
+                refresh()
+            except Exception as e:
+                print(f"Error applying {table} changes: {e}")
+    if changes:
+        root.update_idletasks()
+        rendered = time.time()
+        for change in changes:
+            cdc_latency.record(rendered - change.received_at)
+    root.after(250, apply_live_changes)
+
+# ---------------- CONNECTION ----------------
+def connect_in_background(on_done):
+    """Take a pooled connection and reload the stale views on a worker thread.
+
+    on_done(connected) runs on the Tk thread once the views are current, or
+    once the database has turned out to be unreachable.
+    """
+    show_connection_state("connecting")
+    stale = sorted(stale_views)
+
+    def work():
+        try:
+            with profiled("import", "db_connect (mysql.connector)"):
+                from db_connect import get_pool
+            with profiled("connect", "pooled connection"):
+                connection = get_pool().get_connection()
+        except Exception as e:
+            connect_results.put((None, {}, e))
+            return
+        fresh = {}
+        for name in stale:
+            try:
+                with profiled("query", f"reconcile {name}"):
+                    fresh[name] = VIEW_LOADERS[name](connection)
+            except Exception as e:
+                print(f"Error reloading {name}: {e}")
+        connect_results.put((connection, fresh, None))
+
+    threading.Thread(target=work, name="ott-connect", daemon=True).start()
+    root.after(50, finish_connecting, on_done)
+
+def finish_connecting(on_done):
+    """Swap the reloaded views in, or stay read-only on the snapshot"""
+    global conn
+    try:
+        connection, fresh, error = connect_results.get_nowait()
+    except queue.Empty:
+        root.after(50, finish_connecting, on_done)
+        return
+    if connection is None:
+        print(f"Database unreachable: {error}")
+        show_connection_state("offline")
+        retry_button.configure(command=lambda: connect_in_background(on_done))
+        on_done(False)
+        return
+    conn = connection
+    prefetched.update(fresh)
+    reconcile()
+    prefetched.clear()
+    show_connection_state("live")
+    on_done(True)
+
+def reconcile():
+    """Reload every built tab; views the worker already loaded need no query"""
+    for key, (_, _, views) in TABS.items():
+        if key not in built_tabs:
+            continue
+        for view in views:
+            try:
+                view()
+            except Exception as e:
+                print(f"Error reloading {view.__name__}: {e}")
+
+def show_connection_state(state):
+    """Header banner and footer text for 'connecting', 'offline' or 'live'"""
+    saved_at = snapshot.oldest(stale_views)
+    as_of = f" from {saved_at:%b %d, %H:%M}" if saved_at else ""
+    if state == "live":
+        status_banner.configure(text="")
+        status_banner.pack_forget()
+        retry_button.pack_forget()
+        footer_label.configure(text="© 2024 OTT Database Manager | Connected to MySQL Database")
+        return
+    if state == "offline":
+        text = f"⚠ Offline — read-only snapshot{as_of}" if stale_views else "⚠ Offline — no saved data"
+        status_banner.configure(text=text, bootstyle="danger")
+        retry_button.pack(side="right", padx=5)
+        footer_label.configure(text="© 2024 OTT Database Manager | Database unreachable — read-only")
+    else:
+        text = f"⏳ Stale data{as_of} — connecting..." if stale_views else "⏳ Connecting..."
+        status_banner.configure(text=text, bootstyle="warning")
+        retry_button.pack_forget()
+        footer_label.configure(text="© 2024 OTT Database Manager | Connecting to MySQL Database...")
+    status_banner.pack(side="right", padx=10)
+
+# ---------------- UI SETUP ----------------
+def build_header():
+    global status_banner, retry_button
+    header_frame = ttk.Frame(root, bootstyle="dark")
+    header_frame.pack(fill="x", padx=10, pady=10)
+
+    ttk.Label(header_frame, text="🎬 OTT Database Manager",
+              font=("Helvetica", 24, "bold")).pack(side="left", padx=10)
+
+    ttk.Label(header_frame, text=f"📅 {datetime.now().strftime('%B %d, %Y')}",
+              font=("Helvetica", 12)).pack(side="right", padx=10)
+
+    # Packed by show_connection_state() while the data shown is not live
+    status_banner = ttk.Label(header_frame, font=("Helvetica", 11, "bold"))
+    retry_button = ttk.Button(header_frame, text="🔄 Retry", bootstyle="danger-outline")
+
+def build_users_tab(tab_users):
+    """Add-user form and the searchable user list"""
+    global entry_first, entry_last, entry_email, entry_phone, entry_user_search, tree_users
+    # Add User Section
+    frame_add_user = ttk.LabelFrame(tab_users, text="➕ Add New User", padding=15, bootstyle="primary")
+    frame_add_user.pack(fill="x", padx=15, pady=10)
+
+    user_input_frame = ttk.Frame(frame_add_user)
+    user_input_frame.pack(fill="x")
+
+    # Row 1
+    ttk.Label(user_input_frame, text="First Name:", font=("Helvetica", 10)).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+    entry_first = ttk.Entry(user_input_frame, width=20, bootstyle="primary")
+    entry_first.grid(row=0, column=1, padx=5, pady=5)
+
+    ttk.Label(user_input_frame, text="Last Name:", font=("Helvetica", 10)).grid(row=0, column=2, padx=5, pady=5, sticky="w")
+    entry_last = ttk.Entry(user_input_frame, width=20, bootstyle="primary")
+    entry_last.grid(row=0, column=3, padx=5, pady=5)
+
+    # Row 2
+    ttk.Label(user_input_frame, text="Email:", font=("Helvetica", 10)).grid(row=1, column=0, padx=5, pady=5, sticky="w")
+    entry_email = ttk.Entry(user_input_frame, width=25, bootstyle="primary")
+    entry_email.grid(row=1, column=1, padx=5, pady=5)
+
+    ttk.Label(user_input_frame, text="Phone:", font=("Helvetica", 10)).grid(row=1, column=2, padx=5, pady=5, sticky="w")
+    entry_phone = ttk.Entry(user_input_frame, width=20, bootstyle="primary")
+    entry_phone.grid(row=1, column=3, padx=5, pady=5)
+
+    ttk.Button(user_input_frame, text="✓ Add User", command=add_user,
+               bootstyle="success", width=15).grid(row=1, column=4, padx=10, pady=5)
+
+    # Search and View Users
+    frame_view_users = ttk.LabelFrame(tab_users, text="👥 All Users", padding=15, bootstyle="info")
+    frame_view_users.pack(fill="both", expand=True, padx=15, pady=10)
+
+    search_frame = ttk.Frame(frame_view_users)
+    search_frame.pack(fill="x", pady=(0, 10))
+
+    ttk.Label(search_frame, text="🔍 Search:", font=("Helvetica", 10)).pack(side="left", padx=5)
+    entry_user_search = ttk.Entry(search_frame, width=30, bootstyle="info")
+    entry_user_search.pack(side="left", padx=5)
+    ttk.Button(search_frame, text="Search", command=search_users, bootstyle="info").pack(side="left", padx=5)
+    ttk.Button(search_frame, text="🔄 Refresh All", command=view_users, bootstyle="secondary").pack(side="left", padx=5)
+    ttk.Button(search_frame, text="🗑️ Delete Selected", command=delete_user, bootstyle="danger").pack(side="left", padx=15)
+    ttk.Button(search_frame, text="⬇ Export", command=lambda: export_data("users"),
+               bootstyle="secondary-outline").pack(side="right", padx=5)
+
+    # Users Treeview
+    tree_frame_users = ttk.Frame(frame_view_users)
+    tree_frame_users.pack(fill="both", expand=True)
+
+    scroll_users = ttk.Scrollbar(tree_frame_users)
+    scroll_users.pack(side="right", fill="y")
+
+    tree_users = ttk.Treeview(tree_frame_users, columns=("ID", "First", "Last", "Email", "Phone", "Reg Date"),
+                              show="headings", height=12, yscrollcommand=scroll_users.set, bootstyle="info")
+    scroll_users.config(command=tree_users.yview)
+
+    tree_users.heading("ID", text="User ID")
+    tree_users.heading("First", text="First Name")
+    tree_users.heading("Last", text="Last Name")
+    tree_users.heading("Email", text="Email")
+    tree_users.heading("Phone", text="Phone")
+    tree_users.heading("Reg Date", text="Registration Date")
+
+    tree_users.column("ID", width=80, anchor="center")
+    tree_users.column("First", width=120)
+    tree_users.column("Last", width=120)
+    tree_users.column("Email", width=200)
+    tree_users.column("Phone", width=120)
+    tree_users.column("Reg Date", width=120, anchor="center")
+
+    page_rows_on_scroll(tree_users, scroll_users)
+    tree_users.pack(fill="both", expand=True)
+
+def build_subscriptions_tab(tab_subscriptions):
+    """Renewal controls and the subscription list"""
+    global entry_sub_id, entry_days_check, tree_subscriptions, subscription_status_filter
+    # Subscription Management
+    frame_sub_manage = ttk.LabelFrame(tab_subscriptions, text="⚙️ Subscription Management", padding=15, bootstyle="warning")
+    frame_sub_manage.pack(fill="x", padx=15, pady=10)
+
+    sub_controls = ttk.Frame(frame_sub_manage)
+    sub_controls.pack(fill="x")
+
+    ttk.Label(sub_controls, text="Subscription ID:", font=("Helvetica", 10)).grid(row=0, column=0, padx=5, pady=5, sticky="w")
+    entry_sub_id = ttk.Entry(sub_controls, width=15, bootstyle="warning")
+    entry_sub_id.grid(row=0, column=1, padx=5, pady=5)
+    ttk.Button(sub_controls, text="🔄 Renew Subscription", command=renew_subscription,
+               bootstyle="success", width=20).grid(row=0, column=2, padx=10, pady=5)
+
+    ttk.Label(sub_controls, text="Check Days Left:", font=("Helvetica", 10)).grid(row=0, column=3, padx=15, pady=5, sticky="w")
+    entry_days_check = ttk.Entry(sub_controls, width=15, bootstyle="info")
+    entry_days_check.grid(row=0, column=4, padx=5, pady=5)
+    ttk.Button(sub_controls, text="📅 Check Days", command=check_days_left,
+               bootstyle="info", width=15).grid(row=0, column=5, padx=5, pady=5)
+
+    # View Subscriptions
+    frame_view_subs = ttk.LabelFrame(tab_subscriptions, text="📋 All Subscriptions", padding=15, bootstyle="primary")
+    frame_view_subs.pack(fill="both", expand=True, padx=15, pady=10)
+
+    sub_buttons = ttk.Frame(frame_view_subs)
+    sub_buttons.pack(pady=(0, 10))
+    ttk.Button(sub_buttons, text="🔄 Refresh Subscriptions", command=view_subscriptions,
+               bootstyle="primary").pack(side="left", padx=5)
+    ttk.Button(sub_buttons, text="⬇ Export", command=lambda: export_data("subscriptions"),
+               bootstyle="primary-outline").pack(side="left", padx=5)
+    ttk.Label(sub_buttons, text="Status:", font=("Helvetica", 10)).pack(side="left", padx=(15, 5))
+    subscription_status_filter = ttk.Combobox(sub_buttons, values=["All", "active", "expired", "cancelled"],
+                                              state="readonly", width=12, bootstyle="primary")
+    subscription_status_filter.set("All")
+    subscription_status_filter.pack(side="left", padx=5)
+    subscription_status_filter.bind("<<ComboboxSelected>>", filter_subscriptions)
+
+    tree_frame_subs = ttk.Frame(frame_view_subs)
+    tree_frame_subs.pack(fill="both", expand=True)
+
+    scroll_subs = ttk.Scrollbar(tree_frame_subs)
+    scroll_subs.pack(side="right", fill="y")
+
+    tree_subscriptions = ttk.Treeview(tree_frame_subs,
+                                      columns=("ID", "First", "Last", "Plan", "Start", "End", "Status", "Auto-Renew"),
+                                      show="headings", height=15, yscrollcommand=scroll_subs.set, bootstyle="primary")
+    scroll_subs.config(command=tree_subscriptions.yview)
+
+    for col in ["ID", "First", "Last", "Plan", "Start", "End", "Status", "Auto-Renew"]:
+        tree_subscriptions.heading(col, text=col)
+        tree_subscriptions.column(col, width=120, anchor="center")
+
+    page_rows_on_scroll(tree_subscriptions, scroll_subs)
+    tree_subscriptions.pack(fill="both", expand=True)
+
+def build_content_tab(tab_content):
+    """Content cards, the top rated table and per-profile recommendations"""
+    global entry_content_search, scrollable_frame_content, content_cards, entry_top_n, tree_top_rated, frame_facets
+    global entry_rec_profile, tree_recommendations, button_rebuild, tree_continue
+    # Search Content
+    frame_content_search = ttk.LabelFrame(tab_content, text="🔍 Search Content", padding=15, bootstyle="success")
+    frame_content_search.pack(fill="x", padx=15, pady=10)
+
+    content_search_frame = ttk.Frame(frame_content_search)
+    content_search_frame.pack(fill="x")
+
+    ttk.Label(content_search_frame, text="Title/Language:", font=("Helvetica", 10)).pack(side="left", padx=5)
+    entry_content_search = ttk.Entry(content_search_frame, width=30, bootstyle="success")
+    entry_content_search.pack(side="left", padx=5)
+    ttk.Button(content_search_frame, text="🔍 Search", command=search_content,
+               bootstyle="success").pack(side="left", padx=5)
+    ttk.Button(content_search_frame, text="🔄 View All", command=view_content,
+               bootstyle="secondary").pack(side="left", padx=5)
+
+    # Facets; counts come from the in-memory bitmap index
+    frame_facets = ttk.Frame(frame_content_search)
+    frame_facets.pack(fill="x", pady=(10, 0))
+
+    # Content Display - Netflix Style
+    frame_view_content = ttk.Frame(tab_content)
+    frame_view_content.pack(fill="both", expand=True, padx=15, pady=10)
+
+    # Canvas for scrolling
+    canvas_content = tk.Canvas(frame_view_content, bg="#141414", highlightthickness=0)
+    scrollbar_content = ttk.Scrollbar(frame_view_content, orient="vertical", command=canvas_content.yview)
+    scrollable_frame_content = ttk.Frame(canvas_content)
+
+    scrollable_frame_content.bind(
+        "<Configure>",
+        lambda e: canvas_content.configure(scrollregion=canvas_content.bbox("all"))
+    )
+
+    canvas_content.create_window((0, 0), window=scrollable_frame_content, anchor="nw")
+    canvas_content.configure(yscrollcommand=scrollbar_content.set)
+
+    canvas_content.pack(side="left", fill="both", expand=True)
+    scrollbar_content.pack(side="right", fill="y")
+
+    # Store content cards for updates
+    content_cards = []
+
+    # Top Rated Content
+    frame_top_rated = ttk.LabelFrame(tab_content, text="⭐ Top Rated Content", padding=15, bootstyle="warning")
+    frame_top_rated.pack(fill="x", padx=15, pady=10)
+
+    top_rated_controls = ttk.Frame(frame_top_rated)
+    top_rated_controls.pack(fill="x", pady=(0, 10))
+
+    ttk.Label(top_rated_controls, text="Top N:", font=("Helvetica", 10)).pack(side="left", padx=5)
+    entry_top_n = ttk.Entry(top_rated_controls, width=10, bootstyle="warning")
+    entry_top_n.insert(0, "10")
+    entry_top_n.pack(side="left", padx=5)
+    ttk.Button(top_rated_controls, text="📊 View Top Rated", command=view_top_rated,
+               bootstyle="warning").pack(side="left", padx=5)
+
+    tree_top_rated = ttk.Treeview(frame_top_rated, columns=("Title", "Avg Rating", "Reviews"),
+                                  show="headings", height=5, bootstyle="warning")
+    tree_top_rated.heading("Title", text="Content Title")
+    tree_top_rated.heading("Avg Rating", text="Average Rating")
+    tree_top_rated.heading("Reviews", text="Total Reviews")
+    tree_top_rated.column("Title", width=300)
+    tree_top_rated.column("Avg Rating", width=150, anchor="center")
+    tree_top_rated.column("Reviews", width=150, anchor="center")
+    tree_top_rated.pack(fill="x")
+
+    # Recommendations
+    frame_recommend = ttk.LabelFrame(tab_content, text="🎯 For Profile", padding=15, bootstyle="info")
+    frame_recommend.pack(fill="x", padx=15, pady=10)
+
+    recommend_controls = ttk.Frame(frame_recommend)
+    recommend_controls.pack(fill="x", pady=(0, 10))
+
+    ttk.Label(recommend_controls, text="Profile ID:", font=("Helvetica", 10)).pack(side="left", padx=5)
+    entry_rec_profile = ttk.Entry(recommend_controls, width=10, bootstyle="info")
+    entry_rec_profile.pack(side="left", padx=5)
+    ttk.Button(recommend_controls, text="▶ Continue Watching", command=view_continue_watching,
+               bootstyle="info").pack(side="left", padx=5)
+    ttk.Button(recommend_controls, text="🎯 Recommend", command=view_recommendations,
+               bootstyle="info").pack(side="left", padx=5)
+    button_rebuild = ttk.Button(recommend_controls, text="🔁 Rebuild", command=rebuild_recommendations,
+                                bootstyle="info-outline")
+    button_rebuild.pack(side="right", padx=5)
+
+    tree_recommendations = ttk.Treeview(frame_recommend, columns=("ID", "Title", "Type", "Score"),
+                                        show="headings", height=5, bootstyle="info")
+    tree_recommendations.heading("ID", text="ID")
+    tree_recommendations.heading("Title", text="Content Title")
+    tree_recommendations.heading("Type", text="Type")
+    tree_recommendations.heading("Score", text="Score")
+    tree_recommendations.column("ID", width=60, anchor="center")
+    tree_recommendations.column("Title", width=300)
+    tree_recommendations.column("Type", width=150, anchor="center")
+    tree_recommendations.column("Score", width=150, anchor="center")
+    tree_recommendations.pack(fill="x")
+
+    tree_continue = ttk.Treeview(frame_recommend, columns=("ID", "Title", "Episode", "Progress", "Last Watched"),
+                                 show="headings", height=4, bootstyle="info")
+    for col, width in (("ID", 60), ("Title", 240), ("Episode", 200), ("Progress", 90), ("Last Watched", 160)):
+        tree_continue.heading(col, text=col)
+        tree_continue.column(col, width=width, anchor="w" if col in ("Title", "Episode") else "center")
+    tree_continue.pack(fill="x", pady=(10, 0))
+
+def build_analytics_tab(tab_analytics):
+    """Revenue, user, payment, plan and content dashboards"""
+    global revenue_labels, user_stat_labels, tree_watch_stats, payment_method_display
+    global plan_stats_display, tree_logs, content_stat_labels
+    # Create main container with two columns
+    analytics_main = ttk.Frame(tab_analytics)
+    analytics_main.pack(fill="both", expand=True, padx=10, pady=10)
+
+    # Left Column
+    left_column = ttk.Frame(analytics_main)
+    left_column.pack(side="left", fill="both", expand=True, padx=(0, 5))
+
+    # Right Column
+    right_column = ttk.Frame(analytics_main)
+    right_column.pack(side="right", fill="both", expand=True, padx=(5, 0))
+
+    # === LEFT COLUMN ===
+
+    # Revenue Summary Card
+    frame_revenue = ttk.LabelFrame(left_column, text="💰 Revenue Overview", padding=15, bootstyle="success")
+    frame_revenue.pack(fill="x", pady=(0, 10))
+
+    revenue_display = ttk.Frame(frame_revenue)
+    revenue_display.pack(fill="x")
+
+    # Revenue metrics
+    revenue_labels = {}
+    for i, (key, label) in enumerate([("total", "Total Revenue"), ("month", "This Month"), ("success", "Success Rate")]):
+        metric_frame = ttk.Frame(revenue_display, bootstyle="dark")
+        metric_frame.pack(side="left", fill="x", expand=True, padx=5)
+
+        ttk.Label(metric_frame, text=label, font=("Helvetica", 9), foreground="#999").pack()
+        revenue_labels[key] = ttk.Label(metric_frame, text="₹0.00", font=("Helvetica", 18, "bold"), foreground="#4CAF50")
+        revenue_labels[key].pack()
+
+    ttk.Button(frame_revenue, text="🔄 Refresh", command=update_revenue_summary,
+               bootstyle="success-outline", width=15).pack(pady=(10, 0))
+
+    # User Statistics Card
+    frame_user_stats = ttk.LabelFrame(left_column, text="👥 User Statistics", padding=15, bootstyle="primary")
+    frame_user_stats.pack(fill="x", pady=(0, 10))
+
+    user_stats_display = ttk.Frame(frame_user_stats)
+    user_stats_display.pack(fill="x")
+
+    user_stat_labels = {}
+    for key, label in [("total", "Total Users"), ("active", "Active Subs"), ("new", "New This Month")]:
+        stat_frame = ttk.Frame(user_stats_display, bootstyle="dark")
+        stat_frame.pack(side="left", fill="x", expand=True, padx=5)
+
+        ttk.Label(stat_frame, text=label, font=("Helvetica", 9), foreground="#999").pack()
+        user_stat_labels[key] = ttk.Label(stat_frame, text="0", font=("Helvetica", 18, "bold"), foreground="#2196F3")
+        user_stat_labels[key].pack()
+
+    ttk.Button(frame_user_stats, text="🔄 Refresh", command=update_user_stats,
+               bootstyle="primary-outline", width=15).pack(pady=(10, 0))
+
+    # Watch Statistics
+    frame_watch_stats = ttk.LabelFrame(left_column, text="📺 Top Content by Views", padding=15, bootstyle="info")
+    frame_watch_stats.pack(fill="both", expand=True, pady=(0, 10))
+
+    ttk.Button(frame_watch_stats, text="🔄 Refresh Stats", command=view_watch_stats,
+               bootstyle="info-outline", width=15).pack(pady=(0, 10))
+
+    tree_frame_watch = ttk.Frame(frame_watch_stats)
+    tree_frame_watch.pack(fill="both", expand=True)
+
+    scroll_watch = ttk.Scrollbar(tree_frame_watch)
+    scroll_watch.pack(side="right", fill="y")
+
+    tree_watch_stats = ttk.Treeview(tree_frame_watch,
+                                    columns=("Title", "Views", "Avg Completion"),
+                                    show="headings", height=10, yscrollcommand=scroll_watch.set, bootstyle="info")
+    scroll_watch.config(command=tree_watch_stats.yview)
+
+    tree_watch_stats.heading("Title", text="Content Title")
+    tree_watch_stats.heading("Views", text="Views")
+    tree_watch_stats.heading("Avg Completion", text="Completion %")
+    tree_watch_stats.column("Title", width=200)
+    tree_watch_stats.column("Views", width=80, anchor="center")
+    tree_watch_stats.column("Avg Completion", width=100, anchor="center")
+    tree_watch_stats.pack(fill="both", expand=True)
+
+    # === RIGHT COLUMN ===
+
+    # Payment Method Distribution
+    frame_payment_methods = ttk.LabelFrame(right_column, text="💳 Payment Methods", padding=15, bootstyle="warning")
+    frame_payment_methods.pack(fill="x", pady=(0, 10))
+
+    payment_method_display = ttk.Frame(frame_payment_methods)
+    payment_method_display.pack(fill="both", expand=True)
+
+    ttk.Button(frame_payment_methods, text="🔄 Refresh", command=update_payment_methods,
+               bootstyle="warning-outline", width=15).pack(pady=(10, 0))
+
+    # Subscription Plans Distribution
+    frame_plan_stats = ttk.LabelFrame(right_column, text="📊 Active Plans", padding=15, bootstyle="secondary")
+    frame_plan_stats.pack(fill="x", pady=(0, 10))
+
+    plan_stats_display = ttk.Frame(frame_plan_stats)
+    plan_stats_display.pack(fill="both", expand=True)
+
+    ttk.Button(frame_plan_stats, text="🔄 Refresh", command=update_plan_stats,
+               bootstyle="secondary-outline", width=15).pack(pady=(10, 0))
+
+    # Payment Logs
+    frame_logs = ttk.LabelFrame(right_column, text="📜 Recent Payment Logs", padding=15, bootstyle="danger")
+    frame_logs.pack(fill="both", expand=True, pady=(0, 10))
+
+    ttk.Button(frame_logs, text="🔄 Refresh Logs", command=view_logs,
+               bootstyle="danger-outline", width=15).pack(pady=(0, 10))
+
+    tree_frame_logs = ttk.Frame(frame_logs)
+    tree_frame_logs.pack(fill="both", expand=True)
+
+    scroll_logs = ttk.Scrollbar(tree_frame_logs)
+    scroll_logs.pack(side="right", fill="y")
+
+    tree_logs = ttk.Treeview(tree_frame_logs, columns=("Log ID", "Payment ID", "Message", "Time"),
+                             show="headings", height=10, yscrollcommand=scroll_logs.set, bootstyle="danger")
+    scroll_logs.config(command=tree_logs.yview)
+
+    tree_logs.heading("Log ID", text="ID")
+    tree_logs.heading("Payment ID", text="Pay ID")
+    tree_logs.heading("Message", text="Message")
+    tree_logs.heading("Time", text="Time")
+
+    tree_logs.column("Log ID", width=50, anchor="center")
+    tree_logs.column("Payment ID", width=60, anchor="center")
+    tree_logs.column("Message", width=250)
+    tree_logs.column("Time", width=120, anchor="center")
+    tree_logs.pack(fill="both", expand=True)
+
+    # Data Export
+    frame_export = ttk.LabelFrame(right_column, text="⬇ Export Data", padding=15, bootstyle="info")
+    frame_export.pack(fill="x", pady=(0, 10))
+
+    for name, text in [("payments", "Payments"), ("payment_summary", "Payment Summary"),
+                       ("watch_history", "Watch History")]:
+        ttk.Button(frame_export, text=text, command=lambda name=name: export_data(name),
+                   bootstyle="info-outline").pack(side="left", fill="x", expand=True, padx=5)
+    ttk.Button(frame_export, text="🗄 Archive", command=archive_old_rows,
+               bootstyle="secondary-outline").pack(side="left", fill="x", expand=True, padx=5)
+
+    # Content Statistics
+    frame_content_stats = ttk.LabelFrame(right_column, text="🎬 Content Stats", padding=15, bootstyle="success")
+    frame_content_stats.pack(fill="x", pady=(0, 10))
+
+    content_stats_display = ttk.Frame(frame_content_stats)
+    content_stats_display.pack(fill="x")
+
+    content_stat_labels = {}
+    for key, label in [("total", "Total Content"), ("movies", "Movies"), ("series", "Series")]:
+        stat_frame = ttk.Frame(content_stats_display, bootstyle="dark")
+        stat_frame.pack(side="left", fill="x", expand=True, padx=5)
+
+        ttk.Label(stat_frame, text=label, font=("Helvetica", 9), foreground="#999").pack()
+        content_stat_labels[key] = ttk.Label(stat_frame, text="0", font=("Helvetica", 18, "bold"), foreground="#4CAF50")
+        content_stat_labels[key].pack()
+
+    ttk.Button(frame_content_stats, text="🔄 Refresh", command=update_content_stats,
+               bootstyle="success-outline", width=15).pack(pady=(10, 0))
+
+def build_devices_tab(tab_devices):
+    """Device counters, device list, details and actions"""
+    global device_stat_labels, entry_device_search, device_type_filter, tree_devices
+    global device_detail_labels, tree_active_users
+    # Device Statistics Cards
+    device_stats_frame = ttk.Frame(tab_devices)
+    device_stats_frame.pack(fill="x", padx=15, pady=10)
+
+    device_stat_labels = {}
+    device_stat_frames = {}
+
+    device_types_info = [
+        ("TV", "📺", "primary"),
+        ("Mobile", "📱", "success"),
+        ("Laptop", "💻", "info"),
+        ("Tablet", "📋", "warning"),
+        ("Other", "🖥️", "secondary")
+    ]
+
+    for device_type, icon, style in device_types_info:
+        card = ttk.LabelFrame(device_stats_frame, text=f"{icon} {device_type}",
+                             padding=15, bootstyle=style)
+        card.pack(side="left", fill="both", expand=True, padx=5)
+
+        count_label = ttk.Label(card, text="0", font=("Helvetica", 32, "bold"))
+        count_label.pack()
+
+        desc_label = ttk.Label(card, text="devices", font=("Helvetica", 10), foreground="#999")
+        desc_label.pack()
+
+        device_stat_labels[device_type] = count_label
+        device_stat_frames[device_type] = card
+
+    # Device Management Section
+    device_management_frame = ttk.Frame(tab_devices)
+    device_management_frame.pack(fill="both", expand=True, padx=15, pady=(0, 10))
+
+    # Left side - Device List
+    left_device_panel = ttk.LabelFrame(device_management_frame, text="🖥️ All Devices",
+                                       padding=15, bootstyle="info")
+    left_device_panel.pack(side="left", fill="both", expand=True, padx=(0, 5))
+
+    # Search and filter controls
+    device_controls = ttk.Frame(left_device_panel)
+    device_controls.pack(fill="x", pady=(0, 10))
+
+    ttk.Label(device_controls, text="🔍 Search User:", font=("Helvetica", 10)).pack(side="left", padx=5)
+    entry_device_search = ttk.Entry(device_controls, width=25, bootstyle="info")
+    entry_device_search.pack(side="left", padx=5)
+
+    ttk.Label(device_controls, text="Filter Type:", font=("Helvetica", 10)).pack(side="left", padx=(15, 5))
+    device_type_filter = ttk.Combobox(device_controls, values=["All", "TV", "Mobile", "Laptop", "Tablet", "Other"],
+                                      width=12, state="readonly")
+    device_type_filter.set("All")
+    device_type_filter.pack(side="left", padx=5)
+
+    ttk.Button(device_controls, text="🔍 Search", command=search_devices,
+               bootstyle="info").pack(side="left", padx=5)
+    ttk.Button(device_controls, text="🔄 Show All", command=view_devices,
+               bootstyle="secondary").pack(side="left", padx=5)
+
+    # Device TreeView
+    tree_frame_devices = ttk.Frame(left_device_panel)
+    tree_frame_devices.pack(fill="both", expand=True)
+
+    scroll_devices = ttk.Scrollbar(tree_frame_devices)
+    scroll_devices.pack(side="right", fill="y")
+
+    tree_devices = ttk.Treeview(tree_frame_devices,
+                                columns=("Device ID", "First Name", "Last Name", "Device", "Type", "Last Used"),
+                                show="headings", height=18, yscrollcommand=scroll_devices.set, bootstyle="info")
+    scroll_devices.config(command=tree_devices.yview)
+
+    tree_devices.heading("Device ID", text="ID")
+    tree_devices.heading("First Name", text="First Name")
+    tree_devices.heading("Last Name", text="Last Name")
+    tree_devices.heading("Device", text="Device Name")
+    tree_devices.heading("Type", text="Type")
+    tree_devices.heading("Last Used", text="Last Used")
+
+    tree_devices.column("Device ID", width=60, anchor="center")
+    tree_devices.column("First Name", width=100)
+    tree_devices.column("Last Name", width=100)
+    tree_devices.column("Device", width=150)
+    tree_devices.column("Type", width=80, anchor="center")
+    tree_devices.column("Last Used", width=140, anchor="center")
+
+    page_rows_on_scroll(tree_devices, scroll_devices)
+    tree_devices.pack(fill="both", expand=True)
+
+    # Right side - Device Details & Actions
+    right_device_panel = ttk.Frame(device_management_frame)
+    right_device_panel.pack(side="right", fill="y", padx=(5, 0))
+
+    # Device Details Card
+    device_details_frame = ttk.LabelFrame(right_device_panel, text="📋 Device Details",
+                                          padding=15, bootstyle="primary")
+    device_details_frame.pack(fill="x", pady=(0, 10))
+
+    device_detail_labels = {}
+    detail_fields = [
+        ("device_id", "Device ID:"),
+        ("user_name", "User:"),
+        ("device_name", "Device Name:"),
+        ("device_type", "Type:"),
+        ("last_used", "Last Used:")
+    ]
+
+    for key, label_text in detail_fields:
+        frame = ttk.Frame(device_details_frame)
+        frame.pack(fill="x", pady=5)
+
+        ttk.Label(frame, text=label_text, font=("Helvetica", 9, "bold"),
+                 foreground="#999").pack(anchor="w")
+        device_detail_labels[key] = ttk.Label(frame, text="Select a device",
+                                             font=("Helvetica", 10), wraplength=200)
+        device_detail_labels[key].pack(anchor="w", padx=(10, 0))
+
+    tree_devices.bind('<<TreeviewSelect>>', on_device_select)
+
+    # Device Actions
+    device_actions_frame = ttk.LabelFrame(right_device_panel, text="⚙️ Actions",
+                                          padding=15, bootstyle="warning")
+    device_actions_frame.pack(fill="x", pady=(0, 10))
+
+    ttk.Button(device_actions_frame, text="🗑️ Delete Device", command=delete_device,
+               bootstyle="danger", width=20).pack(fill="x", pady=5)
+    ttk.Button(device_actions_frame, text="🔄 Refresh List", command=lambda: [view_devices(), update_device_stats()],
+               bootstyle="secondary", width=20).pack(fill="x", pady=5)
+
+    # Most Active Users Card
+    active_users_frame = ttk.LabelFrame(right_device_panel, text="🏆 Most Active Users",
+                                        padding=15, bootstyle="success")
+    active_users_frame.pack(fill="both", expand=True)
+
+    tree_active_users = ttk.Treeview(active_users_frame,
+                                     columns=("User", "Devices"),
+                                     show="headings", height=8, bootstyle="success")
+    tree_active_users.heading("User", text="User Name")
+    tree_active_users.heading("Devices", text="Device Count")
+    tree_active_users.column("User", width=140)
+    tree_active_users.column("Devices", width=80, anchor="center")
+    tree_active_users.pack(fill="both", expand=True)
+
+    ttk.Button(active_users_frame, text="🔄 Refresh", command=update_active_users,
+               bootstyle="success-outline", width=15).pack(pady=(10, 0))
+
+def build_cohorts_tab(tab_cohorts):
+    """Retention heatmap by registration month"""
+    global cohort_canvas, cohort_metric, cohort_status
+    controls = ttk.Frame(tab_cohorts)
+    controls.pack(fill="x", padx=15, pady=10)
+
+    ttk.Label(controls, text="Metric:", font=("Helvetica", 10)).pack(side="left", padx=5)
+    cohort_metric = ttk.Combobox(controls, values=list(COHORT_METRICS), width=12, state="readonly")
+    cohort_metric.set("Subscribed")
+    cohort_metric.pack(side="left", padx=5)
+    cohort_metric.bind("<<ComboboxSelected>>", lambda event: draw_cohorts())
+
+    ttk.Button(controls, text="▶ Compute", command=compute_cohorts,
+               bootstyle="success").pack(side="left", padx=5)
+    ttk.Button(controls, text="🔄 Recompute All", command=lambda: compute_cohorts(full=True),
+               bootstyle="secondary").pack(side="left", padx=5)
+    cohort_status = ttk.Label(controls, text="", font=("Helvetica", 10), foreground="#999")
+    cohort_status.pack(side="left", padx=15)
+
+    frame_heatmap = ttk.LabelFrame(tab_cohorts, text="📈 Share of each cohort by months since registration",
+                                   padding=10, bootstyle="info")
+    frame_heatmap.pack(fill="both", expand=True, padx=15, pady=(0, 10))
+    scroll_y = ttk.Scrollbar(frame_heatmap, orient="vertical")
+    scroll_y.pack(side="right", fill="y")
+    scroll_x = ttk.Scrollbar(frame_heatmap, orient="horizontal")
+    scroll_x.pack(side="bottom", fill="x")
+    cohort_canvas = tk.Canvas(frame_heatmap, background="#222", highlightthickness=0,
+                              xscrollcommand=scroll_x.set, yscrollcommand=scroll_y.set)
+    scroll_y.config(command=cohort_canvas.yview)
+    scroll_x.config(command=cohort_canvas.xview)
+    cohort_canvas.pack(fill="both", expand=True)
+
+def build_footer():
+    global footer_label
+    footer_frame = ttk.Frame(root, bootstyle="dark")
+    footer_frame.pack(fill="x", padx=10, pady=5)
+    footer_label = ttk.Label(footer_frame, text="© 2024 OTT Database Manager", font=("Helvetica", 9))
+    footer_label.pack()
+
+# ---------------- TABS ----------------
+# key -> (label, builder, views loaded when the tab is first shown)
+TABS = {
+    "users": ("👤 Users", build_users_tab, [view_users]),
+    "subscriptions": ("💳 Subscriptions", build_subscriptions_tab, [view_subscriptions]),
+    "content": ("🎬 Content", build_content_tab, [load_facets, view_content]),
+    "analytics": ("📊 Analytics", build_analytics_tab,
+                  [update_revenue_summary, update_user_stats, update_payment_methods, update_plan_stats,
+                   update_content_stats, view_logs, view_watch_stats]),
+    "devices": ("📱 Devices", build_devices_tab, [view_devices, update_device_stats, update_active_users]),
+    "cohorts": ("📈 Retention", build_cohorts_tab, [show_cached_cohorts]),
+}
+
+def show_tab(key, frame):
+    """Build and load a tab the first time it is shown"""
+    if key in built_tabs:
+        return
+    _, builder, views = TABS[key]
+    with profiled("construct", f"{key} tab"):
+        builder(frame)
+    built_tabs.add(key)
+    for view in views:
+        with profiled("query", view.__name__):
+            try:
+                view()
+            except NotInSnapshot:
+                pass  # left empty until the connection is up and reconcile() loads it
+
+# ---------------- MAIN ----------------
+def main(argv=None):
+    global root
+    parser = argparse.ArgumentParser(description="OTT Database Manager")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print an import/construct/query timing breakdown once the first tab shows live data, then exit")
+    parser.add_argument("--profile-json", help="with --profile-startup, also write the breakdown to this file")
+    args = parser.parse_args(argv)
+
+    # ---------------- APP WINDOW ----------------
+    with profiled("import", "ttkbootstrap"):
+        import ttkbootstrap as tb
+    with profiled("construct", "window"):
+        root = tb.Window(themename="darkly")
+        root.title("OTT Database Manager")
+        root.geometry("1200x750")
+        try:
+            root.state('zoomed')  # Start maximized (Windows, macOS)
+        except tk.TclError:
+            root.attributes('-zoomed', True)  # X11 has no 'zoomed' state
+
+        build_header()
+
+        # Main Notebook; only the shell of each tab until it is shown
+        notebook = ttk.Notebook(root, bootstyle="dark")
+        notebook.pack(expand=True, fill='both', padx=10, pady=5)
+        frames = {}
+        for key, (text, _, _) in TABS.items():
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=text)
+            frames[str(frame)] = (key, frame)
+
+        build_footer()
+    root.update()
+    first_paint_ms = since_start_ms()
+
+    # ---------------- WARM START ----------------
+    # The first tab shows the last saved data at once; the connection and
+    # the fresh data follow from a worker thread
+    with profiled("snapshot", "load"):
+        snapshot.load()
+    notebook.bind("<<NotebookTabChanged>>", lambda event: show_tab(*frames[notebook.select()]))
+    show_tab(*frames[notebook.select()])
+    root.update()
+    stale_ms = since_start_ms() if stale_views else None
+
+    # ---------------- DB CONNECTION ----------------
+    connected_at = {}
+
+    def on_connection(connected):
+        if connected:
+            root.update_idletasks()
+            connected_at["ms"] = since_start_ms()
+        if args.profile_startup:
+            root.quit()
+        elif connected:
+            resume_deletion_jobs()
+            if ott_cdc.cdc_enabled():
+                start_live_updates()
+        elif not snapshot:
+            messagebox.showerror("Database Error", "Could not connect to the database. Check your .env settings.")
+            root.quit()
+        # Otherwise offline: the snapshot stays on screen read-only, with a retry button
+
+    connect_in_background(on_connection)
+    root.mainloop()
+    if conn is None and not snapshot:
+        root.destroy()  # closed by on_connection(), nothing to show
+        if args.profile_startup:
+            print("Could not connect to the database. Check your .env settings.")
+        return 1
+
+    if args.profile_startup:
+        root.destroy()
+        if conn is None:
+            print("Could not connect to the database. Check your .env settings.")
+            return 1
+        fresh_ms = connected_at["ms"]
+        report_startup(first_paint_ms, stale_ms or fresh_ms, fresh_ms, args.profile_json)
+        conn.close()
+        return 0
+
+    if cdc_consumer:
+        cdc_consumer.stop()
+        print("Event-to-screen latency:", cdc_latency.summary())
+    for stat in ott_statements.stats()[:10]:
+        print(f"{stat.name:<24} {stat.executions:>6} runs  {stat.prepares} prepares  {stat.avg_ms:.2f} ms avg")
+    try:
+        saved = snapshot.save()
+        if saved:
+            print(f"Saved {saved} views to {snapshot.path}")
+    except (OSError, sqlite3.Error) as e:
+        print(f"Snapshot not saved: {e}")
+    if conn is not None:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
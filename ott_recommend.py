@@ -0,0 +1,281 @@
+"""Precomputed "because you watched" recommendations.
+
+Builds item-to-item similarity from co-watching (Watch_History) blended with
+genre overlap (Content_Genre) using sparse matrices, and stores the top-k
+neighbours of every title in Content_Similarity. Serving a profile is then a
+single indexed query (RecommendForProfile in ott.sql) instead of a many-way
+self-join over the history.
+
+    python ott_recommend.py             # incremental: only titles touched by new history
+    python ott_recommend.py --full      # rebuild everything (also picks up deletions)
+
+Incremental builds keep the distinct (profile, content) pairs in a local
+cache file and only recompute the neighbour lists of titles watched by
+profiles with new history. Needs numpy and scipy.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from db_connect import connect_db
+
+TOP_K = 20
+# Weight of co-watching against genre overlap in the blended score
+COWATCH_WEIGHT = 0.8
+FETCH_ROWS = 100000
+ROW_BLOCK = 2000
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ott_cache")
+CACHE_PATH = os.path.join(CACHE_DIR, "recommend_pairs.npz")
+
+
+# ---------------- MATRICES ----------------
+def build_matrices(profile_ids, content_ids, genre_pairs, catalog_ids):
+    """Binary profile x content and content x genre matrices.
+
+    catalog_ids fixes the column order; pairs for unknown content are dropped.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    catalog_ids = np.asarray(catalog_ids, dtype=np.int64)
+    item_index = {int(cid): i for i, cid in enumerate(catalog_ids)}
+    n_items = len(catalog_ids)
+
+    content_ids = np.asarray(content_ids, dtype=np.int64)
+    keep = np.isin(content_ids, catalog_ids)
+    profiles, profile_rows = np.unique(np.asarray(profile_ids, dtype=np.int64)[keep], return_inverse=True)
+    item_cols = np.searchsorted(catalog_ids, content_ids[keep])
+    watched = sparse.csr_matrix((np.ones(len(item_cols), dtype=np.float32), (profile_rows, item_cols)),
+                                shape=(len(profiles), n_items))
+    watched.sum_duplicates()
+    watched.data[:] = 1  # repeated pairs collapse to one watch
+
+    genre_rows = [item_index[c] for c, _ in genre_pairs if c in item_index]
+    genre_ids = [g for c, g in genre_pairs if c in item_index]
+    genres, genre_cols = np.unique(np.asarray(genre_ids, dtype=np.int64), return_inverse=True)
+    genre_matrix = sparse.csr_matrix((np.ones(len(genre_rows), dtype=np.float32), (genre_rows, genre_cols)),
+                                     shape=(n_items, max(1, len(genres))))
+    return watched, genre_matrix
+
+
+def similarity_rows(watched_csc, genre_matrix, rows, weight=COWATCH_WEIGHT):
+    """Blended cosine similarity of the given item rows against every item"""
+    import numpy as np
+    from scipy import sparse
+
+    view_norm = np.sqrt(np.maximum(np.asarray(watched_csc.sum(axis=0)).ravel(), 1))
+    genre_norm = np.sqrt(np.maximum(np.asarray(genre_matrix.sum(axis=1)).ravel(), 1))
+
+    cowatch = (watched_csc[:, rows].T @ watched_csc).tocsr()
+    cowatch = sparse.diags(1 / view_norm[rows]) @ cowatch @ sparse.diags(1 / view_norm)
+
+    overlap = (genre_matrix[rows] @ genre_matrix.T).tocsr()
+    overlap = sparse.diags(1 / genre_norm[rows]) @ overlap @ sparse.diags(1 / genre_norm)
+
+    return (weight * cowatch + (1 - weight) * overlap).tocsr()
+
+
+def top_k(similarity, rows, k=TOP_K):
+    """[(neighbour columns, scores)] per row, best first, skipping the item itself"""
+    import numpy as np
+
+    result = []
+    for r, item in enumerate(rows):
+        start, end = similarity.indptr[r], similarity.indptr[r + 1]
+        cols, scores = similarity.indices[start:end], similarity.data[start:end]
+        mask = (scores > 0) & (cols != item)
+        cols, scores = cols[mask], scores[mask]
+        if len(scores) > k:
+            best = np.argpartition(-scores, k)[:k]
+            cols, scores = cols[best], scores[best]
+        order = np.argsort(-scores, kind="stable")
+        result.append((cols[order], scores[order]))
+    return result
+
+
+def neighbour_lists(watched, genre_matrix, rows, k=TOP_K, weight=COWATCH_WEIGHT):
+    """(item, top_k neighbours) for the given rows, computed in blocks to bound memory"""
+    watched_csc = watched.tocsc()
+    for start in range(0, len(rows), ROW_BLOCK):
+        block = rows[start:start + ROW_BLOCK]
+        similarity = similarity_rows(watched_csc, genre_matrix, block, weight)
+        yield from zip(block, top_k(similarity, block, k))
+
+
+# ---------------- LOADING ----------------
+def _stream_pairs(conn, after_history_id):
+    """Distinct (profile_id, content_id) pairs from history rows past the watermark"""
+    import numpy as np
+
+    cursor = conn.cursor(buffered=False)
+    cursor.execute("""SELECT profile_id, content_id, history_id FROM Watch_History
+                      WHERE history_id > %s AND profile_id IS NOT NULL AND content_id IS NOT NULL""",
+                   (after_history_id,))
+    chunks = []
+    last_id = after_history_id
+    while True:
+        rows = cursor.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        chunk = np.asarray(rows, dtype=np.int64)
+        last_id = max(last_id, int(chunk[:, 2].max()))
+        chunks.append(np.unique(chunk[:, :2], axis=0))
+        if len(chunks) >= 20:
+            # Re-dedupe as we go so memory follows distinct pairs, not history rows
+            chunks = [np.unique(np.concatenate(chunks), axis=0)]
+    cursor.close()
+    pairs = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    return np.unique(pairs, axis=0), last_id
+
+
+def _catalog(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT content_id FROM Content ORDER BY content_id")
+    catalog_ids = [row[0] for row in cursor.fetchall()]
+    cursor.execute("SELECT content_id, genre_id FROM Content_Genre")
+    genre_pairs = cursor.fetchall()
+    cursor.close()
+    return catalog_ids, genre_pairs
+
+
+def _stored_watermark(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT last_history_id FROM Recommendation_State WHERE id = 1")
+    row = cursor.fetchone()
+    cursor.close()
+    return row[0] if row else None
+
+
+def _load_cache():
+    import numpy as np
+    if not os.path.exists(CACHE_PATH):
+        return None, None
+    with np.load(CACHE_PATH) as cache:
+        return cache["pairs"], int(cache["last_history_id"])
+
+
+def _save_cache(pairs, last_history_id):
+    import numpy as np
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temp_path = CACHE_PATH + ".tmp.npz"
+    np.savez_compressed(temp_path, pairs=pairs, last_history_id=last_history_id)
+    os.replace(temp_path, CACHE_PATH)
+
+
+# ---------------- STORING ----------------
+def _store(conn, catalog_ids, lists, last_history_id, full):
+    """Replace the neighbour rows of every listed item, a block per transaction"""
+    cursor = conn.cursor()
+    if full:
+        cursor.execute("DELETE FROM Content_Similarity")
+        conn.commit()
+    stored = 0
+    batch_items, batch_rows = [], []
+
+    def flush():
+        if batch_items:
+            placeholders = ", ".join(["%s"] * len(batch_items))
+            cursor.execute(f"DELETE FROM Content_Similarity WHERE content_id IN ({placeholders})", batch_items)
+        if batch_rows:
+            cursor.executemany("""INSERT INTO Content_Similarity (content_id, rank_no, similar_content_id, score)
+                                  VALUES (%s, %s, %s, %s)""", batch_rows)
+        conn.commit()
+        batch_items.clear()
+        batch_rows.clear()
+
+    for item, (cols, scores) in lists:
+        content_id = int(catalog_ids[item])
+        batch_items.append(content_id)
+        for rank, (col, score) in enumerate(zip(cols, scores), start=1):
+            batch_rows.append((content_id, rank, int(catalog_ids[col]), float(score)))
+        stored += 1
+        if len(batch_items) >= 500:
+            flush()
+    flush()
+
+    cursor.execute("""INSERT INTO Recommendation_State (id, last_history_id, built_at) VALUES (1, %s, NOW())
+                      ON DUPLICATE KEY UPDATE last_history_id = VALUES(last_history_id), built_at = NOW()""",
+                   (last_history_id,))
+    conn.commit()
+    cursor.close()
+    return stored
+
+
+def rebuild(conn, full=False, k=TOP_K, progress=print):
+    """Rebuild neighbour lists; returns the number of titles updated"""
+    import numpy as np
+
+    started = time.perf_counter()
+    catalog_ids, genre_pairs = _catalog(conn)
+    catalog = np.asarray(catalog_ids, dtype=np.int64)
+
+    cached_pairs, cached_watermark = (None, None) if full else _load_cache()
+    if cached_pairs is None or cached_watermark != _stored_watermark(conn):
+        full = True
+        pairs, last_history_id = _stream_pairs(conn, 0)
+        new_pairs = pairs
+    else:
+        new_pairs, last_history_id = _stream_pairs(conn, cached_watermark)
+        pairs = np.unique(np.concatenate([cached_pairs, new_pairs]), axis=0)
+    progress(f"{len(pairs):,} distinct profile/title pairs ({len(new_pairs):,} new) "
+             f"in {time.perf_counter() - started:.1f}s")
+
+    watched, genre_matrix = build_matrices(pairs[:, 0], pairs[:, 1], genre_pairs, catalog)
+    if full:
+        rows = np.arange(len(catalog))
+    else:
+        # Titles whose co-watch counts changed: everything the affected profiles watched
+        affected = np.isin(pairs[:, 0], np.unique(new_pairs[:, 0]))
+        rows = np.unique(np.searchsorted(catalog, pairs[affected, 1]))
+        rows = rows[rows < len(catalog)]
+    progress(f"recomputing {len(rows):,} of {len(catalog):,} titles")
+
+    stored = _store(conn, catalog, neighbour_lists(watched, genre_matrix, rows, k), last_history_id, full)
+    _save_cache(pairs, last_history_id)
+    progress(f"stored neighbours for {stored:,} titles in {time.perf_counter() - started:.1f}s")
+    return stored
+
+
+def _rebuild_in_child(full):
+    conn = connect_db()
+    if conn is None:
+        sys.exit(1)
+    try:
+        rebuild(conn, full)
+    finally:
+        conn.close()
+
+
+def start_rebuild(full=False):
+    """Run rebuild() in a separate process so the caller's GIL stays free; returns the Process.
+
+    The child starts from a clean server process rather than a fork of the
+    caller, which may be the GUI with its threads and open connections.
+    """
+    context = multiprocessing.get_context("spawn" if sys.platform == "win32" else "forkserver")
+    process = context.Process(target=_rebuild_in_child, args=(full,), daemon=True)
+    process.start()
+    return process
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild content recommendations")
+    parser.add_argument("--full", action="store_true", help="ignore the cache and rebuild every title")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    try:
+        rebuild(conn, args.full, args.top_k)
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
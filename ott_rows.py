@@ -0,0 +1,389 @@
+"""Compact column store for result sets the GUI keeps in memory.
+
+fetchall() gives one tuple per row holding an int, Decimal, date or str
+object per value, about 60 bytes per value before any row overhead. A
+RowStore keeps each column in one flat buffer instead:
+
+  int / bool      array of the narrowest type that fits ('b' to 'q')
+  Decimal         the same, as scaled integers (cents for DECIMAL(8,2))
+  float           array('d')
+  date            array('i') of ordinals
+  datetime        array('q') of microseconds since 1970
+  enum-like str   array('B'/'H') of codes into one list of interned strings
+  other str       one UTF-8 bytearray plus an array('I') of offsets
+
+Rows are added a fetchmany() batch at a time, one column at a time. NULLs are
+a per-column bytearray mask, created only if the column has one.
+Values are rebuilt only when a row is read, and turned into text only when
+a row is displayed (format()). sort(), where(), filter() and search() return
+views over the same columns that differ only in their index array.
+"""
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+# String columns dictionary-encoded by default (small, fixed value sets)
+ENUM_COLUMNS = frozenset({"status", "payment_method", "device_type", "content_type", "plan_name"})
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+BATCH_ROWS = 10000
+
+
+# Smallest signed array typecode for a value range, narrowest first
+_INT_TYPECODES = [("b", 1 << 7), ("h", 1 << 15), ("i", 1 << 31), ("q", 1 << 63)]
+
+
+class _Column:
+    """One column: a typed buffer plus an optional NULL mask"""
+    typecode = "q"
+
+    def __init__(self, size=0):
+        self.data = array(self.typecode)
+        self.nulls = None
+        self.extend([None] * size)
+
+    def __len__(self):
+        return len(self.data)
+
+    def extend(self, values):
+        """Append one batch of values of this column"""
+        if None in values:
+            if self.nulls is None:
+                self.nulls = bytearray(len(self))
+            self.nulls.extend(value is None for value in values)
+            values = [self.placeholder if value is None else value for value in values]
+        elif self.nulls is not None:
+            self.nulls.extend(bytes(len(values)))
+        self._extend(values)
+
+    placeholder = 0
+
+    def _extend(self, values):
+        self.data.extend(values)
+
+    def finish(self):
+        """Called once every batch is in"""
+
+    def decode(self, raw):
+        return raw
+
+    def is_null(self, i):
+        return self.nulls is not None and self.nulls[i]
+
+    def get(self, i):
+        return None if self.is_null(i) else self.decode(self.data[i])
+
+    def key(self, i):
+        """Sort key for row i; NULLs sort after every value"""
+        return (1, 0) if self.is_null(i) else (0, self.data[i])
+
+    def nbytes(self):
+        size = self.data.itemsize * len(self.data)
+        return size + (len(self.nulls) if self.nulls is not None else 0)
+
+
+class _IntColumn(_Column):
+    def finish(self):
+        # Ids fit in 4 bytes and flags in 1; keep the narrowest type that holds every value
+        if self.data:
+            low, high = min(self.data), max(self.data)
+            for typecode, limit in _INT_TYPECODES:
+                if -limit <= low and high < limit:
+                    if typecode != self.data.typecode:
+                        self.data = array(typecode, self.data)
+                    break
+
+
+class _DecimalColumn(_IntColumn):
+    """Fixed-scale decimals (DECIMAL(p, s)) as integers times 10**s.
+
+    The scale starts at the column's declared one when the cursor reports
+    it, else 0. Values with more fractional digits rescale what is stored
+    rather than being truncated.
+    """
+
+    placeholder = Decimal(0)
+
+    def __init__(self, scale, size=0):
+        self.scale = scale
+        super().__init__(size)
+
+    def _extend(self, values):
+        needed = self.scale
+        for value in values:
+            if not value.is_finite():
+                raise ValueError(f"cannot store {value} in a DECIMAL column")
+            needed = max(needed, -value.as_tuple().exponent)
+        if needed > self.scale:
+            factor = 10 ** (needed - self.scale)
+            self.data = array("q", (raw * factor for raw in self.data))  # OverflowError past 64 bits
+            self.scale = needed
+        scale = self.scale
+        self.data.extend(int(value.scaleb(scale)) for value in values)
+
+    def decode(self, raw):
+        return Decimal(raw).scaleb(-self.scale)
+
+
+class _FloatColumn(_Column):
+    typecode = "d"
+    placeholder = 0.0
+
+
+class _DateColumn(_Column):
+    typecode = "i"
+    placeholder = date.min
+
+    def _extend(self, values):
+        self.data.extend(value.toordinal() for value in values)
+
+    def decode(self, raw):
+        return date.fromordinal(raw)
+
+
+class _DateTimeColumn(_Column):
+    placeholder = EPOCH
+
+    def _extend(self, values):
+        self.data.extend((value - EPOCH) // MICROSECOND for value in values)
+
+    def decode(self, raw):
+        return EPOCH + raw * MICROSECOND
+
+
+class _EnumColumn(_Column):
+    """Codes into a list of interned strings; widens from 1 to 2 byte codes past 256 values"""
+    typecode = "B"
+    placeholder = None
+
+    def __init__(self, size=0):
+        self.values = []
+        self.codes = {None: 0}  # NULL rows store code 0; the mask tells them apart
+        super().__init__(size)
+
+    def _code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            if code == 256 and self.data.typecode == "B":
+                self.data = array("H", self.data)
+            self.values.append(sys.intern(value))
+            self.codes[self.values[-1]] = code
+        return code
+
+    def _extend(self, values):
+        codes = [self._code(value) for value in values]  # may widen self.data first
+        self.data.extend(codes)
+
+    def decode(self, raw):
+        return self.values[raw]
+
+    def key(self, i):
+        # Order by the strings, not by first appearance
+        if self.is_null(i):
+            return (1, "")
+        return (0, self.values[self.data[i]])
+
+    def nbytes(self):
+        return super().nbytes() + sum(sys.getsizeof(value) for value in self.values)
+
+
+class _TextColumn(_Column):
+    """All values UTF-8 encoded back to back; offsets[i]:offsets[i + 1] is row i"""
+    placeholder = ""
+
+    def __init__(self, size=0):
+        self.buffer = bytearray()
+        self.offsets = array("I", [0])  # widened to 8 bytes past 4 GB of text
+        super().__init__(size)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _extend(self, values):
+        encoded = [value.encode() for value in values]
+        end = len(self.buffer)
+        self.buffer += b"".join(encoded)
+        if len(self.buffer) > 0xFFFFFFFF and self.offsets.typecode == "I":
+            self.offsets = array("q", self.offsets)
+        self.offsets.extend(end + size for size in accumulate(map(len, encoded)))
+
+    def get(self, i):
+        if self.is_null(i):
+            return None
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode()
+
+    def key(self, i):
+        return (1, "") if self.is_null(i) else (0, self.get(i))
+
+    def nbytes(self):
+        size = len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+        return size + (len(self.nulls) if self.nulls is not None else 0)
+
+
+class _PendingColumn:
+    """A column that has seen only NULLs so far; becomes typed on the first value"""
+
+    def __init__(self):
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def extend(self, values):
+        self.size += len(values)
+
+
+def _column_for(name, value, size, enums, scale=None):
+    if isinstance(value, bool) or isinstance(value, int):
+        return _IntColumn(size)
+    if isinstance(value, Decimal):
+        return _DecimalColumn(scale or 0, size)
+    if isinstance(value, float):
+        return _FloatColumn(size)
+    if isinstance(value, datetime):
+        return _DateTimeColumn(size)
+    if isinstance(value, date):
+        return _DateColumn(size)
+    if isinstance(value, str):
+        return _EnumColumn(size) if name in enums else _TextColumn(size)
+    raise TypeError(f"Column {name!r}: cannot store {type(value).__name__} values")
+
+
+def format_value(value):
+    """Display text for one value, as the Treeviews show it"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+class RowStore:
+    """Rows of one result set kept column by column; see the module docstring"""
+
+    def __init__(self, fields, columns, index=None, record=None):
+        self.fields = tuple(fields)
+        self._columns = columns
+        self._position = {name: i for i, name in enumerate(self.fields)}
+        self._index = index
+        self.record = record
+
+    @classmethod
+    def build(cls, fields, batches, record=None, enums=None, scales=None):
+        """Store the rows of an iterable of row batches (lists of tuples).
+
+        scales gives the declared scale of DECIMAL columns by position, where known.
+        """
+        enums = ENUM_COLUMNS if enums is None else frozenset(enums)
+        scales = scales or [None] * len(fields)
+        columns = [_PendingColumn() for _ in fields]
+        for batch in batches:
+            # Column by column, so each buffer is extended once per batch
+            for i, values in enumerate(zip(*batch)):
+                column = columns[i]
+                if isinstance(column, _PendingColumn):
+                    first = next((value for value in values if value is not None), None)
+                    if first is not None:
+                        column = columns[i] = _column_for(fields[i], first, len(column), enums, scales[i])
+                column.extend(values)
+        columns = [_TextColumn(len(column)) if isinstance(column, _PendingColumn) else column
+                   for column in columns]
+        for column in columns:
+            column.finish()
+        return cls(fields, columns, record=record)
+
+    @classmethod
+    def from_rows(cls, fields, rows, record=None, enums=None):
+        return cls.build(fields, [rows], record, enums)
+
+    @classmethod
+    def from_cursor(cls, cursor, record=None, enums=None, size=BATCH_ROWS):
+        """Store an executed cursor's result, fetching size rows at a time"""
+        fields = record._fields if record else [column[0] for column in cursor.description]
+        # DB-API scale, when the driver fills it in (mysql.connector leaves it None)
+        scales = [column[5] if len(column) > 5 else None for column in cursor.description]
+
+        def batches():
+            while True:
+                batch = cursor.fetchmany(size)
+                if not batch:
+                    return
+                yield batch
+        return cls.build(fields, batches(), record, enums, scales)
+
+    # ---------------- ACCESS ----------------
+    def __len__(self):
+        return len(self._index) if self._index is not None else len(self._columns[0]) if self._columns else 0
+
+    def _row_id(self, i):
+        return self._index[i] if self._index is not None else i
+
+    def _row_ids(self):
+        return self._index if self._index is not None else range(len(self))
+
+    def row(self, i):
+        """Row i of this view as a tuple (or record) of Python values"""
+        if i < 0:
+            i += len(self)
+        row_id = self._row_id(i)
+        values = tuple(column.get(row_id) for column in self._columns)
+        return self.record(*values) if self.record else values
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def column(self, name):
+        """All values of one column, in view order"""
+        column = self._columns[self._position[name]]
+        return [column.get(row_id) for row_id in self._row_ids()]
+
+    def format(self, i):
+        """Row i as display strings; the only place values become text"""
+        row_id = self._row_id(i)
+        return tuple(format_value(column.get(row_id)) for column in self._columns)
+
+    # ---------------- VIEWS ----------------
+    def _view(self, row_ids):
+        return RowStore(self.fields, self._columns, array("q", row_ids), self.record)
+
+    def sort(self, name, reverse=False):
+        """A view ordered by one column; NULLs sort after every value"""
+        column = self._columns[self._position[name]]
+        return self._view(sorted(self._row_ids(), key=column.key, reverse=reverse))
+
+    def where(self, name, value):
+        """A view of the rows whose column equals value; compares codes for enum columns"""
+        column = self._columns[self._position[name]]
+        if isinstance(column, _EnumColumn):
+            code = column.codes.get(value)
+            data = column.data
+            return self._view(row_id for row_id in self._row_ids()
+                              if code is not None and data[row_id] == code and not column.is_null(row_id))
+        return self._view(row_id for row_id in self._row_ids() if column.get(row_id) == value)
+
+    def filter(self, predicate, *names):
+        """A view of the rows for which predicate(*values of names) is true"""
+        columns = [self._columns[self._position[name]] for name in names or self.fields]
+        return self._view(row_id for row_id in self._row_ids()
+                          if predicate(*(column.get(row_id) for column in columns)))
+
+    def search(self, text, *names):
+        """A view of the rows where any of the named columns contains text, ignoring case"""
+        text = text.strip().lower()
+        if not text:
+            return self
+        return self.filter(lambda *values: any(value is not None and text in str(value).lower()
+                                               for value in values), *names)
+
+    def nbytes(self):
+        """Bytes held by the column buffers and the view index"""
+        size = sum(column.nbytes() for column in self._columns)
+        return size + (self._index.itemsize * len(self._index) if self._index is not None else 0)
@@ -0,0 +1,86 @@
+"""Lazy, cached season/episode loading for the series drill-down.
+
+Opening a series card loads only its seasons (one query); expanding a season
+loads only that season's episodes with their view stats (one query). Both
+levels are cached per series for a short time. Hovering a card prefetches the
+seasons and the first season's episodes on a pooled connection in the
+background, so the detail view usually opens straight from the cache.
+"""
+import threading
+import time
+
+import ott_service as svc
+
+CACHE_TTL = 120.0
+
+
+class SeriesCache:
+    """Seasons per content_id and episodes per season_id, with expiry"""
+
+    def __init__(self, ttl=CACHE_TTL, pool=None):
+        self.ttl = ttl
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._seasons = {}       # content_id -> (expires_at, [SeasonRecord])
+        self._episodes = {}      # season_id -> (expires_at, [EpisodeRecord])
+        self._prefetching = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, table, key):
+        with self._lock:
+            entry = table.get(key)
+            if entry and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def _put(self, table, key, rows):
+        with self._lock:
+            table[key] = (time.monotonic() + self.ttl, rows)
+        return rows
+
+    def seasons(self, conn, content_id):
+        rows = self._get(self._seasons, content_id)
+        if rows is None:
+            rows = self._put(self._seasons, content_id, svc.seasons(conn, content_id))
+        return rows
+
+    def episodes(self, conn, season_id):
+        rows = self._get(self._episodes, season_id)
+        if rows is None:
+            rows = self._put(self._episodes, season_id, svc.episodes(conn, season_id))
+        return rows
+
+    def prefetch(self, content_id):
+        """Warm the cache for a series on a background thread; no-op if cached or in flight"""
+        with self._lock:
+            entry = self._seasons.get(content_id)
+            if (entry and entry[0] > time.monotonic()) or content_id in self._prefetching:
+                return
+            self._prefetching.add(content_id)
+        threading.Thread(target=self._prefetch, args=(content_id,), daemon=True).start()
+
+    def _prefetch(self, content_id):
+        try:
+            if self._pool is None:
+                from db_connect import get_pool
+                self._pool = get_pool()
+            conn = self._pool.get_connection()
+            try:
+                seasons = self._put(self._seasons, content_id, svc.seasons(conn, content_id))
+                if seasons:
+                    self._put(self._episodes, seasons[0].season_id, svc.episodes(conn, seasons[0].season_id))
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Series prefetch failed for {content_id}: {e}")
+        finally:
+            with self._lock:
+                self._prefetching.discard(content_id)
+
+    def clear(self):
+        with self._lock:
+            self._seasons.clear()
+            self._episodes.clear()
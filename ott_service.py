@@ -0,0 +1,630 @@
+"""Headless data access for the OTT database.
+
+Every function takes an open connection (see db_connect.connect_db) and
+returns plain records, so the same operations can be used by the GUI,
+scripts and benchmarks without a Tk event loop. Write functions commit on
+success and roll back before re-raising on failure. Fixed queries are
+registered in ott_statements and run as cached server-side prepared
+statements.
+"""
+from typing import NamedTuple, Optional
+from datetime import date, datetime
+from decimal import Decimal
+
+import ott_statements as stmts
+from ott_rows import RowStore
+
+
+# ---------------- RECORDS ----------------
+class UserRecord(NamedTuple):
+    user_id: int
+    first_name: str
+    last_name: Optional[str]
+    email: Optional[str]
+    phone: Optional[str]
+    registration_date: date
+
+
+class NewUser(NamedTuple):
+    first_name: str
+    last_name: str
+    email: str
+    phone: str
+
+
+class SubscriptionRecord(NamedTuple):
+    subscription_id: int
+    first_name: str
+    last_name: Optional[str]
+    plan_name: str
+    start_date: date
+    end_date: date
+    status: str
+    auto_renewal: int
+
+
+class ContentRecord(NamedTuple):
+    content_id: int
+    title: str
+    content_type: str
+    rating: str
+    language: Optional[str]
+    release_date: Optional[date]
+    avg_rating: Optional[Decimal]
+    description: Optional[str]
+
+
+class TopRatedRecord(NamedTuple):
+    title: str
+    avg_rating: Decimal
+    total_reviews: int
+
+
+class SeasonRecord(NamedTuple):
+    season_id: int
+    season_number: int
+    title: Optional[str]
+    total_episodes: Optional[int]
+    episode_count: int
+
+
+class EpisodeRecord(NamedTuple):
+    episode_id: int
+    season_id: int
+    episode_number: int
+    title: Optional[str]
+    duration: Optional[int]
+    views: int
+    avg_completion: Optional[Decimal]
+
+
+class RecommendationRecord(NamedTuple):
+    content_id: int
+    title: str
+    content_type: str
+    score: Decimal
+
+
+class ProgressRecord(NamedTuple):
+    content_id: int
+    title: str
+    episode_title: Optional[str]
+    completion_percentage: Optional[Decimal]
+    last_watched: datetime
+
+
+class PaymentLogRecord(NamedTuple):
+    log_id: int
+    payment_id: int
+    log_message: str
+    log_time: datetime
+
+
+class PaymentSummaryRecord(NamedTuple):
+    month: str
+    payment_method: str
+    transactions: int
+    total_amount: Decimal
+
+
+class WatchStatRecord(NamedTuple):
+    title: str
+    views: int
+    avg_completion: Decimal
+
+
+class RevenueSummary(NamedTuple):
+    total: Decimal
+    month: Decimal
+    success_rate: float
+
+
+class UserStats(NamedTuple):
+    total: int
+    active: int
+    new: int
+
+
+class PaymentMethodStat(NamedTuple):
+    payment_method: str
+    count: int
+    total: Decimal
+
+
+class PlanStat(NamedTuple):
+    plan_name: str
+    subscribers: int
+    price: Decimal
+
+
+class ContentStats(NamedTuple):
+    total: int
+    movies: int
+    series: int
+
+
+class DeviceRecord(NamedTuple):
+    device_id: int
+    first_name: str
+    last_name: Optional[str]
+    device_name: str
+    device_type: str
+    last_used: Optional[datetime]
+
+
+class ActiveUserRecord(NamedTuple):
+    name: str
+    device_count: int
+
+
+DEVICE_TYPES = ("TV", "Mobile", "Laptop", "Tablet", "Other")
+
+
+# ---------------- SQL ----------------
+# User_Directory holds one row per user with the primary email and phone
+USER_SELECT = """SELECT d.user_id, d.first_name, d.last_name, d.email, d.phone_number, d.registration_date
+               FROM User_Directory d"""
+USER_LIST_SQL = USER_SELECT + " ORDER BY d.user_id DESC"
+# Match on the narrow search_key index first, then read only the matching rows
+USER_SEARCH_SQL = """SELECT d.user_id, d.first_name, d.last_name, d.email, d.phone_number, d.registration_date
+               FROM (SELECT user_id FROM User_Directory WHERE search_key LIKE %s) m
+               JOIN User_Directory d ON d.user_id = m.user_id
+               ORDER BY d.user_id DESC"""
+
+SUBSCRIPTION_LIST_SQL = """SELECT us.subscription_id, u.first_name, u.last_name, sp.plan_name,
+               us.start_date, us.end_date, us.status, us.auto_renewal
+               FROM User_Subscription us
+               JOIN User u ON us.user_id = u.user_id
+               JOIN Subscription_Plan sp ON us.plan_id = sp.plan_id
+               ORDER BY us.subscription_id DESC"""
+
+CONTENT_SELECT = """SELECT c.content_id, c.title, c.content_type, c.rating, c.language,
+               c.release_date, ROUND(AvgContentRating(c.content_id), 2) as avg_rating,
+               c.description
+               FROM Content c"""
+CONTENT_LIST_SQL = CONTENT_SELECT + " ORDER BY c.content_id DESC"
+CONTENT_SEARCH_SQL = CONTENT_SELECT + """
+               WHERE c.title LIKE %s OR c.language LIKE %s
+               ORDER BY c.content_id DESC"""
+# Facet attributes for the in-memory browse index (ott_facets.py)
+CONTENT_FACETS_SQL = "SELECT content_id, language, rating, content_type FROM Content"
+CONTENT_GENRES_SQL = "SELECT content_id, genre_id FROM Content_Genre"
+GENRE_NAMES_SQL = "SELECT genre_id, genre_name FROM Genre"
+SEASONS_SQL = """SELECT s.season_id, s.season_number, s.title, s.total_episodes, COUNT(e.episode_id)
+               FROM Season s
+               LEFT JOIN Episode e ON e.season_id = s.season_id
+               WHERE s.content_id = %s
+               GROUP BY s.season_id, s.season_number, s.title, s.total_episodes
+               ORDER BY s.season_number"""
+# View stats come from idx_history_episode without touching Watch_History rows
+EPISODES_SQL = """SELECT e.episode_id, e.season_id, e.episode_number, e.title, e.duration,
+               COUNT(wh.episode_id) as views, ROUND(AVG(wh.completion_percentage), 2) as avg_completion
+               FROM Episode e
+               LEFT JOIN Watch_History wh ON wh.episode_id = e.episode_id
+               WHERE e.season_id = %s
+               GROUP BY e.episode_id, e.season_id, e.episode_number, e.title, e.duration
+               ORDER BY e.episode_number"""
+
+PAYMENT_LOG_SQL = """SELECT log_id, payment_id, log_message, log_time
+               FROM Payment_Log ORDER BY log_time DESC LIMIT %s"""
+# Payment figures add the per-month totals of payments moved out by ott_archive.py
+PAYMENT_SUMMARY_SQL = """SELECT month, payment_method,
+               CAST(SUM(transactions) AS SIGNED) as transactions, SUM(total_amount) as total_amount
+               FROM (SELECT DATE_FORMAT(payment_date, '%Y-%m') as month, payment_method,
+                            COUNT(*) as transactions, SUM(amount) as total_amount
+                     FROM Payment
+                     WHERE status = 'success'
+                     GROUP BY DATE_FORMAT(payment_date, '%Y-%m'), payment_method
+                     UNION ALL
+                     SELECT month, payment_method, transactions, total_amount
+                     FROM Archived_Payment_Summary
+                     WHERE status = 'success') p
+               GROUP BY month, payment_method
+               ORDER BY month DESC"""
+WATCH_STATS_SQL = """SELECT c.title, COUNT(*) as views,
+               ROUND(AVG(wh.completion_percentage), 2) as avg_completion
+               FROM Watch_History wh
+               JOIN Content c ON wh.content_id = c.content_id
+               GROUP BY c.title
+               ORDER BY views DESC
+               LIMIT %s"""
+
+REVENUE_TOTAL_SQL = """SELECT IFNULL((SELECT SUM(amount) FROM Payment WHERE status='success'), 0)
+                         + IFNULL((SELECT SUM(total_amount) FROM Archived_Payment_Summary
+                                   WHERE status='success'), 0)"""
+REVENUE_MONTH_SQL = """SELECT SUM(amount) FROM Payment
+                         WHERE status='success' AND MONTH(payment_date) = MONTH(CURDATE())
+                         AND YEAR(payment_date) = YEAR(CURDATE())"""
+PAYMENT_SUCCESS_COUNT_SQL = """SELECT (SELECT COUNT(*) FROM Payment WHERE status='success')
+                         + CAST(IFNULL((SELECT SUM(transactions) FROM Archived_Payment_Summary
+                                        WHERE status='success'), 0) AS SIGNED)"""
+PAYMENT_COUNT_SQL = """SELECT (SELECT COUNT(*) FROM Payment)
+                         + CAST(IFNULL((SELECT SUM(transactions) FROM Archived_Payment_Summary), 0) AS SIGNED)"""
+USER_COUNT_SQL = "SELECT COUNT(*) FROM User"
+ACTIVE_SUB_COUNT_SQL = "SELECT COUNT(*) FROM User_Subscription WHERE status='active'"
+NEW_USERS_MONTH_SQL = """SELECT COUNT(*) FROM User
+                         WHERE MONTH(registration_date) = MONTH(CURDATE())
+                         AND YEAR(registration_date) = YEAR(CURDATE())"""
+PAYMENT_METHODS_SQL = """SELECT payment_method, CAST(SUM(count) AS SIGNED) as count, SUM(total) as total
+                         FROM (SELECT payment_method, COUNT(*) as count, SUM(amount) as total
+                               FROM Payment WHERE status='success'
+                               GROUP BY payment_method
+                               UNION ALL
+                               SELECT payment_method, transactions, total_amount
+                               FROM Archived_Payment_Summary WHERE status='success') p
+                         GROUP BY payment_method"""
+PLAN_STATS_SQL = """SELECT sp.plan_name, COUNT(*) as subscribers, sp.price
+                         FROM User_Subscription us
+                         JOIN Subscription_Plan sp ON us.plan_id = sp.plan_id
+                         WHERE us.status = 'active'
+                         GROUP BY sp.plan_name, sp.price"""
+CONTENT_COUNT_SQL = "SELECT COUNT(*) FROM Content"
+CONTENT_TYPE_COUNT_SQL = "SELECT COUNT(*) FROM Content WHERE content_type=%s"
+# (query, params) for each ContentStats field, shared with ott_api.py
+CONTENT_STATS_QUERIES = [(CONTENT_COUNT_SQL, None),
+                         (CONTENT_TYPE_COUNT_SQL, ("movie",)),
+                         (CONTENT_TYPE_COUNT_SQL, ("series",))]
+DAYS_LEFT_SQL = """SELECT subscription_id, DaysLeft(subscription_id)
+                         FROM User_Subscription WHERE subscription_id = %s"""
+
+DEVICE_SELECT = """SELECT d.device_id, u.first_name, u.last_name, d.device_name,
+               d.device_type, d.last_used
+               FROM Device d
+               JOIN User u ON d.user_id = u.user_id"""
+DEVICE_LIST_SQL = DEVICE_SELECT + " ORDER BY d.last_used DESC"
+DEVICE_TERM_FILTER = " AND (u.first_name LIKE %s OR u.last_name LIKE %s OR d.device_name LIKE %s)"
+DEVICE_TYPE_FILTER = " AND d.device_type = %s"
+# One fixed statement per (has term, has type) so each can stay prepared
+DEVICE_SEARCH_SQL = {
+    (has_term, has_type): DEVICE_SELECT + " WHERE 1=1"
+    + (DEVICE_TERM_FILTER if has_term else "") + (DEVICE_TYPE_FILTER if has_type else "")
+    + " ORDER BY d.last_used DESC"
+    for has_term in (False, True) for has_type in (False, True)
+}
+DEVICE_TYPE_COUNTS_SQL = "SELECT device_type, COUNT(*) FROM Device GROUP BY device_type"
+ACTIVE_USERS_SQL = """SELECT CONCAT(u.first_name, ' ', u.last_name) as name, COUNT(d.device_id) as device_count
+                   FROM User u
+                   JOIN Device d ON u.user_id = d.user_id
+                   GROUP BY u.user_id, name
+                   ORDER BY device_count DESC
+                   LIMIT %s"""
+
+
+# ---------------- STATEMENTS ----------------
+for _name, _query in [
+    ("user_list", USER_LIST_SQL), ("user_search", USER_SEARCH_SQL),
+    ("subscription_list", SUBSCRIPTION_LIST_SQL), ("days_left", DAYS_LEFT_SQL),
+    ("content_list", CONTENT_LIST_SQL), ("content_search", CONTENT_SEARCH_SQL),
+    ("content_facets", CONTENT_FACETS_SQL), ("content_genres", CONTENT_GENRES_SQL),
+    ("genre_names", GENRE_NAMES_SQL), ("seasons", SEASONS_SQL), ("episodes", EPISODES_SQL),
+    ("payment_log", PAYMENT_LOG_SQL), ("payment_summary", PAYMENT_SUMMARY_SQL),
+    ("watch_stats", WATCH_STATS_SQL), ("revenue_total", REVENUE_TOTAL_SQL),
+    ("revenue_month", REVENUE_MONTH_SQL), ("payment_success_count", PAYMENT_SUCCESS_COUNT_SQL),
+    ("payment_count", PAYMENT_COUNT_SQL), ("user_count", USER_COUNT_SQL),
+    ("active_sub_count", ACTIVE_SUB_COUNT_SQL), ("new_users_month", NEW_USERS_MONTH_SQL),
+    ("payment_methods", PAYMENT_METHODS_SQL), ("plan_stats", PLAN_STATS_SQL),
+    ("content_count", CONTENT_COUNT_SQL), ("content_type_count", CONTENT_TYPE_COUNT_SQL),
+    ("device_list", DEVICE_LIST_SQL), ("device_type_counts", DEVICE_TYPE_COUNTS_SQL),
+    ("active_users", ACTIVE_USERS_SQL),
+]:
+    stmts.register(_name, _query)
+for (_has_term, _has_type), _query in DEVICE_SEARCH_SQL.items():
+    stmts.register("device_search" + ("_term" if _has_term else "") + ("_type" if _has_type else ""), _query)
+
+
+# ---------------- HELPERS ----------------
+def _fetch(conn, query, params=None, record=None):
+    """Rows of a query; registered queries go through their prepared statement"""
+    statement = stmts.lookup(query)
+    if statement is not None:
+        rows = stmts.execute(conn, statement, params)
+    else:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    return [record(*row) for row in rows] if record else rows
+
+
+def _fetch_store(conn, query, params=None, record=None):
+    """Rows of a query as a compact RowStore, read in batches instead of one fetchall()"""
+    statement = stmts.lookup(query)
+    if statement is not None:
+        return RowStore.build(record._fields, stmts.iterate(conn, statement, params), record)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return RowStore.from_cursor(cursor, record)
+    finally:
+        cursor.close()
+
+
+def _call(conn, proc, args, record=None):
+    """Rows of the last result set returned by a stored procedure"""
+    cursor = conn.cursor()
+    rows = []
+    try:
+        cursor.callproc(proc, list(args))
+        for result in cursor.stored_results():
+            rows = result.fetchall()
+    finally:
+        cursor.close()
+    return [record(*row) for row in rows] if record else rows
+
+
+def _scalar(conn, query, params=None):
+    rows = _fetch(conn, query, params)
+    return rows[0][0] if rows else None
+
+
+def _write(conn, work):
+    """Run work(cursor) in one transaction"""
+    cursor = conn.cursor()
+    try:
+        result = work(cursor)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _like(term):
+    return f"%{term}%"
+
+
+def _placeholders(values):
+    return ", ".join(["%s"] * len(values))
+
+
+# ---------------- USERS ----------------
+def _check_new_user(user):
+    if not all(value and value.strip() for value in user):
+        raise ValueError("Please fill all fields.")
+    return NewUser(*(value.strip() for value in user))
+
+
+def add_user(conn, first_name, last_name, email, phone):
+    """Create a user with one email and phone through AddNewUser"""
+    add_users(conn, [NewUser(first_name, last_name, email, phone)])
+
+
+def add_users(conn, users):
+    """Create several users in a single transaction"""
+    users = [_check_new_user(NewUser(*user)) for user in users]
+
+    def work(cursor):
+        for user in users:
+            cursor.callproc("AddNewUser", list(user))
+    _write(conn, work)
+
+
+def list_users(conn):
+    return _fetch(conn, USER_LIST_SQL, record=UserRecord)
+
+
+def search_users(conn, term):
+    """Users whose name or email contains term; all users for an empty term"""
+    term = term.strip()
+    if not term:
+        return list_users(conn)
+    return _fetch(conn, USER_SEARCH_SQL, (_like(term),), UserRecord)
+
+
+def user_rows(conn, term=""):
+    """search_users() as a RowStore, for lists the GUI keeps"""
+    term = term.strip()
+    if not term:
+        return _fetch_store(conn, USER_LIST_SQL, record=UserRecord)
+    return _fetch_store(conn, USER_SEARCH_SQL, (_like(term),), UserRecord)
+
+
+def delete_user(conn, user_id):
+    """Delete a user; dependent rows go through ON DELETE CASCADE"""
+    return delete_users(conn, [user_id])
+
+
+def delete_users(conn, user_ids):
+    """Delete several users in one statement; returns rows deleted"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+
+    def work(cursor):
+        cursor.execute(f"DELETE FROM User WHERE user_id IN ({_placeholders(user_ids)})", user_ids)
+        return cursor.rowcount
+    return _write(conn, work)
+
+
+# ---------------- SUBSCRIPTIONS ----------------
+def list_subscriptions(conn):
+    return _fetch(conn, SUBSCRIPTION_LIST_SQL, record=SubscriptionRecord)
+
+
+def subscription_rows(conn):
+    """list_subscriptions() as a RowStore, for lists the GUI keeps"""
+    return _fetch_store(conn, SUBSCRIPTION_LIST_SQL, record=SubscriptionRecord)
+
+
+def renew_subscription(conn, subscription_id):
+    renew_subscriptions(conn, [subscription_id])
+
+
+def renew_subscriptions(conn, subscription_ids):
+    """Renew several subscriptions through RenewSubscription in one transaction"""
+    subscription_ids = [int(sub_id) for sub_id in subscription_ids]
+
+    def work(cursor):
+        for sub_id in subscription_ids:
+            cursor.callproc("RenewSubscription", [sub_id])
+    _write(conn, work)
+
+
+def days_left(conn, subscription_id):
+    """Days until the subscription ends (negative once expired), None if unknown"""
+    rows = _fetch(conn, DAYS_LEFT_SQL, (int(subscription_id),))
+    return rows[0][1] if rows else None
+
+
+def days_left_many(conn, subscription_ids):
+    """{subscription_id: days left} for every id that exists"""
+    subscription_ids = [int(sub_id) for sub_id in subscription_ids]
+    if not subscription_ids:
+        return {}
+    rows = _fetch(conn, f"""SELECT subscription_id, DaysLeft(subscription_id)
+                            FROM User_Subscription
+                            WHERE subscription_id IN ({_placeholders(subscription_ids)})""",
+                  subscription_ids)
+    return dict(rows)
+
+
+# ---------------- CONTENT ----------------
+def list_content(conn):
+    return _fetch(conn, CONTENT_LIST_SQL, record=ContentRecord)
+
+
+def search_content(conn, term):
+    """Content whose title or language contains term"""
+    term = term.strip()
+    if not term:
+        return list_content(conn)
+    return _fetch(conn, CONTENT_SEARCH_SQL, (_like(term),) * 2, ContentRecord)
+
+
+def content_facets(conn):
+    """(content_id, language, rating, content_type) for every title"""
+    return _fetch(conn, CONTENT_FACETS_SQL)
+
+
+def content_genres(conn):
+    """(content_id, genre_id) pairs"""
+    return _fetch(conn, CONTENT_GENRES_SQL)
+
+
+def genre_names(conn):
+    """{genre_id: genre_name}"""
+    return dict(_fetch(conn, GENRE_NAMES_SQL))
+
+
+def seasons(conn, content_id):
+    """Seasons of a series with their episode counts, in order"""
+    return _fetch(conn, SEASONS_SQL, (int(content_id),), SeasonRecord)
+
+
+def episodes(conn, season_id):
+    """Episodes of a season with view counts and average completion"""
+    return _fetch(conn, EPISODES_SQL, (int(season_id),), EpisodeRecord)
+
+
+def top_rated(conn, limit=10):
+    """Top rated content through the TopRatedContent procedure"""
+    return _call(conn, "TopRatedContent", [int(limit)], TopRatedRecord)
+
+
+def recommendations(conn, profile_id, limit=10):
+    """Precomputed "because you watched" titles for a profile (see ott_recommend.py)"""
+    return _call(conn, "RecommendForProfile", [int(profile_id), int(limit)], RecommendationRecord)
+
+
+def continue_watching(conn, profile_id, limit=10):
+    """Unfinished titles of a profile, newest first, from Profile_Progress"""
+    return _call(conn, "ContinueWatching", [int(profile_id), int(limit)], ProgressRecord)
+
+
+# ---------------- ANALYTICS ----------------
+def payment_logs(conn, limit=20):
+    return _fetch(conn, PAYMENT_LOG_SQL, (limit,), PaymentLogRecord)
+
+
+def payment_summary(conn):
+    return _fetch(conn, PAYMENT_SUMMARY_SQL, record=PaymentSummaryRecord)
+
+
+def watch_stats(conn, limit=15):
+    return _fetch(conn, WATCH_STATS_SQL, (limit,), WatchStatRecord)
+
+
+def revenue_summary(conn):
+    total = _scalar(conn, REVENUE_TOTAL_SQL) or 0
+    month = _scalar(conn, REVENUE_MONTH_SQL) or 0
+    success = _scalar(conn, PAYMENT_SUCCESS_COUNT_SQL) or 0
+    total_payments = _scalar(conn, PAYMENT_COUNT_SQL) or 1
+    return RevenueSummary(total, month, (success / total_payments) * 100)
+
+
+def user_stats(conn):
+    return UserStats(_scalar(conn, USER_COUNT_SQL),
+                     _scalar(conn, ACTIVE_SUB_COUNT_SQL),
+                     _scalar(conn, NEW_USERS_MONTH_SQL))
+
+
+def payment_methods(conn):
+    return _fetch(conn, PAYMENT_METHODS_SQL, record=PaymentMethodStat)
+
+
+def plan_stats(conn):
+    return _fetch(conn, PLAN_STATS_SQL, record=PlanStat)
+
+
+def content_stats(conn):
+    return ContentStats(*(_scalar(conn, query, params) for query, params in CONTENT_STATS_QUERIES))
+
+
+# ---------------- DEVICES ----------------
+def list_devices(conn):
+    return _fetch(conn, DEVICE_LIST_SQL, record=DeviceRecord)
+
+
+def _device_search(term, device_type):
+    params = []
+    term = term.strip()
+    if term:
+        params += [_like(term)] * 3
+    has_type = bool(device_type and device_type != "All")
+    if has_type:
+        params.append(device_type)
+    return DEVICE_SEARCH_SQL[bool(term), has_type], params
+
+
+def search_devices(conn, term="", device_type="All"):
+    """Devices filtered by user/device name and device type"""
+    query, params = _device_search(term, device_type)
+    return _fetch(conn, query, params, DeviceRecord)
+
+
+def device_rows(conn, term="", device_type="All"):
+    """search_devices() as a RowStore, for lists the GUI keeps"""
+    query, params = _device_search(term, device_type)
+    return _fetch_store(conn, query, params, DeviceRecord)
+
+
+def device_type_counts(conn):
+    """{device_type: count} for every type, zero for types with no devices"""
+    counts = dict.fromkeys(DEVICE_TYPES, 0)
+    counts.update(_fetch(conn, DEVICE_TYPE_COUNTS_SQL))
+    counts.pop(None, None)
+    return counts
+
+
+def delete_device(conn, device_id):
+    return delete_devices(conn, [device_id])
+
+
+def delete_devices(conn, device_ids):
+    device_ids = list(device_ids)
+    if not device_ids:
+        return 0
+
+    def work(cursor):
+        cursor.execute(f"DELETE FROM Device WHERE device_id IN ({_placeholders(device_ids)})", device_ids)
+        return cursor.rowcount
+    return _write(conn, work)
+
+
+def most_active_users(conn, limit=10):
+    """Users with the most registered devices"""
+    return _fetch(conn, ACTIVE_USERS_SQL, (limit,), ActiveUserRecord)
@@ -0,0 +1,256 @@
+"""Settlement of pending payments by a pool of workers.
+
+Each worker claims a batch of pending payments with
+
+    SELECT ... WHERE status = 'pending' ORDER BY payment_id LIMIT n FOR UPDATE SKIP LOCKED
+
+so concurrent workers take disjoint batches instead of queueing on each
+other's row locks. It charges every payment of its batch at the gateway,
+then in the same transaction sets each payment to 'success' or 'failed' and
+extends the subscription of each successful payment by its plan duration,
+like RenewSubscription. Payment_Log rows come from the payment_settled_log
+trigger, so a payment is settled, logged and paid for in one commit or not
+at all. Needs MySQL 8.0+ for SKIP LOCKED.
+
+Subscription rows are updated in subscription_id order, so workers never
+wait on each other in a cycle. The session sets @ott_skip_auto_renew so the
+auto_renew_payment trigger does not record a second payment for the period.
+
+    python ott_settlement.py                     # settle every pending payment with 4 workers
+    python ott_settlement.py --workers 8 --batch 50 --latency-ms 5
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from db_connect import connect_db
+
+WORKERS = 4
+BATCH_SIZE = 25
+DEADLOCK = 1213            # ER_LOCK_DEADLOCK
+LOCK_WAIT_TIMEOUT = 1205   # ER_LOCK_WAIT_TIMEOUT
+
+CLAIM_SQL = """SELECT payment_id, subscription_id, amount, payment_method
+               FROM Payment
+               WHERE status = 'pending'
+               ORDER BY payment_id
+               LIMIT %s
+               FOR UPDATE SKIP LOCKED"""
+# Without SKIP LOCKED, for comparison: every worker queues behind the oldest claimed rows
+CLAIM_WAIT_SQL = CLAIM_SQL.replace(" SKIP LOCKED", "")
+
+EXTEND_SQL = """UPDATE User_Subscription US
+                JOIN Subscription_Plan SP ON SP.plan_id = US.plan_id
+                SET US.end_date = DATE_ADD(US.end_date, INTERVAL SP.duration_months * %s MONTH),
+                    US.status = 'active'
+                WHERE US.subscription_id = %s"""
+
+
+class PendingPayment(NamedTuple):
+    payment_id: int
+    subscription_id: Optional[int]
+    amount: Decimal
+    payment_method: str
+
+
+class Settlement(NamedTuple):
+    succeeded: int
+    failed: int
+    batches: int
+    retries: int      # batches rolled back after a deadlock or lock wait timeout and claimed again
+
+
+def total(settlements):
+    """One Settlement summing those of several workers"""
+    return Settlement(*(sum(column) for column in zip(*settlements))) if settlements else Settlement(0, 0, 0, 0)
+
+
+# ---------------- GATEWAY ----------------
+class StubGateway:
+    """Local stand-in for a payment gateway.
+
+    charge() sleeps for latency seconds, like the network round trip of a
+    real gateway, and approves a payment with probability 1 - failure_rate.
+    The outcome is a function of payment_id, which acts as the idempotency
+    key: charging a payment again (after a rolled-back batch) returns the
+    first outcome and is counted as a repeat, not a second charge.
+    """
+
+    def __init__(self, latency=0.002, failure_rate=0.05, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._outcomes = {}
+        self.repeats = 0
+
+    def charge(self, payment):
+        """True if the payment went through"""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if payment.payment_id in self._outcomes:
+                self.repeats += 1
+                return self._outcomes[payment.payment_id]
+            approved = random.Random(payment.payment_id * 1000003 + self.seed).random() >= self.failure_rate
+            self._outcomes[payment.payment_id] = approved
+            return approved
+
+    @property
+    def charges(self):
+        return len(self._outcomes)
+
+
+# ---------------- SETTLEMENT ----------------
+def pending_count(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM Payment WHERE status = 'pending'")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def settle_batch(conn, gateway, batch_size=BATCH_SIZE, skip_locked=True):
+    """Claim, charge and record up to batch_size pending payments in one transaction.
+
+    Returns (succeeded, failed) lists of PendingPayment; both are empty when
+    no pending payment was left to claim.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CLAIM_SQL if skip_locked else CLAIM_WAIT_SQL, (batch_size,))
+        claimed = [PendingPayment(*row) for row in cursor.fetchall()]
+        if not claimed:
+            conn.rollback()
+            return [], []
+
+        succeeded, failed = [], []
+        for payment in claimed:
+            (succeeded if gateway.charge(payment) else failed).append(payment)
+
+        for status, payments in (("success", succeeded), ("failed", failed)):
+            if payments:
+                placeholders = ", ".join(["%s"] * len(payments))
+                cursor.execute(f"UPDATE Payment SET status = %s WHERE payment_id IN ({placeholders})",
+                               [status] + [payment.payment_id for payment in payments])
+
+        # One period per successful payment; one lock order for every worker
+        periods = Counter(payment.subscription_id for payment in succeeded if payment.subscription_id is not None)
+        for subscription_id in sorted(periods):
+            cursor.execute(EXTEND_SQL, (periods[subscription_id], subscription_id))
+        conn.commit()
+        return succeeded, failed
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def run_worker(conn, gateway, batch_size=BATCH_SIZE, progress=None, stop_event=None, skip_locked=True):
+    """Settle batches until nothing is pending or stop_event is set.
+
+    progress(succeeded, failed) is called after each committed batch with
+    the PendingPayment lists of that batch.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SET @ott_skip_auto_renew = 1")
+    cursor.close()
+    succeeded = failed = batches = retries = 0
+    while stop_event is None or not stop_event.is_set():
+        try:
+            ok, declined = settle_batch(conn, gateway, batch_size, skip_locked)
+        except Exception as e:
+            if getattr(e, "errno", None) in (DEADLOCK, LOCK_WAIT_TIMEOUT):
+                retries += 1
+                continue
+            raise
+        if not ok and not declined:
+            break
+        succeeded += len(ok)
+        failed += len(declined)
+        batches += 1
+        if progress:
+            progress(ok, declined)
+    return Settlement(succeeded, failed, batches, retries)
+
+
+def run_workers(workers=WORKERS, gateway=None, batch_size=BATCH_SIZE, progress=None, stop_event=None,
+                skip_locked=True, connect=connect_db):
+    """Run workers on their own connections until nothing is pending; one Settlement per worker.
+
+    progress is called from the worker threads. The first worker error is
+    raised once every worker has stopped.
+    """
+    gateway = gateway or StubGateway()
+    results = [None] * workers
+    errors = []
+
+    def worker(i):
+        conn = connect()
+        if conn is None:
+            errors.append(RuntimeError("Could not connect to the database"))
+            return
+        try:
+            results[i] = run_worker(conn, gateway, batch_size, progress, stop_event, skip_locked)
+        except Exception as e:
+            errors.append(e)
+            if stop_event is not None:
+                stop_event.set()
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"ott-settle-{i}", daemon=True)
+               for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Settle pending payments with a pool of workers")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="stub gateway time per charge")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="share of charges the stub declines")
+    args = parser.parse_args(argv)
+
+    conn = connect_db()
+    if conn is None:
+        return 1
+    pending = pending_count(conn)
+    conn.close()
+    if not pending:
+        print("Nothing pending.")
+        return 0
+
+    settled = [0]
+    lock = threading.Lock()
+
+    def progress(succeeded, failed):
+        with lock:
+            settled[0] += len(succeeded) + len(failed)
+            print(f"\r{settled[0]:>10,} of ~{pending:,} settled", end="", flush=True)
+
+    gateway = StubGateway(args.latency_ms / 1000, args.failure_rate)
+    started = time.perf_counter()
+    result = total(run_workers(args.workers, gateway, args.batch, progress))
+    elapsed = time.perf_counter() - started
+    print(f"\n{result.succeeded:,} succeeded, {result.failed:,} failed in {result.batches:,} batches "
+          f"({result.retries} retried) with {args.workers} workers: "
+          f"{(result.succeeded + result.failed) / elapsed:,.0f} payments/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Local snapshot of the last data the GUI showed, for warm starts.
+
+Every list page and analytics figure ott_gui.py loads is recorded under a
+view name; on exit the recorded views are written to a SQLite file. The next
+launch renders from that file at once, marked stale, while the database
+connection comes up, and can keep showing it read-only if the database is
+unreachable.
+
+Values are stored as JSON with tags for Decimal, date, datetime and
+timedelta, so rows come back with the types the connector returned. Lists
+are capped at SNAPSHOT_ROWS rows; records are rebuilt from the NamedTuple of
+the same name in ott_service. The file holds user names, emails and phone
+numbers and is created readable by its owner only.
+
+Set OTT_SNAPSHOT_PATH to move the file, or to an empty string to turn the
+snapshot off.
+"""
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import ott_service as svc
+from ott_rows import RowStore
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ott_cache")
+SNAPSHOT_PATH = os.getenv("OTT_SNAPSHOT_PATH", os.path.join(CACHE_DIR, "gui_snapshot.sqlite3"))
+SNAPSHOT_ROWS = 1000   # per list: the first pages the GUI shows
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_view (
+    name     TEXT PRIMARY KEY,
+    kind     TEXT NOT NULL,    -- 'store', 'rows', 'record' or 'dict'
+    record   TEXT,             -- ott_service NamedTuple of the rows, if any
+    fields   TEXT,             -- JSON column names of a store
+    body     TEXT NOT NULL,    -- JSON value
+    saved_at TEXT NOT NULL     -- when the value was loaded from the database
+)
+"""
+
+
+# ---------------- ENCODING ----------------
+def _default(value):
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"$timedelta": value.total_seconds()}
+    raise TypeError(f"cannot snapshot {type(value).__name__} values")
+
+
+def _object_hook(obj):
+    if len(obj) == 1:
+        (tag, text), = obj.items()
+        if tag == "$decimal":
+            return Decimal(text)
+        if tag == "$datetime":
+            return datetime.fromisoformat(text)
+        if tag == "$date":
+            return date.fromisoformat(text)
+        if tag == "$timedelta":
+            return timedelta(seconds=text)
+    return obj
+
+
+def _record_type(name):
+    record = getattr(svc, name, None) if name else None
+    return record if isinstance(record, type) and issubclass(record, tuple) and hasattr(record, "_fields") else None
+
+
+def _record_name(value):
+    return type(value).__name__ if hasattr(value, "_fields") else None
+
+
+def encode(value, limit=SNAPSHOT_ROWS):
+    """(kind, record name, fields, JSON body) for one view value"""
+    if isinstance(value, RowStore):
+        rows = [tuple(value.row(i)) for i in range(min(limit, len(value)))]
+        return "store", value.record.__name__ if value.record else None, json.dumps(value.fields), \
+            json.dumps(rows, default=_default)
+    if isinstance(value, dict):
+        return "dict", None, None, json.dumps(list(value.items()), default=_default)
+    if hasattr(value, "_fields"):
+        return "record", _record_name(value), None, json.dumps(value, default=_default)
+    rows = list(value)[:limit]
+    return "rows", _record_name(rows[0]) if rows else None, None, json.dumps(rows, default=_default)
+
+
+def decode(kind, record, fields, body):
+    """The view value encode() stored"""
+    value = json.loads(body, object_hook=_object_hook)
+    record = _record_type(record)
+    if kind == "store":
+        return RowStore.from_rows(json.loads(fields), [tuple(row) for row in value], record)
+    if kind == "dict":
+        return {key: item for key, item in value}
+    if kind == "record":
+        return record(*value) if record else tuple(value)
+    return [record(*row) if record else tuple(row) for row in value]
+
+
+# ---------------- SNAPSHOT ----------------
+class Snapshot:
+    """Views read from the snapshot file plus the ones recorded this session"""
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self.views = {}       # name -> value read from the file
+        self.saved_at = {}    # name -> datetime the value was loaded from the database
+        self._recorded = {}   # name -> (value, datetime) to write on save()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def load(self):
+        """Read the file; a missing, outdated or unreadable file leaves the snapshot empty"""
+        if not self.enabled or not os.path.exists(self.path):
+            return self
+        try:
+            db = sqlite3.connect(self.path)
+            try:
+                if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    return self
+                for name, kind, record, fields, body, saved_at in db.execute(
+                        "SELECT name, kind, record, fields, body, saved_at FROM snapshot_view"):
+                    try:
+                        self.views[name] = decode(kind, record, fields, body)
+                        self.saved_at[name] = datetime.fromisoformat(saved_at)
+                    except (ValueError, TypeError) as e:
+                        print(f"Snapshot view {name!r} skipped: {e}")
+            finally:
+                db.close()
+        except sqlite3.DatabaseError as e:
+            print(f"Snapshot not loaded: {e}")
+        return self
+
+    def __contains__(self, name):
+        return name in self.views
+
+    def __bool__(self):
+        return bool(self.views)
+
+    def get(self, name):
+        """The saved value of a view; KeyError if it was never saved"""
+        return self.views[name]
+
+    def oldest(self, names=None):
+        """Load time of the oldest of the named views (all views by default), or None"""
+        times = [self.saved_at[name] for name in (self.saved_at if names is None else names)
+                 if name in self.saved_at]
+        return min(times) if times else None
+
+    def record(self, name, value):
+        """Keep a freshly loaded value to write on save(); nothing is encoded until then"""
+        self._recorded[name] = (value, datetime.now())
+
+    def save(self):
+        """Write the views recorded this session; views not seen this time keep their old copy"""
+        if not self.enabled or not self._recorded:
+            return 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        rows = []
+        for name, (value, loaded_at) in self._recorded.items():
+            try:
+                rows.append((name, *encode(value), loaded_at.isoformat()))
+            except TypeError as e:
+                print(f"Snapshot view {name!r} not saved: {e}")
+        if not os.path.exists(self.path):
+            # Owner-only from the start: the file holds contact details
+            os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+        db = sqlite3.connect(self.path)
+        try:
+            if db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                db.execute("DROP TABLE IF EXISTS snapshot_view")
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            db.execute(SCHEMA)
+            with db:
+                db.executemany("INSERT OR REPLACE INTO snapshot_view VALUES (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            db.close()
+        self._recorded.clear()
+        return len(rows)
@@ -0,0 +1,193 @@
+"""Registry of server-side prepared statements.
+
+Every fixed query in ott_service is registered once by name. The first time
+it runs on a connection it is prepared (COM_STMT_PREPARE) on a cursor kept
+for that connection; every later call sends only the parameters
+(COM_STMT_EXECUTE) and reads the result in the binary protocol. MySQL no
+longer re-parses and re-resolves the text on each call, and parameters are
+never spliced into SQL.
+
+Counters per statement (executions, prepares, rows, time) are available
+from stats(). Set OTT_PREPARED=0 to run everything through plain text
+cursors instead, e.g. to compare.
+"""
+import os
+import threading
+import time
+import weakref
+from typing import NamedTuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# ER_UNKNOWN_STMT_HANDLER: the server dropped the statement (reconnect, session reset)
+_STALE_STATEMENT = 1243
+
+
+class StatementStats(NamedTuple):
+    name: str
+    executions: int
+    prepares: int
+    rows: int
+    total_ms: float
+    avg_ms: float
+
+
+class Statement:
+    """A named query with placeholders plus its execution counters"""
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+        self.executions = 0
+        self.prepares = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+    def stats(self):
+        avg_ms = self.seconds * 1000 / self.executions if self.executions else 0.0
+        return StatementStats(self.name, self.executions, self.prepares, self.rows,
+                              self.seconds * 1000, avg_ms)
+
+
+_registry = {}        # name -> Statement
+_by_sql = {}          # sql text -> Statement
+_lock = threading.Lock()
+# connection -> {statement name: prepared cursor}; entries go away with the connection
+_cursors = weakref.WeakKeyDictionary()
+
+
+def prepared_enabled():
+    return os.getenv("OTT_PREPARED", "1").lower() not in ("0", "false", "no")
+
+
+def register(name, sql):
+    """Add a statement to the registry; registering the same name twice must give the same SQL"""
+    with _lock:
+        existing = _registry.get(name)
+        if existing is not None:
+            if existing.sql != sql:
+                raise ValueError(f"Statement {name!r} is already registered with different SQL")
+            return existing
+        statement = Statement(name, sql)
+        _registry[name] = statement
+        _by_sql[sql] = statement
+        return statement
+
+
+def lookup(sql):
+    """The registered statement for this exact SQL text, or None"""
+    return _by_sql.get(sql)
+
+
+def get(name):
+    return _registry[name]
+
+
+def _physical(conn):
+    # Pooled connections wrap the real one; statements live on the real session
+    return getattr(conn, "_cnx", conn)
+
+
+def _prepared_cursor(conn, statement):
+    cursors = _cursors.setdefault(_physical(conn), {})
+    cursor = cursors.get(statement.name)
+    if cursor is None:
+        cursor = conn.cursor(prepared=True)
+        cursors[statement.name] = cursor
+        with _lock:
+            statement.prepares += 1
+    return cursor
+
+
+def forget(conn):
+    """Drop the cached cursors of a connection (after a reconnect or session reset)"""
+    cursors = _cursors.pop(_physical(conn), {})
+    for cursor in cursors.values():
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+def _execute_prepared(conn, statement, params):
+    """The connection's prepared cursor after executing; re-prepares once if the server dropped it"""
+    try:
+        cursor = _prepared_cursor(conn, statement)
+        cursor.execute(statement.sql, tuple(params or ()))
+    except Exception as e:
+        if getattr(e, "errno", None) != _STALE_STATEMENT:
+            raise
+        forget(conn)
+        cursor = _prepared_cursor(conn, statement)
+        cursor.execute(statement.sql, tuple(params or ()))
+    return cursor
+
+
+def execute(conn, statement, params=None, prepared=None):
+    """All rows of a registered statement; prepared=False forces a plain text cursor"""
+    if prepared is None:
+        prepared = prepared_enabled()
+    started = time.perf_counter()
+    if prepared:
+        rows = _execute_prepared(conn, statement, params).fetchall()
+    else:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(statement.sql, params)
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+    elapsed = time.perf_counter() - started
+    with _lock:
+        statement.executions += 1
+        statement.rows += len(rows)
+        statement.seconds += elapsed
+    return rows
+
+
+def iterate(conn, statement, params=None, size=10000, prepared=None):
+    """Rows of a registered statement in batches of up to size rows, for results too big to fetch at once"""
+    if prepared is None:
+        prepared = prepared_enabled()
+    started = time.perf_counter()
+    rows = 0
+    if prepared:
+        cursor = _execute_prepared(conn, statement, params)
+    else:
+        cursor = conn.cursor()
+        cursor.execute(statement.sql, params)
+    done = False
+    try:
+        while True:
+            batch = cursor.fetchmany(size)
+            if not batch:
+                done = True
+                break
+            rows += len(batch)
+            yield batch
+    finally:
+        if not prepared:
+            cursor.close()
+        elif not done:
+            cursor.fetchall()  # the cached cursor must not keep an unread result
+        elapsed = time.perf_counter() - started
+        with _lock:
+            statement.executions += 1
+            statement.rows += rows
+            statement.seconds += elapsed
+
+
+def stats():
+    """Counters of every statement that has run, busiest first"""
+    with _lock:
+        result = [s.stats() for s in _registry.values() if s.executions]
+    return sorted(result, key=lambda s: s.total_ms, reverse=True)
+
+
+def reset_stats():
+    with _lock:
+        for statement in _registry.values():
+            statement.executions = statement.prepares = statement.rows = 0
+            statement.seconds = 0.0
@@ -0,0 +1,106 @@
+import functools
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import ott_cohorts  # noqa: E402
+from ott_cohorts import CohortData, cohort_counts  # noqa: E402
+from benchmark.bench_cohorts import synthetic_cohort  # noqa: E402
+
+AS_OF = ott_cohorts.month_index(date(2024, 6, 1))
+
+
+def data(users, subscriptions=(), watches=()):
+    sub_users, sub_start, sub_end = zip(*subscriptions) if subscriptions else ((), (), ())
+    watch_users, watch_months = zip(*watches) if watches else ((), ())
+    return CohortData(*(np.asarray(column, dtype=np.int64)
+                        for column in (users, sub_users, sub_start, sub_end, watch_users, watch_months)))
+
+
+def naive_counts(cohort, as_of, rows):
+    """One user and one month at a time, with sets"""
+    width = as_of - cohort + 1
+    covered = {int(user): set() for user in rows.user_ids}
+    for user, start, end in zip(rows.sub_users, rows.sub_start, rows.sub_end):
+        covered[int(user)].update(range(max(start - cohort, 0), min(end - cohort, width - 1) + 1))
+    watched = {int(user): set() for user in rows.user_ids}
+    for user, month in zip(rows.watch_users, rows.watch_months):
+        if 0 <= month - cohort < width:
+            watched[int(user)].add(int(month - cohort))
+    return (len(covered),
+            [sum(age in months for months in covered.values()) for age in range(width)],
+            [sum(age in months for months in watched.values()) for age in range(width)],
+            [sum(age not in months and any(m <= age for m in months) for months in covered.values())
+             for age in range(width)])
+
+
+def test_month_helpers():
+    assert ott_cohorts.month_start(AS_OF) == date(2024, 6, 1)
+    assert ott_cohorts.month_label(AS_OF - 6) == "2023-12"
+
+
+def test_hand_counted_cohort():
+    cohort = AS_OF - 3
+    rows = data(users=[30, 10, 20],
+                subscriptions=[(10, cohort, cohort), (10, cohort + 2, cohort + 5),   # gap in month 1
+                               (20, cohort - 2, cohort + 1)],                         # clipped to month 0
+                watches=[(10, cohort), (10, cohort), (30, cohort + 3), (20, cohort + 9)])
+    size, subscribed, watching, churned = cohort_counts(cohort, AS_OF, rows)
+    assert size == 3
+    assert list(subscribed) == [2, 1, 1, 1]
+    assert list(watching) == [1, 0, 0, 1]
+    assert list(churned) == [0, 1, 1, 1]
+
+
+@pytest.mark.parametrize("cohort", [AS_OF - 11, AS_OF - 4, AS_OF])
+def test_matches_naive_count(cohort):
+    rows = synthetic_cohort(cohort, AS_OF, users=400, seed=11)
+    size, *fast = cohort_counts(cohort, AS_OF, rows)
+    ref_size, *slow = naive_counts(cohort, AS_OF, rows)
+    assert size == ref_size
+    assert [list(values) for values in fast] == slow
+
+
+def test_empty_cohort():
+    size, subscribed, watching, churned = cohort_counts(AS_OF - 2, AS_OF, data(users=[]))
+    assert size == 0 and len(subscribed) == 3 and not subscribed.any()
+
+
+def test_report_rates_are_nan_past_each_cohort_age():
+    counts = {AS_OF - 1: (4, np.array([4, 2]), np.array([1, 1]), np.array([0, 2])),
+              AS_OF: (0, np.array([0]), np.array([0]), np.array([0]))}
+    report = ott_cohorts.assemble(AS_OF, counts, recomputed=1)
+    rates = report.rates("subscribed")
+    assert list(report.cohorts) == [AS_OF - 1, AS_OF]
+    assert rates[0].tolist() == [1.0, 0.5]
+    assert rates[1, 0] == 0.0 and np.isnan(rates[1, 1])
+    assert "50%" in ott_cohorts.format_table(report, "subscribed", 2)
+
+
+def test_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(ott_cohorts, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ott_cohorts, "CACHE_PATH", str(tmp_path / "cohorts.npz"))
+    assert ott_cohorts.cached_report() is None
+    counts = {AS_OF - 1: (4, np.array([4, 2]), np.array([1, 1]), np.array([0, 2])),
+              AS_OF: (3, np.array([3]), np.array([2]), np.array([0]))}
+    prints = {cohort: (1, cohort, 2, 3, 4, 5) for cohort in counts}
+    ott_cohorts._save_cache(ott_cohorts.assemble(AS_OF, counts, 2), prints, 99)
+    as_of, cached, cached_prints, last_history_id = ott_cohorts._load_cache()
+    assert (as_of, cached_prints, last_history_id) == (AS_OF, prints, 99)
+    assert [len(values) for values in cached[AS_OF][1:]] == [1, 1, 1]  # trimmed to the cohort's age
+    assert ott_cohorts.cached_report().subscribed.tolist() == [[4, 2], [3, 0]]
+
+
+def test_compute_in_a_process_pool():
+    cohorts = [AS_OF - 2, AS_OF - 1, AS_OF]
+    done = []
+    results = ott_cohorts.compute(cohorts, AS_OF, functools.partial(synthetic_cohort, users=50), workers=2,
+                                  progress=lambda finished, total: done.append((finished, total)))
+    assert sorted(results) == cohorts
+    assert done[-1] == (3, 3)
+    for cohort in cohorts:
+        expected = cohort_counts(cohort, AS_OF, synthetic_cohort(cohort, AS_OF, users=50))
+        assert results[cohort][0] == expected[0]
+        assert all((got == want).all() for got, want in zip(results[cohort][1:], expected[1:]))
@@ -0,0 +1,111 @@
+from ott_cdc import ChangeEvent
+from ott_facets import FacetIndex, bits_of, ids_of
+
+CONTENT = [
+    (1, "English", "PG", "movie"),
+    (2, "Hindi", "R", "movie"),
+    (3, "English", "R", "series"),
+    (4, "Tamil", None, "series"),
+]
+GENRES = [(1, 10), (1, 11), (2, 10), (3, 12)]
+NAMES = {10: "Action", 11: "Comedy", 12: "Drama"}
+
+
+def index():
+    return FacetIndex().fill(CONTENT, GENRES, dict(NAMES))
+
+
+def event(table, before=None, after=None):
+    return ChangeEvent(table, "update" if before and after else "insert" if after else "delete",
+                       before, after, 0.0, 0.0)
+
+
+def content_row(content_id, language="English", rating="PG", content_type="movie"):
+    return {"content_id": content_id, "language": language, "rating": rating, "content_type": content_type}
+
+
+def test_bits_round_trip():
+    assert ids_of(bits_of([0, 3, 64, 200])) == [0, 3, 64, 200]
+    assert ids_of(0) == []
+
+
+def test_select_ors_within_and_ands_across_dimensions():
+    facets = index()
+    assert ids_of(facets.select({})) == [1, 2, 3, 4]
+    assert ids_of(facets.select({"language": ["English", "Hindi"]})) == [1, 2, 3]
+    assert ids_of(facets.select({"language": ["English", "Hindi"], "rating": ["R"]})) == [2, 3]
+    assert ids_of(facets.select({"genre": [10], "content_type": ["movie"]})) == [1, 2]
+    assert facets.select({"language": ["French"]}) == 0
+
+
+def test_select_within_base():
+    assert ids_of(index().select({"content_type": ["series"]}, base=bits_of([1, 3]))) == [3]
+
+
+def test_counts_ignore_their_own_dimension():
+    counts = index().counts({"language": ["English"], "genre": [10]})
+    # Languages are counted under the genre filter only, genres under the language filter only
+    assert counts["language"] == {"English": 1, "Hindi": 1, "Tamil": 0}
+    assert counts["genre"] == {10: 1, 11: 1, 12: 1}
+    assert counts["rating"] == {"PG": 1, "R": 0}
+
+
+def test_values_in_display_order():
+    facets = index()
+    assert facets.values("rating") == ["PG", "R"]
+    assert facets.values("genre") == [10, 11, 12]
+    assert facets.label_for("genre")(99) == "Genre 99"
+    assert facets.label_for("content_type")("movie") == "Movie"
+
+
+def test_insert_content():
+    facets = index()
+    facets.apply(event("Content", after=content_row(5, "Hindi", "PG", "series")))
+    assert ids_of(facets.select({"language": ["Hindi"], "content_type": ["series"]})) == [5]
+
+
+def test_update_keeping_id_keeps_genres():
+    facets = index()
+    facets.apply(event("Content", before=content_row(1), after=content_row(1, "Hindi", "R", "movie")))
+    assert ids_of(facets.select({"language": ["English"]})) == [3]
+    assert ids_of(facets.select({"language": ["Hindi"], "genre": [11]})) == [1]
+
+
+def test_update_changing_id_moves_attributes_and_drops_old_genres():
+    facets = index()
+    # Content_Genre has no ON UPDATE CASCADE, so only a title without genres can change id
+    facets.apply(event("Content", before=content_row(4, "Tamil", None, "series"),
+                       after=content_row(40, "Tamil", None, "series")))
+    assert ids_of(facets.select({"language": ["Tamil"]})) == [40]
+    assert 4 not in ids_of(facets.all)
+    facets.apply(event("Content", before=content_row(1), after=content_row(41)))
+    assert ids_of(facets.select({"genre": [11]})) == []
+    assert 11 not in facets.values("genre")
+
+
+def test_delete_cascades_to_genres():
+    facets = index()
+    facets.apply(event("Content", before=content_row(1)))
+    assert ids_of(facets.select({"genre": [10]})) == [2]
+    assert 11 not in facets.values("genre")  # its only title is gone
+    assert facets.counts({})["language"]["English"] == 1
+
+
+def test_genre_rows():
+    facets = index()
+    facets.apply(event("Content_Genre", after={"content_id": 4, "genre_id": 11}))
+    assert ids_of(facets.select({"genre": [11]})) == [1, 4]
+    facets.apply(event("Content_Genre", before={"content_id": 1, "genre_id": 11}))
+    assert ids_of(facets.select({"genre": [11]})) == [4]
+    facets.apply(event("Content_Genre", before={"content_id": 3, "genre_id": 12},
+                       after={"content_id": 3, "genre_id": 10}))
+    assert ids_of(facets.select({"genre": [10]})) == [1, 2, 3]
+    assert 12 not in facets.values("genre")
+
+
+def test_fill_replaces_everything():
+    facets = index()
+    facets.fill([(7, "Hindi", "G", "movie")], [(7, 12)], {12: "Drama"})
+    assert ids_of(facets.all) == [7]
+    assert facets.values("language") == ["Hindi"]
+    assert ids_of(facets.select({"genre": [12]})) == [7]
@@ -0,0 +1,112 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+import pytest
+
+from ott_rows import RowStore
+
+FIELDS = ("user_id", "name", "status", "amount", "joined", "seen")
+ROWS = [
+    (3, "Asha Rao", "active", Decimal("199.00"), date(2024, 1, 31), datetime(2024, 5, 1, 9, 30)),
+    (1, "Ben Li", "expired", Decimal("49.50"), date(2023, 12, 1), None),
+    (2, None, "active", None, date(2024, 2, 29), datetime(2024, 5, 2, 18, 0, 5)),
+]
+
+
+class Row(NamedTuple):
+    user_id: int
+    name: str
+    status: str
+    amount: Decimal
+    joined: date
+    seen: datetime
+
+
+class Cursor:
+    description = [(name, 0, None, None, None, None, True) for name in FIELDS]
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+
+def test_round_trip_keeps_types_and_nulls():
+    store = RowStore.from_rows(FIELDS, ROWS)
+    assert len(store) == 3
+    assert list(store) == ROWS
+    assert store[-1] == ROWS[-1]
+
+
+def test_from_cursor_in_batches_with_record():
+    store = RowStore.from_cursor(Cursor(ROWS), record=Row, size=2)
+    assert store[0] == Row(*ROWS[0])
+    assert store.column("amount") == [Decimal("199.00"), Decimal("49.50"), None]
+
+
+def test_column_of_only_nulls():
+    store = RowStore.from_rows(("id", "note"), [(1, None), (2, None)])
+    assert store.column("note") == [None, None]
+
+
+def test_sort_puts_nulls_last():
+    store = RowStore.from_rows(FIELDS, ROWS)
+    assert store.sort("user_id").column("user_id") == [1, 2, 3]
+    assert store.sort("amount").column("user_id") == [1, 3, 2]
+    assert store.sort("name", reverse=True).column("name")[1:] == ["Ben Li", "Asha Rao"]
+    assert store.sort("status").column("status") == ["active", "active", "expired"]
+
+
+def test_views_filter_without_copying():
+    store = RowStore.from_rows(FIELDS, ROWS)
+    assert store.where("status", "active").column("user_id") == [3, 2]
+    assert len(store.where("status", "cancelled")) == 0
+    assert store.search("li").column("user_id") == [1]
+    assert store.search("  ") is store
+    assert store.filter(lambda joined: joined.year == 2024, "joined").sort("user_id").column("user_id") == [2, 3]
+    assert store.where("status", "active").sort("user_id").column("user_id") == [2, 3]
+
+
+def test_format_is_display_text():
+    store = RowStore.from_rows(FIELDS, ROWS)
+    assert store.format(0) == ("3", "Asha Rao", "active", "199.00", "2024-01-31", "2024-05-01 09:30:00")
+    assert store.format(2)[1] == "" and store.format(2)[3] == ""
+
+
+def test_ints_are_narrowed():
+    store = RowStore.from_rows(("flag", "id", "big"), [(1, 70000, 2 ** 40), (0, 5, -1)])
+    assert store.column("big") == [2 ** 40, -1]
+    assert store.nbytes() < 2 * (1 + 4 + 8) + 1
+
+
+def test_decimals_with_more_digits_later_are_not_truncated():
+    values = [Decimal("1.5"), Decimal("2.1234"), Decimal("10"), Decimal("0.0001")]
+    store = RowStore.build(("v",), [[(values[0],)], [(values[1],), (values[2],)], [(values[3],)]])
+    assert store.column("v") == values
+
+
+def test_declared_decimal_scale_is_used():
+    cursor = Cursor([(Decimal("1.5"),), (Decimal("1.2345"),)])
+    cursor.description = [("v", 246, None, None, 10, 4, True)]
+    assert RowStore.from_cursor(cursor, size=1).column("v") == [Decimal("1.5"), Decimal("1.2345")]
+
+
+@pytest.mark.parametrize("value, error", [(Decimal("NaN"), ValueError), (Decimal("1e-30"), OverflowError)])
+def test_decimals_that_do_not_fit_raise(value, error):
+    with pytest.raises(error):
+        RowStore.from_rows(("v",), [(Decimal("1"),), (value,)])
+
+
+def test_enum_columns_widen_past_256_values():
+    rows = [(i, f"plan-{i}") for i in range(300)]
+    store = RowStore.from_rows(("id", "plan_name"), rows)
+    assert store.column("plan_name") == [name for _, name in rows]
+    assert store.where("plan_name", "plan-299").column("id") == [299]
+
+
+def test_unsupported_type_raises():
+    with pytest.raises(TypeError):
+        RowStore.from_rows(("v",), [(b"bytes",)])
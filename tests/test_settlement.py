@@ -0,0 +1,95 @@
+from decimal import Decimal
+
+import ott_settlement
+from ott_settlement import PendingPayment, Settlement, StubGateway, settle_batch, total
+
+
+def payment(payment_id, subscription_id=None):
+    return PendingPayment(payment_id, subscription_id, Decimal("199.00"), "UPI")
+
+
+class Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append((sql, params))
+
+    def fetchall(self):
+        claimed, self.conn.pending = self.conn.pending, []
+        return claimed
+
+    def close(self):
+        pass
+
+
+class Conn:
+    def __init__(self, pending=()):
+        self.pending = list(pending)
+        self.statements = []
+        self.commits = self.rollbacks = 0
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_gateway_outcome_is_keyed_by_payment_id():
+    gateway = StubGateway(latency=0, failure_rate=0.5, seed=3)
+    first = [gateway.charge(payment(i)) for i in range(200)]
+    assert True in first and False in first
+    assert [gateway.charge(payment(i)) for i in range(200)] == first
+    assert gateway.charges == 200 and gateway.repeats == 200
+    # A fresh gateway with the same seed decides the same way
+    assert [StubGateway(latency=0, failure_rate=0.5, seed=3).charge(payment(i)) for i in range(200)] == first
+
+
+def test_gateway_failure_rate_extremes():
+    assert all(StubGateway(latency=0, failure_rate=0).charge(payment(i)) for i in range(50))
+    assert not any(StubGateway(latency=0, failure_rate=1).charge(payment(i)) for i in range(50))
+
+
+def test_total():
+    assert total([]) == Settlement(0, 0, 0, 0)
+    assert total([Settlement(3, 1, 2, 0), Settlement(4, 0, 1, 2)]) == Settlement(7, 1, 3, 2)
+
+
+def test_settle_batch_extends_each_subscription_once_in_id_order():
+    rows = [tuple(payment(i, subscription)) for i, subscription in ((1, 20), (2, 10), (3, 20), (4, None))]
+    conn = Conn(rows)
+    succeeded, failed = settle_batch(conn, StubGateway(latency=0, failure_rate=0), batch_size=10)
+    assert [p.payment_id for p in succeeded] == [1, 2, 3, 4] and failed == []
+    assert conn.statements[1][1] == ["success", 1, 2, 3, 4]
+    assert [params for sql, params in conn.statements if sql == ott_settlement.EXTEND_SQL] == [(1, 10), (2, 20)]
+    assert conn.commits == 1
+
+
+def test_settle_batch_with_nothing_pending():
+    conn = Conn()
+    assert settle_batch(conn, StubGateway(latency=0)) == ([], [])
+    assert conn.rollbacks == 1 and conn.commits == 0
+
+
+def test_worker_retries_deadlocks(monkeypatch):
+    class Deadlock(Exception):
+        errno = ott_settlement.DEADLOCK
+
+    outcomes = [Deadlock(), ([payment(1)], [payment(2)]), Deadlock(), ([payment(3)], []), ([], [])]
+
+    def settle(conn, gateway, batch_size, skip_locked):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(ott_settlement, "settle_batch", settle)
+    batches = []
+    result = ott_settlement.run_worker(Conn(), StubGateway(latency=0),
+                                       progress=lambda ok, declined: batches.append((len(ok), len(declined))))
+    assert result == Settlement(2, 1, 2, 2)
+    assert batches == [(1, 1), (1, 0)]
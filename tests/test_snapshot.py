@@ -0,0 +1,89 @@
+import os
+import stat
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+import ott_service as svc
+from ott_rows import RowStore
+from ott_snapshot import Snapshot, decode, encode
+
+
+def round_trip(value, **kwargs):
+    return decode(*encode(value, **kwargs))
+
+
+def test_scalars_keep_their_types():
+    row = (Decimal("199.50"), date(2024, 2, 29), datetime(2024, 5, 1, 9, 30, 15, 250), timedelta(hours=1, seconds=3),
+           "text", 7, None)
+    assert round_trip([row]) == [row]
+    assert [type(value) for value in round_trip([row])[0]] == [type(value) for value in row]
+
+
+def test_records_come_back_as_their_namedtuple():
+    logs = [svc.PaymentLogRecord(1, 10, "paid", datetime(2024, 5, 1, 9, 30))]
+    assert round_trip(logs) == logs
+    assert type(round_trip(logs)[0]) is svc.PaymentLogRecord
+    summary = svc.RevenueSummary(Decimal("10.00"), Decimal("2.50"), 95.0)
+    assert round_trip(summary) == summary
+    assert type(round_trip(summary)) is svc.RevenueSummary
+
+
+def test_dicts_keep_non_string_keys():
+    names = {10: "Action", 11: "Comedy"}
+    assert round_trip(names) == names
+
+
+def test_stores_keep_fields_and_record():
+    rows = [(1, "active", Decimal("49.50"), date(2024, 1, 31)), (2, "expired", None, date(2023, 12, 1))]
+    store = RowStore.from_rows(("id", "status", "amount", "joined"), rows)
+    restored = round_trip(store)
+    assert isinstance(restored, RowStore)
+    assert restored.fields == store.fields
+    assert list(restored) == rows
+
+
+def test_lists_are_capped():
+    assert len(round_trip([(i,) for i in range(50)], limit=10)) == 10
+    store = RowStore.from_rows(("id",), [(i,) for i in range(50)])
+    assert len(round_trip(store, limit=10)) == 10
+
+
+def test_unknown_types_are_refused():
+    with pytest.raises(TypeError):
+        encode([(object(),)])
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "cache" / "snapshot.sqlite3"
+    snapshot = Snapshot(str(path))
+    snapshot.record("genre_names", {10: "Action"})
+    snapshot.record("revenue", svc.RevenueSummary(Decimal("10.00"), Decimal("2.50"), 95.0))
+    assert snapshot.save() == 2
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    loaded = Snapshot(str(path)).load()
+    assert "revenue" in loaded and loaded
+    assert loaded.get("genre_names") == {10: "Action"}
+    assert loaded.oldest() is not None
+
+    # Views not recorded this session keep their saved copy
+    loaded.record("genre_names", {11: "Comedy"})
+    loaded.save()
+    again = Snapshot(str(path)).load()
+    assert again.get("genre_names") == {11: "Comedy"}
+    assert again.get("revenue").total == Decimal("10.00")
+
+
+def test_missing_or_disabled_snapshot_is_empty(tmp_path):
+    assert not Snapshot(str(tmp_path / "none.sqlite3")).load()
+    disabled = Snapshot("")
+    disabled.record("revenue", svc.RevenueSummary(Decimal(0), Decimal(0), 0.0))
+    assert disabled.save() == 0 and not disabled.load()
+
+
+def test_corrupt_file_loads_empty(tmp_path):
+    path = tmp_path / "snapshot.sqlite3"
+    path.write_bytes(b"not a database")
+    assert not Snapshot(str(path)).load()